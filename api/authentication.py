@@ -0,0 +1,219 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (AuthenticationFailed,
+                                                 InvalidToken)
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.models import User
+
+USER_STATE_FIELDS = ('username', 'role', 'is_superuser', 'is_active')
+STATE_VERSION_CLAIM = 'state_version'
+# Кэши, которые видит только свой процесс
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+
+
+def versions_are_shared():
+    """
+    Версии пользователей видны всем процессам, только если кэш
+    по умолчанию общий (Memcached, Redis, база, файлы).
+    """
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], PROCESS_LOCAL_CACHES)
+
+
+def user_version_key(user_id):
+    return f'user:{user_id}:version'
+
+
+def get_user_version(user_id):
+    """
+    Версия состояния пользователя в кэше по умолчанию: общая для всех
+    процессов, только если общий сам кэш (versions_are_shared). Как и
+    версии кэша ответов, начинается с time.time_ns(), чтобы после
+    вытеснения ключа не совпасть со старой.
+    """
+    version = cache.get(user_version_key(user_id))
+    if version is None:
+        version = time.time_ns()
+        cache.add(user_version_key(user_id), version, timeout=None)
+        return cache.get(user_version_key(user_id), version)
+    return version
+
+
+def invalidate_user(user_id):
+    """
+    Устаревают claims токенов и состояние в кэше процесса; при общем
+    кэше - во всех процессах.
+    """
+    if not cache.add(user_version_key(user_id), time.time_ns(),
+                     timeout=None):
+        try:
+            cache.incr(user_version_key(user_id))
+        except ValueError:
+            cache.set(user_version_key(user_id), time.time_ns(),
+                      timeout=None)
+    user_state_cache.invalidate(user_id)
+
+
+class RoleAccessToken(AccessToken):
+    """
+    Access-токен с username, ролью и версией состояния пользователя
+    в claims.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for field in USER_STATE_FIELDS:
+            token[field] = getattr(user, field)
+        token[STATE_VERSION_CLAIM] = get_user_version(user.pk)
+        return token
+
+
+class UserStateCache:
+    """
+    Кэш состояния пользователей в памяти процесса: ограничен по размеру
+    (вытесняются давно не использованные записи) и по времени жизни записи.
+    Запись действительна только для версии состояния, с которой
+    сохранена.
+    """
+
+    def __init__(self, timeout, max_size):
+        self.timeout = timeout
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, version):
+        with self._lock:
+            item = self._data.get(user_id)
+            if item is None:
+                return None
+            expires, stored_version, state = item
+            if expires < time.monotonic() or stored_version != version:
+                del self._data[user_id]
+                return None
+            self._data.move_to_end(user_id)
+            return state
+
+    def set(self, user_id, version, state):
+        with self._lock:
+            self._data[user_id] = (
+                time.monotonic() + self.timeout, version, state)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._data.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+user_state_cache = UserStateCache(settings.JWT_USER_CACHE_TIMEOUT,
+                                  settings.JWT_USER_CACHE_SIZE)
+
+
+class ClaimsUser(TokenUser):
+    """
+    Пользователь, собранный из claims токена без загрузки модели User.
+    Если claims устарели, передаётся актуальное состояние (state),
+    которое имеет приоритет над ними.
+    """
+
+    def __init__(self, token, state=None):
+        super().__init__(token)
+        self.state = state or {}
+
+    def __str__(self):
+        return self.username
+
+    def _get(self, field, default):
+        if field in self.state:
+            return self.state[field]
+        return self.token.get(field, default)
+
+    @property
+    def username(self):
+        return self._get('username', '')
+
+    @property
+    def role(self):
+        return self._get('role', User.UserRole.USER)
+
+    @property
+    def is_superuser(self):
+        return self._get('is_superuser', False)
+
+    @property
+    def is_active(self):
+        return self._get('is_active', True)
+
+    @property
+    def is_admin(self):
+        return self.role == User.UserRole.ADMIN or self.is_superuser
+
+    @property
+    def is_moderator(self):
+        return self.role == User.UserRole.MODERATOR
+
+
+class JWTClaimsAuthentication(JWTAuthentication):
+    """
+    JWT-аутентификация без запроса пользователя на каждый вызов. Версия
+    состояния пользователя читается из общего кэша: если она совпадает
+    с версией в токене, права берутся из claims. Иначе (пользователь
+    изменён после выдачи токена) состояние берётся из кэша процесса
+    для этой версии или загружается из базы. С кэшем только своего
+    процесса (LocMemCache) изменение, сделанное другим воркером, не
+    было бы видно, поэтому состояние каждый раз читается из базы.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                'Token contained no recognizable user identification')
+
+        if not versions_are_shared():
+            state = self.load_state(user_id)
+        else:
+            version = get_user_version(user_id)
+            if validated_token.get(STATE_VERSION_CLAIM) == version:
+                state = None
+            else:
+                state = self.get_state(user_id, version)
+        is_active = (validated_token.get('is_active', True) if state is None
+                     else state['is_active'])
+        if not is_active:
+            raise AuthenticationFailed('User is inactive',
+                                       code='user_inactive')
+        return ClaimsUser(validated_token, state)
+
+    def load_state(self, user_id):
+        state = User.objects.filter(
+            **{api_settings.USER_ID_FIELD: user_id}
+        ).values(*USER_STATE_FIELDS).first()
+        if state is None:
+            raise AuthenticationFailed('User not found',
+                                       code='user_not_found')
+        return state
+
+    def get_state(self, user_id, version):
+        state = user_state_cache.get(user_id, version)
+        if state is None:
+            state = self.load_state(user_id)
+            user_state_cache.set(user_id, version, state)
+        return state
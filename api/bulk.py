@@ -0,0 +1,387 @@
+"""
+Массовая запись: POST .../bulk/ создаёт, PATCH .../bulk/ изменяет
+список объектов. Все элементы проверяются пакетно (slug-и и связи
+разрешаются одним запросом на модель), при ошибках возвращается 400
+со списком ошибок по элементам и ничего не записывается. Иначе объекты
+записываются через bulk_create/bulk_update в той же транзакции, что и
+проверка; конфликт с параллельной записью тоже возвращает 400.
+"""
+from collections import Counter
+from functools import partial
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, router, transaction
+from django.db.models import Max
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from reviews import search
+from reviews.models import Category, Genre, GenreTitle, Review, Title
+from reviews.signals import change_rating, refresh_leaderboards, touch
+from users.models import User
+
+from .cache import invalidate_model
+from .permissions import IsAdministrator
+from .serializers import (ReviewBulkSerializer, SlugItemBulkSerializer,
+                          TitleBulkSerializer, TitleSerializerGet)
+
+
+def bulk_insert(model, objects):
+    """
+    bulk_create, после которого у объектов заполнены id. Вызывается
+    внутри транзакции.
+    """
+    using = router.db_for_write(model)
+    objects = model.objects.using(using).bulk_create(objects)
+    if objects and objects[0].pk is None:
+        # SQLite не возвращает id из bulk_create. Первая вставка берёт
+        # блокировку записи до конца транзакции, а AUTOINCREMENT выдаёт
+        # строкам вставки подряд идущие id, не занятые раньше, поэтому
+        # последний id таблицы сейчас - id последнего объекта
+        last = model.objects.using(using).aggregate(last=Max('pk'))['last']
+        for offset, obj in enumerate(objects, start=last - len(objects) + 1):
+            obj.pk = offset
+    return objects
+
+
+def add_error(errors, index, field, message):
+    errors[index].setdefault(field, []).append(message)
+
+
+def find_duplicates(values):
+    seen, duplicates = set(), set()
+    for value in values:
+        if value in seen:
+            duplicates.add(value)
+        seen.add(value)
+    return duplicates
+
+
+class BulkHandler:
+    """
+    Проверка и запись элементов массового запроса. item_serializer_class
+    проверяет каждый элемент; модель по умолчанию - модель queryset
+    вьюсета. Без переопределения объекты создаются из проверенных
+    данных, а изменяются по lookup_field.
+    """
+    model = None
+    item_serializer_class = None
+    lookup_field = 'id'
+    not_found_message = 'Объект не найден.'
+
+    def __init__(self, view):
+        if self.item_serializer_class is None:
+            raise ImproperlyConfigured(
+                f'{type(self).__name__} should define item_serializer_class.')
+        self.view = view
+        if self.model is None:
+            self.model = view.get_queryset().model
+        self.existing = {}
+
+    def validate(self, items, is_update):
+        validated, errors = [], []
+        for item in items:
+            serializer = self.item_serializer_class(
+                data=item, partial=is_update)
+            if serializer.is_valid():
+                validated.append(dict(serializer.validated_data))
+                errors.append({})
+            else:
+                validated.append(None)
+                errors.append(serializer.errors)
+        if is_update:
+            for index, data in enumerate(validated):
+                if data is not None and self.lookup_field not in data:
+                    add_error(errors, index, self.lookup_field,
+                              'Обязательное поле.')
+        self.resolve(validated, errors, is_update)
+        return validated, errors
+
+    def get_existing_queryset(self):
+        """Объекты, среди которых ищутся изменяемые."""
+        return self.model.objects.all()
+
+    def resolve(self, validated, errors, is_update):
+        """
+        Пакетная проверка связей и уникальности. По умолчанию при
+        изменении одним запросом загружаются объекты по lookup_field
+        (self.existing); ключи должны найтись и не повторяться.
+        """
+        if not is_update:
+            return
+        field = self.lookup_field
+        keys = [data[field] for data in validated if data and field in data]
+        self.existing = self.get_existing_queryset().in_bulk(
+            keys, field_name=field)
+        duplicates = find_duplicates(keys)
+        for index, data in enumerate(validated):
+            if not data or field not in data:
+                continue
+            if data[field] not in self.existing:
+                add_error(errors, index, field, self.not_found_message)
+            if data[field] in duplicates:
+                add_error(errors, index, field,
+                          f'{field} повторяется в списке.')
+
+    def create(self, validated):
+        return bulk_insert(self.model,
+                           [self.model(**data) for data in validated])
+
+    def update(self, validated):
+        objects, fields = [], set()
+        for data in validated:
+            obj = self.existing[data[self.lookup_field]]
+            for field, value in data.items():
+                if field != self.lookup_field:
+                    setattr(obj, field, value)
+                    fields.add(field)
+            objects.append(obj)
+        if 'updated_at' in {field.name for field in self.model._meta.fields}:
+            now = timezone.now()
+            for obj in objects:
+                obj.updated_at = now
+            fields.add('updated_at')
+        if fields:
+            self.model.objects.bulk_update(objects, fields)
+        return objects
+
+    def represent(self, objects):
+        return self.view.get_serializer(objects, many=True).data
+
+
+class SlugModelBulkHandler(BulkHandler):
+    """Жанры и категории: создаются по name и slug, изменяются по slug."""
+    item_serializer_class = SlugItemBulkSerializer
+    lookup_field = 'slug'
+
+    def resolve(self, validated, errors, is_update):
+        super().resolve(validated, errors, is_update)
+        if is_update:
+            return
+        slugs = [data['slug'] for data in validated if data]
+        duplicates = find_duplicates(slugs)
+        existing = set(self.model.objects.filter(
+            slug__in=slugs).values_list('slug', flat=True))
+        for index, data in enumerate(validated):
+            if not data:
+                continue
+            if data['slug'] in duplicates:
+                add_error(errors, index, 'slug', 'slug повторяется в списке.')
+            if data['slug'] in existing:
+                add_error(errors, index, 'slug', 'Такой slug уже есть.')
+
+    def update(self, validated):
+        objects = super().update(validated)
+        # Название выводится в произведениях
+        touch(Title.objects.filter(**{
+            f'{self.model._meta.model_name}__in': objects}).distinct())
+        return objects
+
+
+class TitleBulkHandler(BulkHandler):
+    """Произведения с категорией и жанрами, заданными slug-ами."""
+    item_serializer_class = TitleBulkSerializer
+    model = Title
+
+    def resolve(self, validated, errors, is_update):
+        super().resolve(validated, errors, is_update)
+        items = [data for data in validated if data]
+        self.categories = Category.objects.in_bulk(
+            {data['category'] for data in items if data.get('category')},
+            field_name='slug')
+        self.genres = Genre.objects.in_bulk(
+            {slug for data in items for slug in data.get('genre', ())},
+            field_name='slug')
+
+        for index, data in enumerate(validated):
+            if not data:
+                continue
+            category = data.get('category')
+            if category and category not in self.categories:
+                add_error(errors, index, 'category',
+                          f'Категория {category} не найдена.')
+            for slug in data.get('genre', ()):
+                if slug not in self.genres:
+                    add_error(errors, index, 'genre',
+                              f'Жанр {slug} не найден.')
+
+    def set_fields(self, title, data):
+        for field in ('name', 'year', 'description'):
+            if field in data:
+                setattr(title, field, data[field])
+        if 'category' in data:
+            title.category = self.categories.get(data['category'])
+
+    def set_genres(self, titles, validated, touch_titles=True):
+        GenreTitle.set_genres({
+            title.pk: {self.genres[slug].pk for slug in data['genre']}
+            for title, data in zip(titles, validated) if 'genre' in data
+        }, touch_titles)
+
+    def create(self, validated):
+        titles = []
+        for data in validated:
+            title = Title()
+            self.set_fields(title, data)
+            titles.append(title)
+        bulk_insert(Title, titles)
+        self.set_genres(titles, validated, touch_titles=False)
+        search.index_objects(titles, router.db_for_write(Title))
+        return titles
+
+    def update(self, validated):
+        titles, fields, now = [], {'updated_at'}, timezone.now()
+        for data in validated:
+            title = self.existing[data['id']]
+            self.set_fields(title, data)
+            title.updated_at = now
+            fields.update(field for field in
+                          ('name', 'year', 'description', 'category')
+                          if field in data)
+            titles.append(title)
+        Title.objects.bulk_update(titles, fields)
+        self.set_genres(titles, validated, touch_titles=False)
+        search.index_objects(titles, router.db_for_write(Title))
+        # Жанры и категория меняют рейтинги лучших только у произведений,
+        # набравших нужное число отзывов
+        for title in titles:
+            if title.rating_count >= settings.LEADERBOARD_MIN_REVIEWS:
+                refresh_leaderboards(title.pk)
+        return titles
+
+    def represent(self, objects):
+        titles = self.view.get_queryset().filter(
+            pk__in=[title.pk for title in objects])
+        return TitleSerializerGet(titles, many=True).data
+
+
+class ReviewBulkHandler(BulkHandler):
+    """Отзывы на произведение от имени указанных авторов."""
+    item_serializer_class = ReviewBulkSerializer
+    model = Review
+    not_found_message = 'Отзыв не найден.'
+
+    def __init__(self, view):
+        super().__init__(view)
+        self.title = get_object_or_404(Title, pk=view.kwargs.get('title_id'))
+
+    def get_existing_queryset(self):
+        return self.title.reviews.select_related('author')
+
+    def lock(self, ids):
+        """
+        Блокирует изменяемые отзывы до конца транзакции в порядке id (без
+        взаимных блокировок): оценки, от которых считается сдвиг рейтинга,
+        читаются после блокировки и не устаревают, как и в Review.save.
+        """
+        list(self.title.reviews.select_for_update().filter(
+            pk__in=ids).order_by('pk').values_list('pk', flat=True))
+
+    def resolve(self, validated, errors, is_update):
+        if is_update:
+            self.lock([data['id'] for data in validated
+                       if data and 'id' in data])
+        super().resolve(validated, errors, is_update)
+        if is_update:
+            return
+        items = [data for data in validated if data]
+        usernames = [data['author'] for data in items]
+        self.authors = User.objects.in_bulk(usernames,
+                                            field_name='username')
+        reviewed = set(self.title.reviews.filter(
+            author__username__in=usernames
+        ).values_list('author__username', flat=True))
+        duplicates = find_duplicates(usernames)
+        for index, data in enumerate(validated):
+            if not data:
+                continue
+            author = data['author']
+            if author not in self.authors:
+                add_error(errors, index, 'author',
+                          f'Пользователь {author} не найден.')
+            if author in reviewed or author in duplicates:
+                add_error(errors, index, 'author',
+                          'На произведение можно оставить только 1 отзыв.')
+
+    def create(self, validated):
+        reviews = [
+            Review(title=self.title, author=self.authors[data['author']],
+                   text=data['text'], score=data['score'])
+            for data in validated
+        ]
+        bulk_insert(Review, reviews)
+        change_rating(self.title.pk,
+                      sum(review.score for review in reviews), len(reviews),
+                      Counter(review.score for review in reviews))
+        search.index_objects(reviews, router.db_for_write(Review))
+        refresh_leaderboards(self.title.pk)
+        return reviews
+
+    def update(self, validated):
+        reviews, score_delta, scores_delta = [], 0, Counter()
+        now = timezone.now()
+        for data in validated:
+            review = self.existing[data['id']]
+            review.text = data.get('text', review.text)
+            review.updated_at = now
+            if 'score' in data and data['score'] != review.score:
+                score_delta += data['score'] - review.score
+                scores_delta[review.score] -= 1
+                scores_delta[data['score']] += 1
+                review.score = data['score']
+            reviews.append(review)
+        Review.objects.bulk_update(reviews, ['text', 'score', 'updated_at'])
+        if score_delta or any(scores_delta.values()):
+            change_rating(self.title.pk, score_delta, 0, scores_delta)
+        else:
+            touch(Title.objects.filter(pk=self.title.pk))
+        search.index_objects(reviews, router.db_for_write(Review))
+        refresh_leaderboards(self.title.pk)
+        return reviews
+
+
+class BulkWriteMixin:
+    """Действие bulk для вьюсета: bulk_handler_class выполняет запись."""
+    bulk_handler_class = None
+
+    @action(detail=False, methods=['post', 'patch'], url_path='bulk',
+            permission_classes=(IsAuthenticated, IsAdministrator,))
+    def bulk(self, request, *args, **kwargs):
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError(
+                {'non_field_errors': ['Ожидается список объектов.']})
+        if len(items) > settings.BULK_MAX_ITEMS:
+            raise ValidationError({'non_field_errors': [
+                f'Не больше {settings.BULK_MAX_ITEMS} объектов за запрос.']})
+
+        is_update = request.method == 'PATCH'
+        handler = self.bulk_handler_class(self)
+        try:
+            # Проверка и запись в одной транзакции
+            with transaction.atomic():
+                validated, errors = handler.validate(items, is_update)
+                if any(errors):
+                    return Response(errors,
+                                    status=status.HTTP_400_BAD_REQUEST)
+                if is_update:
+                    objects = handler.update(validated)
+                else:
+                    objects = handler.create(validated)
+                # bulk_create и bulk_update не вызывают сигналы моделей
+                transaction.on_commit(
+                    partial(invalidate_model, handler.model))
+        except IntegrityError:
+            # Параллельный запрос успел записать те же slug-и или отзывы
+            raise ValidationError({'non_field_errors': [
+                'Данные изменились во время записи, повторите запрос.']})
+        return Response(
+            handler.represent(objects),
+            status=status.HTTP_200_OK if is_update else status.HTTP_201_CREATED
+        )
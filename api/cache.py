@@ -0,0 +1,243 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Subquery
+from django.http import HttpResponse
+from django.utils.http import (http_date, parse_etags, parse_http_date_safe,
+                               quote_etag)
+
+from .mixins import ParentObjectMixin
+from .replicas import is_pinned_request, primary_reads
+
+# Какие кэши ответов устаревают при изменении модели
+INVALIDATED_NAMESPACES = {
+    'title': ('titles',),
+    'genretitle': ('titles',),
+    'review': ('titles',),
+    'category': ('categories', 'titles'),
+    'genre': ('genres', 'titles'),
+}
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def version_key(namespace):
+    return f'response:{namespace}:version'
+
+
+def new_version():
+    """
+    Начальная версия пространства имён. Ключ версии может быть вытеснен
+    из кэша раньше ответов, поэтому версия не начинается с 1, иначе
+    вернулись бы ответы старых версий.
+    """
+    return time.time_ns()
+
+
+def get_version(namespace):
+    cache = get_cache()
+    version = cache.get(version_key(namespace))
+    if version is None:
+        version = new_version()
+        cache.add(version_key(namespace), version, timeout=None)
+        return cache.get(version_key(namespace), version)
+    return version
+
+
+def modified_key(namespace):
+    return f'response:{namespace}:modified'
+
+
+def get_modified(namespace):
+    """Время последнего сброса пространства имён (time.time())."""
+    cache = get_cache()
+    modified = cache.get(modified_key(namespace))
+    if modified is None:
+        # Время сброса потеряно: считаем, что данные изменились сейчас
+        cache.add(modified_key(namespace), time.time(), timeout=None)
+        return cache.get(modified_key(namespace), time.time())
+    return modified
+
+
+def invalidate(namespace):
+    """Сбрасывает все закэшированные ответы пространства имён."""
+    cache = get_cache()
+    if not cache.add(version_key(namespace), new_version(), timeout=None):
+        try:
+            cache.incr(version_key(namespace))
+        except ValueError:
+            cache.set(version_key(namespace), new_version(), timeout=None)
+    # Время меняется после версии: иначе старый ответ мог бы уйти
+    # с новым Last-Modified
+    cache.set(modified_key(namespace), time.time(), timeout=None)
+
+
+def invalidate_model(model):
+    for namespace in INVALIDATED_NAMESPACES.get(model._meta.model_name, ()):
+        invalidate(namespace)
+
+
+def make_etag(content):
+    return quote_etag(hashlib.md5(content).hexdigest())
+
+
+def etag_matches(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return '*' in etags or etag in etags
+
+
+def last_modified_seconds(timestamp, now):
+    """
+    Значение для Last-Modified с точностью до секунды или None, если
+    секунда изменения ещё не закончилась (now - время до чтения
+    timestamp): иначе изменение в ту же секунду осталось бы незаметным.
+    """
+    if timestamp is None or int(now) <= int(timestamp):
+        return None
+    return int(timestamp)
+
+
+def modified_since_matches(request, last_modified):
+    """If-Modified-Since не раньше last_modified (без If-None-Match)."""
+    if_modified_since = request.META.get('HTTP_IF_MODIFIED_SINCE')
+    if (last_modified is None or not if_modified_since
+            or request.META.get('HTTP_IF_NONE_MATCH')):
+        return False
+    if_modified_since = parse_http_date_safe(if_modified_since)
+    return if_modified_since is not None and (
+        last_modified <= if_modified_since)
+
+
+def set_validators(response, etag, last_modified=None):
+    if etag is not None:
+        response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def not_modified(etag, last_modified=None):
+    return set_validators(HttpResponse(status=304), etag, last_modified)
+
+
+class CachedResponseMixin:
+    """
+    Кэширует отрендеренные ответы list и retrieve по пути и параметрам
+    запроса, отдаёт ETag и Last-Modified (время последнего сброса кэша)
+    и отвечает 304 на совпадающий If-None-Match или If-Modified-Since.
+    Кэш сбрасывается сигналами моделей (api/signals.py).
+    """
+    cache_namespace = None
+
+    def get_response_cache_key(self, request):
+        query = urlencode(sorted(
+            (key, value) for key, values in request.GET.lists()
+            for value in values
+        ))
+        version = get_version(self.cache_namespace)
+        return (f'response:{self.cache_namespace}:{version}:'
+                f'{request.accepted_renderer.format}:{request.path}?{query}')
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        if is_pinned_request(request):
+            # Клиент только что писал и должен видеть свои изменения
+            return handler(request, *args, **kwargs)
+        # Время сброса читается до версии и данных
+        last_modified = last_modified_seconds(
+            get_modified(self.cache_namespace), time.time())
+        if modified_since_matches(request, last_modified):
+            return not_modified(None, last_modified)
+
+        cache = get_cache()
+        key = self.get_response_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type, etag = cached
+            if etag_matches(request, etag):
+                return not_modified(etag, last_modified)
+            response = HttpResponse(content, content_type=content_type)
+            return set_validators(response, etag, last_modified)
+
+        # В кэш попадают только данные основной базы, не отстающей реплики
+        with primary_reads():
+            response = handler(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        response.accepted_renderer = request.accepted_renderer
+        response.accepted_media_type = request.accepted_media_type
+        response.renderer_context = self.get_renderer_context()
+        response.render()
+        etag = make_etag(response.content)
+        cache.set(key, (response.content, response['Content-Type'], etag),
+                  timeout=settings.RESPONSE_CACHE_TIMEOUT)
+        if etag_matches(request, etag):
+            return not_modified(etag, last_modified)
+        return set_validators(response, etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs)
+
+
+class ConditionalGetMixin(ParentObjectMixin):
+    """
+    ETag и Last-Modified для list и retrieve по полю updated_at: своему
+    у retrieve, у list - позднему из updated_at родителя
+    (get_parent_queryset) и его объектов (счётчики в объектах меняются
+    без изменения родителя). Совпадающий If-None-Match или
+    If-Modified-Since получает 304 без выборки и сериализации данных.
+    """
+
+    def get_updated_at(self):
+        """updated_at, от которого зависит ответ, или None."""
+        if self.action == 'retrieve':
+            lookup = self.lookup_url_kwarg or self.lookup_field
+            queryset = self.get_queryset().filter(
+                **{self.lookup_field: self.kwargs[lookup]})
+        else:
+            latest = self.get_queryset().order_by('-updated_at').values(
+                'updated_at')[:1]
+            row = self.get_parent_queryset().annotate(
+                children_updated_at=Subquery(latest)
+            ).values_list('updated_at', 'children_updated_at').first()
+            return row and max(filter(None, row))
+        return queryset.prefetch_related(None).values_list(
+            'updated_at', flat=True).first()
+
+    def get_conditional_response(self, handler, request, *args, **kwargs):
+        now = time.time()
+        updated_at = self.get_updated_at()
+        if updated_at is None:
+            # Объекта нет: ответ 404 даст обработчик
+            return handler(request, *args, **kwargs)
+        etag = 'W/' + make_etag(
+            f'{request.accepted_renderer.format}:{request.get_full_path()}:'
+            f'{updated_at.isoformat()}'.encode())
+        last_modified = last_modified_seconds(updated_at.timestamp(), now)
+        if etag_matches(request, etag) or modified_since_matches(
+                request, last_modified):
+            return not_modified(etag, last_modified)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            set_validators(response, etag, last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            super().retrieve, request, *args, **kwargs)
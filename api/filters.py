@@ -1,5 +1,7 @@
 from django_filters import rest_framework as filters
+from rest_framework.filters import BaseFilterBackend
 
+from reviews import search
 from reviews.models import Title
 
 
@@ -11,3 +13,29 @@ class TitleFilter(filters.FilterSet):
     class Meta:
         model = Title
         fields = ('name', 'year', 'genre', 'category')
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Полнотекстовый поиск по параметру search
+    с сортировкой по релевантности. Поля search_extra_fields вьюсета
+    (связанные объекты, которых нет в полнотекстовом индексе)
+    ищутся по подстроке.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return search.search(queryset, query,
+                             getattr(view, 'search_extra_fields', ()))
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.search_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Полнотекстовый поиск',
+            'schema': {'type': 'string'},
+        }]
@@ -0,0 +1,342 @@
+"""
+Метрики запросов: время ответа, число и время SQL-запросов
+в разрезе (view, action, status).
+
+Значения копятся в памяти процесса. Если задан METRICS_MULTIPROC_DIR,
+каждый процесс (воркер gunicorn) периодически сбрасывает свои значения
+в файл этого каталога, а /metrics суммирует файлы всех процессов.
+Так же собирается состояние пулов соединений с базой. Файлы
+завершившегося воркера мастер gunicorn переносит в архив и удаляет
+(child_exit в gunicorn.conf.py), чтобы счётчики не уменьшались,
+а каталог не рос с каждым перезапуском воркеров.
+"""
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from api_yamdb.backends.pool import pool_stats
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LABELS = ('view', 'action', 'status')
+
+
+ARCHIVE_FILE = 'archive.json'
+
+
+def write_json(path, data):
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as tmp_file:
+        json.dump(data, tmp_file)
+    os.replace(tmp_path, path)
+
+
+def read_json(path):
+    try:
+        with open(path) as json_file:
+            return json.load(json_file)
+    except (OSError, ValueError):
+        return None
+
+
+def read_process_files(directory, prefix, skip_pids=()):
+    """
+    Данные из файлов процессов каталога multiprocess, кроме процессов
+    skip_pids (их значения уже в архиве).
+    """
+    for name in os.listdir(directory):
+        if not (name.startswith(prefix) and name.endswith('.json')):
+            continue
+        if name[len(prefix):-len('.json')] in skip_pids:
+            continue
+        data = read_json(os.path.join(directory, name))
+        if data is not None:
+            yield data
+
+
+def read_archive(directory):
+    """
+    Суммарные значения завершившихся процессов: метрики запросов,
+    счётчики пулов и pid-ы, файлы которых ещё не удалены.
+    """
+    archive = read_json(os.path.join(directory, ARCHIVE_FILE)) or {}
+    return {
+        'pids': archive.get('pids', []),
+        'metrics': archive.get('metrics', []),
+        'pools': archive.get('pools', {}),
+    }
+
+
+def merge_series(merged, process_series):
+    """Добавляет серии процесса в merged ({метки: серия})."""
+    for series in process_series:
+        labels = tuple(series['labels'])
+        total = merged.get(labels)
+        if total is None:
+            merged[labels] = series
+            continue
+        total['buckets'] = [
+            a + b for a, b in zip(total['buckets'], series['buckets'])]
+        for key in ('count', 'sum', 'queries', 'db_time'):
+            total[key] += series[key]
+
+
+def merge_pools(merged, process_pools, keys=None):
+    """Добавляет состояние пулов процесса (только keys, если заданы)."""
+    for alias, stats in process_pools.items():
+        total = merged.setdefault(alias, dict.fromkeys(POOL_GAUGES, 0))
+        for key, value in stats.items():
+            if keys is None or key in keys:
+                total[key] = total.get(key, 0) + value
+
+
+def archive_process(directory, pid):
+    """
+    Переносит значения завершившегося процесса в архив и удаляет его
+    файлы. Состояние пулов (size, open, idle, in_use) не архивируется:
+    соединений процесса больше нет. Вызывается мастером gunicorn.
+    """
+    pid = str(pid)
+    archive_path = os.path.join(directory, ARCHIVE_FILE)
+    archive = read_archive(directory)
+    if pid not in archive['pids']:
+        metrics = {}
+        merge_series(metrics, archive['metrics'])
+        merge_series(metrics, read_json(
+            os.path.join(directory, f'metrics_{pid}.json')) or [])
+        merge_pools(archive['pools'], read_json(
+            os.path.join(directory, f'pools_{pid}.json')) or {},
+            keys={key for key, _ in POOL_COUNTERS})
+        archive['metrics'] = list(metrics.values())
+        # Пока файлы процесса не удалены, /metrics пропускает их по pid
+        archive['pids'].append(pid)
+        write_json(archive_path, archive)
+    paths = [os.path.join(directory, f'{prefix}_{pid}.json')
+             for prefix in ('metrics', 'pools')]
+    paths.extend(glob.glob(os.path.join(directory, f'*.{pid}.*.tmp')))
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    archive['pids'].remove(pid)
+    write_json(archive_path, archive)
+
+
+class Registry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self._last_flush = 0
+
+    def observe(self, labels, duration, queries, db_time):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {
+                    'buckets': [0] * len(BUCKETS),
+                    'count': 0,
+                    'sum': 0.0,
+                    'queries': 0,
+                    'db_time': 0.0,
+                }
+            for i, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    series['buckets'][i] += 1
+                    break
+            series['count'] += 1
+            series['sum'] += duration
+            series['queries'] += queries
+            series['db_time'] += db_time
+
+    def dump(self):
+        with self._lock:
+            return [
+                dict(series, labels=list(labels))
+                for labels, series in self._series.items()
+            ]
+
+    def flush(self, directory, force=False):
+        """Сохраняет значения процесса в файл каталога multiprocess."""
+        now = time.monotonic()
+        interval = settings.METRICS_FLUSH_INTERVAL
+        if not force and now - self._last_flush < interval:
+            return
+        self._last_flush = now
+        write_json(os.path.join(directory, f'metrics_{os.getpid()}.json'),
+                   self.dump())
+        write_json(os.path.join(directory, f'pools_{os.getpid()}.json'),
+                   pool_stats())
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+registry = Registry()
+
+
+def collect():
+    """Значения всех процессов, просуммированные по меткам."""
+    directory = settings.METRICS_MULTIPROC_DIR
+    if not directory:
+        return registry.dump()
+    registry.flush(directory, force=True)
+    archive = read_archive(directory)
+    merged = {}
+    merge_series(merged, archive['metrics'])
+    for process_series in read_process_files(directory, 'metrics_',
+                                             archive['pids']):
+        merge_series(merged, process_series)
+    return list(merged.values())
+
+
+def collect_pools():
+    """Состояние пулов соединений, просуммированное по процессам."""
+    directory = settings.METRICS_MULTIPROC_DIR
+    if not directory:
+        return pool_stats()
+    registry.flush(directory, force=True)
+    archive = read_archive(directory)
+    merged = {}
+    merge_pools(merged, archive['pools'])
+    for process_pools in read_process_files(directory, 'pools_',
+                                            archive['pids']):
+        merge_pools(merged, process_pools)
+    return merged
+
+
+def format_labels(labels, **extra):
+    pairs = list(zip(LABELS, labels)) + list(extra.items())
+    return ','.join(
+        '{}="{}"'.format(name, str(value).replace('"', '\\"'))
+        for name, value in pairs
+    )
+
+
+def render_prometheus(all_series):
+    lines = [
+        '# HELP yamdb_request_duration_seconds Request latency.',
+        '# TYPE yamdb_request_duration_seconds histogram',
+    ]
+    for series in all_series:
+        labels = series['labels']
+        cumulative = 0
+        for bound, count in zip(BUCKETS, series['buckets']):
+            cumulative += count
+            lines.append(
+                'yamdb_request_duration_seconds_bucket'
+                f'{{{format_labels(labels, le=bound)}}} {cumulative}')
+        lines.append(
+            'yamdb_request_duration_seconds_bucket'
+            f'{{{format_labels(labels, le="+Inf")}}} {series["count"]}')
+        lines.append('yamdb_request_duration_seconds_sum'
+                     f'{{{format_labels(labels)}}} {series["sum"]}')
+        lines.append('yamdb_request_duration_seconds_count'
+                     f'{{{format_labels(labels)}}} {series["count"]}')
+    for name, key, help_text in (
+        ('yamdb_db_queries_total', 'queries', 'SQL queries run by requests.'),
+        ('yamdb_db_duration_seconds_total', 'db_time',
+         'Time spent in SQL queries.'),
+    ):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for series in all_series:
+            lines.append(
+                f'{name}{{{format_labels(series["labels"])}}} {series[key]}')
+    return '\n'.join(lines) + '\n'
+
+
+POOL_GAUGES = ('size', 'open', 'idle', 'in_use')
+POOL_COUNTERS = (
+    ('checkouts', 'Connections handed out by the pool.'),
+    ('waits', 'Checkouts that waited for a free connection.'),
+    ('timeouts', 'Checkouts that timed out.'),
+    ('created', 'Connections opened by the pool.'),
+    ('expired', 'Connections closed after DB_POOL_MAX_LIFETIME.'),
+    ('health_check_failures', 'Connections that failed the checkout check.'),
+    ('discarded', 'Connections that could not be reset on return.'),
+)
+
+
+def render_pool_metrics(pools):
+    """Состояние пулов соединений в формате Prometheus."""
+    if not pools:
+        return ''
+    lines = [
+        '# HELP yamdb_db_pool_connections Pool connections by state.',
+        '# TYPE yamdb_db_pool_connections gauge',
+    ]
+    for alias, stats in sorted(pools.items()):
+        for state in POOL_GAUGES:
+            lines.append('yamdb_db_pool_connections'
+                         f'{{alias="{alias}",state="{state}"}} {stats[state]}')
+    for key, help_text in POOL_COUNTERS:
+        name = f'yamdb_db_pool_{key}_total'
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for alias, stats in sorted(pools.items()):
+            lines.append(f'{name}{{alias="{alias}"}} {stats.get(key, 0)}')
+    return '\n'.join(lines) + '\n'
+
+
+class QueryCounter:
+    """execute_wrapper, считающий число и время SQL-запросов."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+def get_view_labels(view_func, method):
+    """
+    Имя вьюсета и действие: DRF сохраняет класс во view_func.cls,
+    а для вьюсетов соответствие методов действиям во view_func.actions.
+    """
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return getattr(view_func, '__name__', 'unknown'), method.lower()
+    actions = getattr(view_func, 'actions', None) or {}
+    return view_class.__name__, actions.get(method.lower(), method.lower())
+
+
+class MetricsMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        view, action = getattr(
+            request, '_metrics_view', ('unresolved', request.method.lower()))
+        registry.observe((view, action, str(response.status_code)),
+                         duration, counter.count, counter.duration)
+        if settings.METRICS_MULTIPROC_DIR:
+            registry.flush(settings.METRICS_MULTIPROC_DIR)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_view = get_view_labels(view_func, request.method)
@@ -0,0 +1,19 @@
+from django.core.exceptions import ImproperlyConfigured
+
+
+class ParentObjectMixin:
+    """
+    Родитель вложенного ресурса: объект parent_model, у которого поля
+    parent_lookup_kwargs равны одноимённым параметрам пути.
+    """
+    parent_model = None
+    parent_lookup_kwargs = {}
+
+    def get_parent_queryset(self):
+        if self.parent_model is None:
+            raise ImproperlyConfigured(
+                f'{type(self).__name__} should define parent_model.')
+        return self.parent_model.objects.filter(**{
+            field: self.kwargs.get(kwarg)
+            for field, kwarg in self.parent_lookup_kwargs.items()
+        })
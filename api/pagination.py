@@ -0,0 +1,129 @@
+import json
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+
+
+class ViewOrderingCursorPagination(pagination.CursorPagination):
+    """
+    Курсорная пагинация по полям cursor_ordering вьюсета. DRF сравнивает
+    позицию только по первому полю, а одинаковые значения пропускает
+    смещением; здесь позиция - значения всех полей (последнее
+    уникально), поэтому страница выбирается условием без OFFSET и при
+    повторяющихся названиях.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        return view.cursor_ordering
+
+    def _get_position_from_instance(self, instance, ordering):
+        if isinstance(instance, dict):
+            values = [instance[field.lstrip('-')] for field in ordering]
+        else:
+            values = [getattr(instance, field.lstrip('-'))
+                      for field in ordering]
+        return json.dumps([str(value) for value in values])
+
+    def after_position(self, ordering, position):
+        """Условие "строка после позиции" для порядка ordering."""
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        fields = [field.lstrip('-') for field in ordering]
+        conditions = []
+        for index, field in enumerate(ordering):
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            conditions.append(Q(
+                **dict(zip(fields[:index], values[:index])),
+                **{f'{fields[index]}__{lookup}': values[index]}))
+        return reduce(or_, conditions)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, position = self.cursor or (0, False, None)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = pagination._reverse_ordering(ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after_position(ordering, position))
+
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        following = None
+        if len(results) > len(self.page):
+            following = self._get_position_from_instance(
+                results[-1], self.ordering)
+
+        passed = position is not None or offset > 0
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = passed, following is not None
+            self.next_position, self.previous_position = position, following
+        else:
+            self.has_next, self.has_previous = following is not None, passed
+            self.next_position, self.previous_position = following, position
+        self.display_page_controls = self.has_previous or self.has_next
+        return self.page
+
+
+class PageNumberOrCursorPagination(pagination.BasePagination):
+    """
+    Постраничная пагинация по умолчанию. С параметром pagination=cursor
+    (или при переданном cursor) используется курсорная пагинация:
+    без COUNT(*) и OFFSET, поэтому стоимость страницы не зависит от глубины.
+    С параметром search страницы нумеруются всегда: курсор требует
+    порядка cursor_ordering, а результаты поиска упорядочены
+    по релевантности.
+    """
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+    search_query_param = 'search'
+
+    def get_paginator(self, request):
+        params = request.query_params
+        if params.get(self.search_query_param):
+            return pagination.PageNumberPagination()
+        if (params.get(self.mode_query_param) == self.cursor_mode
+                or ViewOrderingCursorPagination.cursor_query_param in params):
+            return ViewOrderingCursorPagination()
+        return pagination.PageNumberPagination()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.paginator = self.get_paginator(request)
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    def get_results(self, data):
+        return self.paginator.get_results(data)
+
+    def get_schema_fields(self, view):
+        return (
+            pagination.PageNumberPagination().get_schema_fields(view)
+            + ViewOrderingCursorPagination().get_schema_fields(view)
+        )
+
+    def get_schema_operation_parameters(self, view):
+        return (
+            pagination.PageNumberPagination()
+            .get_schema_operation_parameters(view)
+            + ViewOrderingCursorPagination()
+            .get_schema_operation_parameters(view)
+        )
@@ -28,7 +28,7 @@ class IsAuthorOrStaffOrReadOnly(permissions.BasePermission):
                     and (request.user.is_admin
                          or request.user.is_moderator))
         return (request.method in permissions.SAFE_METHODS
-                or obj.author == request.user or is_staff)
+                or obj.author_id == request.user.id or is_staff)
 
 
 class IsAdministratorOrReadOnly(permissions.BasePermission):
@@ -0,0 +1,257 @@
+"""
+Быстрый путь для списков: ответ строится из строк .values() без
+создания моделей и сериализаторов и кодируется orjson (без него,
+например при установке не из requirements.txt, - обычным JSONRenderer).
+Формат ответа совпадает с serializer_class вьюсета.
+Включается настройкой FAST_LIST_RENDERING, только для JSON-ответов.
+
+Параметр ?fields= (SparseFieldsMixin) сокращает поля ответа и колонки
+запроса как в быстром пути, так и в пути через сериализаторы.
+"""
+from operator import itemgetter
+
+from django.conf import settings
+from django.http import Http404
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.response import Response
+
+from reviews.models import GenreTitle, Title
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson. Вывод тот же, что у JSONRenderer с
+    настройками по умолчанию; данные, которые orjson не кодирует
+    (ленивые строки, Decimal и т. п.), отдаются обычному кодировщику.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or self.ensure_ascii
+                or not self.compact or not settings.FAST_LIST_RENDERING
+                or self.get_indent(accepted_media_type,
+                                   renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        try:
+            content = orjson.dumps(data)
+        except TypeError:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        # Как JSONRenderer, экранируем U+2028 и U+2029
+        return content.replace('\u2028'.encode(), b'\\u2028').replace(
+            '\u2029'.encode(), b'\\u2029')
+
+
+class FastList:
+    """
+    Поля ответа в порядке полей сериализатора и колонки, нужные каждому
+    из них. Значение поля - колонка с тем же именем в строке .values()
+    или результат метода get_<поле>(row).
+    """
+    columns = {}
+    # Поля, для которых путь через сериализатор делает prefetch_related
+    prefetch = {}
+
+    # Даты в сериализаторах - DateTimeField с форматом по умолчанию
+    datetime_field = serializers.DateTimeField()
+
+    def get_columns(self, fields):
+        return list(dict.fromkeys(
+            column for field in fields for column in self.columns[field]))
+
+    def trim_queryset(self, queryset, fields, extra_columns=()):
+        """Выбирает только колонки и связи, нужные полям fields."""
+        columns = self.get_columns(fields) + list(extra_columns)
+        relations = {column.split('__')[0] for column in columns
+                     if '__' in column}
+        prefetch = [self.prefetch[field] for field in fields
+                    if field in self.prefetch]
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if relations:
+            queryset = queryset.select_related(*relations)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset.only(*columns)
+
+    def prepare(self, rows, fields):
+        """Загружает данные страницы, которых нет в строках."""
+
+    def represent(self, rows, fields):
+        self.prepare(rows, fields)
+        getters = [
+            (field, getattr(self, f'get_{field}', itemgetter(field)))
+            for field in fields
+        ]
+        return [{field: get(row) for field, get in getters} for row in rows]
+
+    def get_updated_at(self, row):
+        return self.datetime_field.to_representation(row['updated_at'])
+
+
+class SlugItemsFastList(FastList):
+    """Формат CategorySerializer и GenreSerializer."""
+    columns = {'name': ('name',), 'slug': ('slug',)}
+
+
+class TitlesFastList(FastList):
+    """Формат TitleSerializerGet."""
+    columns = {
+        'id': ('id',),
+        'category': ('category__name', 'category__slug'),
+        'genre': ('id',),
+        'rating': ('rating_sum', 'rating_count'),
+        'score_distribution': Title.score_fields(),
+        'reviews_count': ('rating_count',),
+        'name': ('name',),
+        'year': ('year',),
+        'description': ('description',),
+        'updated_at': ('updated_at',),
+    }
+    prefetch = {'genre': 'genre'}
+    scores = [(str(score), Title.score_field(score))
+              for score in Title.SCORES]
+
+    def prepare(self, rows, fields):
+        """Жанры страницы одним запросом, в порядке Genre.Meta.ordering."""
+        if 'genre' not in fields:
+            return
+        self.genres = {row['id']: [] for row in rows}
+        for title_id, name, slug in GenreTitle.objects.filter(
+                title_id__in=list(self.genres)
+        ).order_by('genre__slug').values_list(
+                'title_id', 'genre__name', 'genre__slug'):
+            self.genres[title_id].append({'name': name, 'slug': slug})
+
+    def get_category(self, row):
+        if row['category__slug'] is None:
+            return None
+        return {'name': row['category__name'], 'slug': row['category__slug']}
+
+    def get_genre(self, row):
+        return self.genres[row['id']]
+
+    def get_rating(self, row):
+        if not row['rating_count']:
+            return None
+        return row['rating_sum'] / row['rating_count']
+
+    def get_score_distribution(self, row):
+        return {score: row[field] for score, field in self.scores}
+
+    def get_reviews_count(self, row):
+        return row['rating_count']
+
+
+class ReviewsFastList(FastList):
+    """Формат ReviewSerializer."""
+    columns = {
+        'id': ('id',),
+        'author': ('author__username',),
+        'comments_count': ('comments_count',),
+        'text': ('text',),
+        'score': ('score',),
+        'pub_date': ('pub_date',),
+        'updated_at': ('updated_at',),
+    }
+
+    def get_author(self, row):
+        return row['author__username']
+
+    def get_pub_date(self, row):
+        return self.datetime_field.to_representation(row['pub_date'])
+
+
+class CommentsFastList(ReviewsFastList):
+    """Формат CommentSerializer."""
+    columns = {
+        'id': ('id',),
+        'author': ('author__username',),
+        'text': ('text',),
+        'pub_date': ('pub_date',),
+        'updated_at': ('updated_at',),
+    }
+
+
+class SparseFieldsMixin:
+    """
+    Параметр ?fields=id,name ограничивает поля ответа list и retrieve,
+    а также колонки и связи в запросе. Доступные поля - fast_list_class.
+    """
+    fields_query_param = 'fields'
+    sparse_actions = ('list', 'retrieve')
+
+    def get_requested_fields(self):
+        """Запрошенные поля в порядке сериализатора или None - все."""
+        if not hasattr(self, '_requested_fields'):
+            self._requested_fields = None
+            value = self.request.query_params.get(self.fields_query_param)
+            if value and self.action in self.sparse_actions:
+                requested = {name.strip() for name in value.split(',')}
+                requested.discard('')
+                available = self.fast_list_class.columns
+                unknown = requested - set(available)
+                if unknown:
+                    raise ValidationError({self.fields_query_param: [
+                        f'Неизвестные поля: {", ".join(sorted(unknown))}']})
+                self._requested_fields = [
+                    name for name in available if name in requested]
+        return self._requested_fields
+
+    def get_ordering_columns(self):
+        """Колонки курсорной пагинации, она читает их из объектов."""
+        return [field.lstrip('-')
+                for field in getattr(self, 'cursor_ordering', ())]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_requested_fields()
+        if fields is None:
+            return queryset
+        return self.fast_list_class().trim_queryset(
+            queryset, fields, self.get_ordering_columns())
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fields = self.get_requested_fields()
+        if fields is not None:
+            target = getattr(serializer, 'child', serializer)
+            for name in list(target.fields):
+                if name not in fields:
+                    target.fields.pop(name)
+        return serializer
+
+
+class FastListMixin(SparseFieldsMixin):
+    """list через fast_list_class, если включён быстрый путь."""
+    fast_list_class = None
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+
+    def use_fast_list(self, request):
+        return (settings.FAST_LIST_RENDERING
+                and request.accepted_renderer.format == 'json')
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_fast_list(request):
+            return super().list(request, *args, **kwargs)
+        fast_list = self.fast_list_class()
+        fields = self.get_requested_fields() or list(fast_list.columns)
+        columns = fast_list.get_columns(fields) + self.get_ordering_columns()
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(
+            None).values(*dict.fromkeys(columns))
+        page = self.paginate_queryset(queryset)
+        rows = list(page if page is not None else queryset)
+        # Вложенные списки проверяют родителя, только если страница пуста
+        parent_exists = getattr(self, 'parent_exists', None)
+        if not rows and parent_exists is not None and not parent_exists():
+            raise Http404
+        data = fast_list.represent(rows, fields)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
@@ -0,0 +1,192 @@
+"""
+Чтение с реплик базы данных.
+
+ReplicaMiddleware направляет запросы безопасных методов к вьюсетам на
+одну из реплик REPLICA_DATABASES, ReplicaRouter отдаёт её для чтения
+до первой записи в запросе. Клиент, который только что писал (по
+заголовку Authorization, без него - по IP), REPLICA_STICKY_SECONDS
+читает с основной базы и видит свои изменения.
+
+Реплика, отстающая больше чем на REPLICA_MAX_LAG секунд или недоступная,
+не используется до следующей проверки (не чаще раза в
+REPLICA_CHECK_INTERVAL секунд). Если реплика отказала во время запроса,
+он повторяется на основной базе.
+
+Кэш ответов (api/cache.py) заполняется только чтением с основной базы,
+а закреплённые за ней клиенты читают мимо кэша: иначе ответ отстающей
+реплики жил бы в кэше RESPONSE_CACHE_TIMEOUT.
+"""
+import hashlib
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+# Реплика текущего запроса и признак записи в нём
+_state = threading.local()
+
+LAG_SQL = {
+    # Реплика, воспроизведшая весь полученный WAL, не отстаёт, даже если
+    # последняя транзакция на основной базе была давно
+    'postgresql': (
+        'SELECT CASE WHEN NOT pg_is_in_recovery() '
+        'OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+        'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) '
+        'END'),
+}
+
+
+def replica_lag(alias):
+    """Отставание реплики в секундах; 0, если его нельзя измерить."""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        cursor.execute(LAG_SQL.get(connection.vendor, 'SELECT 0'))
+        lag = cursor.fetchone()[0]
+    return float(lag or 0)
+
+
+def check_replica(alias):
+    try:
+        return replica_lag(alias) <= settings.REPLICA_MAX_LAG
+    except DatabaseError:
+        connections[alias].close()
+        return False
+
+
+class ReplicaHealth:
+    """Результаты проверок реплик, общие для потоков процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked = {}
+        self._healthy = {}
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        with self._lock:
+            due = (alias not in self._checked or now - self._checked[alias]
+                   >= settings.REPLICA_CHECK_INTERVAL)
+            if due:
+                # Проверяет один поток, остальные видят прошлый результат
+                self._checked[alias] = now
+        if due:
+            healthy = check_replica(alias)
+            with self._lock:
+                self._healthy[alias] = healthy
+        return self._healthy.get(alias, False)
+
+    def mark_failed(self, alias):
+        with self._lock:
+            self._healthy[alias] = False
+            self._checked[alias] = time.monotonic()
+
+    def clear(self):
+        with self._lock:
+            self._checked.clear()
+            self._healthy.clear()
+
+
+health = ReplicaHealth()
+
+
+def choose_replica():
+    """Случайная исправная реплика или None."""
+    replicas = list(settings.REPLICA_DATABASES)
+    random.shuffle(replicas)
+    for alias in replicas:
+        if health.is_healthy(alias):
+            return alias
+    return None
+
+
+def pin_key(request):
+    client = (request.META.get('HTTP_AUTHORIZATION')
+              or request.META.get('REMOTE_ADDR', ''))
+    return 'replica:pinned:' + hashlib.sha1(client.encode()).hexdigest()
+
+
+def pin_to_primary(request):
+    """Клиент читает с основной базы REPLICA_STICKY_SECONDS."""
+    cache.set(pin_key(request), True, timeout=settings.REPLICA_STICKY_SECONDS)
+
+
+def is_pinned(request):
+    return cache.get(pin_key(request), False)
+
+
+def is_pinned_request(request):
+    """Клиент запроса закреплён за основной базой (см. process_view)."""
+    return getattr(request, 'replica_pinned', False)
+
+
+@contextmanager
+def primary_reads():
+    """Чтение с основной базы внутри блока."""
+    replica = getattr(_state, 'replica', None)
+    _state.replica = None
+    try:
+        yield
+    finally:
+        _state.replica = replica
+
+
+class ReplicaRouter:
+    """Чтение с реплики текущего запроса, запись - в основную базу."""
+
+    def db_for_read(self, model, **hints):
+        if getattr(_state, 'wrote', False):
+            return DEFAULT_DB_ALIAS
+        return getattr(_state, 'replica', None) or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # После записи запрос читает свои изменения с основной базы
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+class ReplicaMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.replica = None
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+            if _state.wrote or (request.method not in SAFE_METHODS
+                                and response.status_code < 400):
+                pin_to_primary(request)
+            return response
+        finally:
+            _state.replica = None
+            _state.wrote = False
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Вьюсеты DRF: as_view() сохраняет сопоставление методов действиям
+        if (not settings.REPLICA_DATABASES
+                or request.method not in SAFE_METHODS
+                or getattr(view_func, 'actions', None) is None):
+            return
+        request.replica_pinned = is_pinned(request)
+        if request.replica_pinned:
+            return
+        _state.replica = choose_replica()
+        request.replica_view = (view_func, view_args, view_kwargs)
+
+    def process_exception(self, request, exception):
+        alias = getattr(_state, 'replica', None)
+        if alias is None or not isinstance(exception, DatabaseError):
+            return None
+        health.mark_failed(alias)
+        _state.replica = None
+        view_func, view_args, view_kwargs = request.replica_view
+        return view_func(request, *view_args, **view_kwargs)
@@ -5,7 +5,8 @@ from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.validators import UniqueValidator
 
-from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.models import (Category, Comment, Genre, GenreTitle,
+                            LeaderboardEntry, Review, Title)
 from users.models import User
 
 
@@ -61,6 +62,7 @@ class ReviewSerializer(serializers.ModelSerializer):
         default=serializers.CurrentUserDefault()
     )
     title = serializers.HiddenField(default=None)
+    comments_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Review
@@ -80,7 +82,7 @@ class ReviewSerializer(serializers.ModelSerializer):
         title_id = request.parser_context['kwargs']['title_id']
         title = get_object_or_404(Title, pk=title_id)
         if (request.method == 'POST'
-                and title.reviews.filter(author=request.user).exists()):
+                and title.reviews.filter(author_id=request.user.id).exists()):
             raise ValidationError('На произведение можно'
                                   ' оставить только 1 отзыв')
         return data
@@ -112,17 +114,48 @@ class GenreSerializer(serializers.ModelSerializer):
         model = Genre
 
 
+class GenreSlugsField(serializers.ListField):
+    """Жанры по slug-ам: все slug-и проверяются одним запросом."""
+    child = serializers.SlugField()
+
+    def to_internal_value(self, data):
+        slugs = list(dict.fromkeys(super().to_internal_value(data)))
+        genres = Genre.objects.in_bulk(slugs, field_name='slug')
+        unknown = [slug for slug in slugs if slug not in genres]
+        if unknown:
+            raise ValidationError(
+                f'Жанры не найдены: {", ".join(unknown)}')
+        return [genres[slug] for slug in slugs]
+
+    def to_representation(self, value):
+        return [genre.slug for genre in value.all()]
+
+
 class TitleSerializer(serializers.ModelSerializer):
     """Title-Сериализатор для dont_safe методов"""
     category = serializers.SlugRelatedField(slug_field='slug',
                                             queryset=Category.objects.all())
-    genre = serializers.SlugRelatedField(many=True, slug_field='slug',
-                                         queryset=Genre.objects.all())
+    genre = GenreSlugsField()
 
     class Meta:
-        fields = '__all__'
+        exclude = ('rating_sum', 'rating_count') + Title.score_fields()
         model = Title
 
+    def create(self, validated_data):
+        genres = validated_data.pop('genre', None)
+        title = super().create(validated_data)
+        if genres is not None:
+            GenreTitle.set_genres({title.pk: {genre.pk for genre in genres}},
+                                  touch_titles=False)
+        return title
+
+    def update(self, instance, validated_data):
+        genres = validated_data.pop('genre', None)
+        title = super().update(instance, validated_data)
+        if genres is not None:
+            GenreTitle.set_genres({title.pk: {genre.pk for genre in genres}})
+        return title
+
     def validate_year(self, value):
         """Проверка на указание года больше текущего."""
         if value > dt.datetime.now().year:
@@ -135,8 +168,60 @@ class TitleSerializerGet(serializers.ModelSerializer):
 
     category = CategorySerializer(read_only=True)
     genre = GenreSerializer(many=True, read_only=True)
-    rating = serializers.FloatField()
+    rating = serializers.FloatField(read_only=True)
+    score_distribution = serializers.DictField(
+        child=serializers.IntegerField(), read_only=True)
+    reviews_count = serializers.IntegerField(
+        source='rating_count', read_only=True)
 
     class Meta:
         model = Title
-        fields = '__all__'
+        exclude = ('rating_sum', 'rating_count') + Title.score_fields()
+
+
+class TitleScoresSerializer(serializers.ModelSerializer):
+    """Распределение оценок произведения."""
+    score_distribution = serializers.DictField(
+        child=serializers.IntegerField(), read_only=True)
+
+    class Meta:
+        model = Title
+        fields = ('id', 'rating_count', 'score_distribution')
+
+
+class LeaderboardEntrySerializer(serializers.ModelSerializer):
+    """Место произведения в рейтинге лучших."""
+    title = TitleSerializerGet(read_only=True)
+
+    class Meta:
+        model = LeaderboardEntry
+        fields = ('position', 'rating', 'rating_count', 'title')
+
+
+class SlugItemBulkSerializer(serializers.Serializer):
+    """Элемент массовой записи жанров и категорий."""
+    name = serializers.CharField(max_length=256)
+    slug = serializers.SlugField(max_length=50)
+
+
+class TitleBulkSerializer(serializers.Serializer):
+    """Элемент массовой записи произведений, slug-и проверяются пакетом."""
+    id = serializers.IntegerField(required=False)
+    name = serializers.CharField(max_length=256)
+    year = serializers.IntegerField(min_value=0)
+    description = serializers.CharField(
+        required=False, allow_blank=True, allow_null=True)
+    category = serializers.SlugField(required=False, allow_null=True)
+    genre = serializers.ListField(child=serializers.SlugField(),
+                                  required=False)
+
+    def validate_year(self, value):
+        return TitleSerializer.validate_year(self, value)
+
+
+class ReviewBulkSerializer(serializers.Serializer):
+    """Элемент массовой записи отзывов, авторы проверяются пакетом."""
+    id = serializers.IntegerField(required=False)
+    author = serializers.CharField(max_length=150)
+    text = serializers.CharField()
+    score = serializers.IntegerField(min_value=1, max_value=10)
@@ -0,0 +1,36 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from reviews.models import Category, Genre, GenreTitle, Review, Title
+from users.models import User
+
+from .authentication import invalidate_user
+from .cache import invalidate_model
+
+CACHED_MODELS = (Title, Genre, Category, GenreTitle, Review)
+
+
+def invalidate_on_commit(sender, **kwargs):
+    transaction.on_commit(partial(invalidate_model, sender))
+
+
+for model in CACHED_MODELS:
+    post_save.connect(invalidate_on_commit, sender=model,
+                      dispatch_uid=f'response_cache_save_{model.__name__}')
+    post_delete.connect(invalidate_on_commit, sender=model,
+                        dispatch_uid=f'response_cache_delete_{model.__name__}')
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate_on_commit(sender)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    transaction.on_commit(partial(invalidate_user, instance.pk))
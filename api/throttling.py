@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+class TokenBucketStore:
+    """
+    Корзины токенов в памяти процесса. Число корзин ограничено:
+    вытесняются давно не использованные.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, rate):
+        """
+        Забирает токен из корзины key (capacity токенов, пополнение
+        rate токенов в секунду). Возвращает 0 или сколько секунд ждать
+        следующего токена.
+        """
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._data.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            self._data[key] = (tokens - 1 if allowed else tokens, now)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+        return 0 if allowed else (1 - tokens) / rate
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+throttle_buckets = TokenBucketStore(settings.AUTH_THROTTLE_BUCKETS)
+
+
+def parse_rate(rate):
+    """'5/min' -> (5, 60), как в throttling DRF."""
+    num, period = rate.split('/')
+    return int(num), DURATIONS[period[0]]
+
+
+class AuthRateThrottle(BaseThrottle):
+    """
+    Ограничение запросов к регистрации и выдаче токена по IP
+    (<scope>_ip) и по username из тела запроса (<scope>_username).
+    Частоты - в DEFAULT_THROTTLE_RATES. IP проверяется первым, поэтому
+    отклонённый по нему запрос не разбирает тело.
+    """
+    scope = None
+
+    def get_limit(self, kind):
+        """(ёмкость корзины, токенов в секунду) или None - без ограничения."""
+        rate = settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'].get(
+            f'{self.scope}_{kind}')
+        if rate is None:
+            return None
+        num_requests, duration = parse_rate(rate)
+        return num_requests, num_requests / duration
+
+    def consume(self, kind, ident):
+        limit = self.get_limit(kind)
+        if limit is None:
+            return 0
+        return throttle_buckets.consume(f'{self.scope}:{kind}:{ident}',
+                                        *limit)
+
+    def allow_request(self, request, view):
+        self.wait_time = self.consume('ip', self.get_ident(request))
+        if self.wait_time:
+            return False
+        data = request.data
+        username = data.get('username') if hasattr(data, 'get') else None
+        if isinstance(username, str) and username:
+            self.wait_time = self.consume('username', username)
+        return not self.wait_time
+
+    def wait(self):
+        return self.wait_time
+
+
+class SignUpThrottle(AuthRateThrottle):
+    scope = 'signup'
+
+
+class GetTokenThrottle(AuthRateThrottle):
+    scope = 'token'
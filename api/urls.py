@@ -1,7 +1,7 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import (CategoryViewSet, CommentViewSet, GenreViewSet,
+from .views import (CategoryViewSet, CommentViewSet, Export, GenreViewSet,
                     ReviewViewSet, TitleViewSet, UserViewSet)
 
 router = DefaultRouter()
@@ -23,5 +23,7 @@ router.register(
 
 urlpatterns = [
     path('auth/', include('users.urls')),
+    path('export/<slug:dataset>.<slug:output>', Export.as_view(),
+         name='export'),
     path('', include(router.urls)),
 ]
@@ -1,27 +1,44 @@
+from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
-from django.db.models import Avg
+from django.db import transaction
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import mixins, permissions, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import SearchFilter
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import AccessToken
 
 from api_yamdb.settings import DEFAULT_FROM_EMAIL
-from reviews.models import Category, Genre, Review, Title
-from users.models import User
+from reviews import leaderboards
+from reviews.export import DATASETS, export_chunks
+from reviews.models import (Category, Comment, Genre, LeaderboardEntry, Review,
+                            Title)
+from users.models import OutgoingEmail, User
 
-from .filters import TitleFilter
+from .authentication import RoleAccessToken
+from .bulk import (BulkWriteMixin, ReviewBulkHandler, SlugModelBulkHandler,
+                   TitleBulkHandler)
+from .cache import CachedResponseMixin, ConditionalGetMixin
+from .filters import FullTextSearchFilter, TitleFilter
+from .metrics import (collect, collect_pools, render_pool_metrics,
+                      render_prometheus)
+from .mixins import ParentObjectMixin
+from .pagination import PageNumberOrCursorPagination
 from .permissions import (IsAdministrator, IsAdministratorOrReadOnly,
                           IsAuthorOrStaffOrReadOnly)
+from .rendering import (CommentsFastList, FastListMixin, ReviewsFastList,
+                        SlugItemsFastList, TitlesFastList)
 from .serializers import (CategorySerializer, CommentSerializer,
-                          GenreSerializer, GetTokenSerializer, MeSerialiser,
-                          ReviewSerializer, SignUpSerializer, TitleSerializer,
+                          GenreSerializer, GetTokenSerializer,
+                          LeaderboardEntrySerializer, MeSerialiser,
+                          ReviewSerializer, SignUpSerializer,
+                          TitleScoresSerializer, TitleSerializer,
                           TitleSerializerGet, UserSerializer)
+from .throttling import GetTokenThrottle, SignUpThrottle
 
 
 class CreateListDestroyViewSet(mixins.CreateModelMixin,
@@ -33,6 +50,27 @@ class CreateListDestroyViewSet(mixins.CreateModelMixin,
     lookup_fields = ('slug',)
 
 
+class NestedListMixin(ParentObjectMixin):
+    """
+    Список вложенных объектов без отдельного запроса родителя:
+    существование родителя проверяется, только если список пуст.
+    """
+
+    def parent_exists(self):
+        return self.get_parent_queryset().exists()
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        objects = page if page is not None else list(queryset)
+        if not objects and not self.parent_exists():
+            raise Http404
+        serializer = self.get_serializer(objects, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
+
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -67,25 +105,28 @@ class SignUp(APIView):
     Регистрация по юзернейму и емейлу
     """
     permission_classes = (permissions.AllowAny,)
+    throttle_classes = (SignUpThrottle,)
 
     def post(self, request):
         serializer = SignUpSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         username = serializer.data.get('username')
         email = serializer.data.get('email')
-        user = User.objects.create(
-            username=username,
-            email=email
-        )
-        confirmation_code = default_token_generator.make_token(user)
-        subject = 'Подтверждение регистрации'
-
-        send_mail(
-            subject=subject,
-            message=(f'{subject} '
-                     f'\nВаш confirmation_code: {confirmation_code}'),
-            from_email=DEFAULT_FROM_EMAIL,
-            recipient_list=[email])
+        # Пользователь не остаётся без письма с кодом
+        with transaction.atomic():
+            user = User.objects.create(
+                username=username,
+                email=email
+            )
+            confirmation_code = default_token_generator.make_token(user)
+            subject = 'Подтверждение регистрации'
+
+            OutgoingEmail.objects.create(
+                subject=subject,
+                body=(f'{subject} '
+                      f'\nВаш confirmation_code: {confirmation_code}'),
+                from_email=DEFAULT_FROM_EMAIL,
+                to=email)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -94,6 +135,7 @@ class GetToken(APIView):
     Получение токена в обмен на код доступа
     """
     permission_classes = (permissions.AllowAny,)
+    throttle_classes = (GetTokenThrottle,)
 
     def post(self, request):
         serializer = GetTokenSerializer(data=request.data)
@@ -104,7 +146,7 @@ class GetToken(APIView):
         )
         confirmation_code = serializer.data.get('confirmation_code')
         if default_token_generator.check_token(user, confirmation_code):
-            token = AccessToken.for_user(user)
+            token = RoleAccessToken.for_user(user)
             return Response(
                 {'token': str(token)}, status=status.HTTP_200_OK
             )
@@ -112,36 +154,86 @@ class GetToken(APIView):
                         status=status.HTTP_400_BAD_REQUEST)
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class Metrics(APIView):
+    """
+    Метрики запросов в текстовом формате Prometheus, только для админа
+    """
+    permission_classes = (IsAuthenticated, IsAdministrator,)
+
+    def get(self, request):
+        return HttpResponse(
+            render_prometheus(collect()) + render_pool_metrics(
+                collect_pools()),
+            content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class Export(APIView):
+    """
+    Выгрузка набора данных целиком потоком CSV или JSONL, только для админа
+    """
+    permission_classes = (IsAuthenticated, IsAdministrator,)
+    content_types = {
+        'csv': 'text/csv; charset=utf-8',
+        'jsonl': 'application/x-ndjson; charset=utf-8',
+    }
+
+    def perform_content_negotiation(self, request, force=False):
+        # Формат ответа задаёт расширение в пути, а не Accept
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, dataset, output):
+        if dataset not in DATASETS or output not in self.content_types:
+            raise Http404
+        response = StreamingHttpResponse(
+            export_chunks(dataset, output, settings.EXPORT_CHUNK_SIZE),
+            content_type=self.content_types[output])
+        response['Content-Disposition'] = (
+            f'attachment; filename="{dataset}.{output}"')
+        return response
+
+
+class ReviewViewSet(ConditionalGetMixin, FastListMixin, NestedListMixin,
+                    BulkWriteMixin, viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
+    fast_list_class = ReviewsFastList
+    bulk_handler_class = ReviewBulkHandler
     permission_classes = (IsAuthorOrStaffOrReadOnly,)
-    filter_backends = (DjangoFilterBackend, SearchFilter,)
+    pagination_class = PageNumberOrCursorPagination
+    cursor_ordering = ('-pub_date', '-id')
+    filter_backends = (DjangoFilterBackend, FullTextSearchFilter,)
     filterset_fields = ('author', 'text', 'title',)
-    search_fields = ('author', 'text', 'title',)
+    search_extra_fields = ('author__username',)
+    parent_model = Title
+    parent_lookup_kwargs = {'pk': 'title_id'}
 
     def get_queryset(self):
-        title = get_object_or_404(Title, pk=self.kwargs.get('title_id'))
-        return title.reviews.all()
+        return Review.objects.filter(
+            title_id=self.kwargs.get('title_id')
+        ).select_related('author')
 
     def perform_create(self, serializer):
         title = get_object_or_404(Title, pk=self.kwargs.get('title_id'))
-        serializer.save(author=self.request.user, title=title)
+        serializer.save(author_id=self.request.user.id, title=title)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ConditionalGetMixin, FastListMixin, NestedListMixin,
+                     viewsets.ModelViewSet):
     serializer_class = CommentSerializer
+    fast_list_class = CommentsFastList
     permission_classes = (IsAuthorOrStaffOrReadOnly,)
+    pagination_class = PageNumberOrCursorPagination
+    cursor_ordering = ('-pub_date', '-id')
     filter_backends = (DjangoFilterBackend, SearchFilter,)
     filterset_fields = ('author', 'text', 'review',)
-    search_fields = ('author', 'text', 'review',)
+    search_fields = ('author__username', 'text',)
+    parent_model = Review
+    parent_lookup_kwargs = {'title_id': 'title_id', 'pk': 'review_id'}
 
     def get_queryset(self):
-        review = get_object_or_404(
-            Review,
-            title__id=self.kwargs.get('title_id'),
-            pk=self.kwargs.get('review_id')
-        )
-        return review.comments.all()
+        return Comment.objects.filter(
+            review_id=self.kwargs.get('review_id'),
+            review__title_id=self.kwargs.get('title_id')
+        ).select_related('author')
 
     def perform_create(self, serializer):
         review = get_object_or_404(
@@ -149,31 +241,81 @@ class CommentViewSet(viewsets.ModelViewSet):
             title__id=self.kwargs.get('title_id'),
             pk=self.kwargs.get('review_id')
         )
-        serializer.save(author=self.request.user, review=review)
+        serializer.save(author_id=self.request.user.id, review=review)
 
 
-class TitleViewSet(viewsets.ModelViewSet):
-    queryset = Title.objects.all().annotate(
-        rating=Avg("reviews__score")).order_by('name')
+class TitleViewSet(CachedResponseMixin, FastListMixin, BulkWriteMixin,
+                   viewsets.ModelViewSet):
+    queryset = Title.objects.select_related('category').prefetch_related(
+        'genre').order_by('name')
     permission_classes = (IsAdministratorOrReadOnly,)
-    filter_backends = (DjangoFilterBackend,)
+    pagination_class = PageNumberOrCursorPagination
+    cursor_ordering = ('name', 'id')
+    cache_namespace = 'titles'
+    bulk_handler_class = TitleBulkHandler
+    fast_list_class = TitlesFastList
+    filter_backends = (DjangoFilterBackend, FullTextSearchFilter,)
     filterset_class = TitleFilter
-    search_fields = ('name',)
 
     def get_serializer_class(self):
         if self.action in ['list', 'retrieve']:
             return TitleSerializerGet
         return TitleSerializer
 
+    @action(detail=True, methods=['get'])
+    def scores(self, request, pk=None):
+        title = get_object_or_404(
+            Title.objects.only('pk', 'rating_count', *Title.score_fields()),
+            pk=pk)
+        return Response(TitleScoresSerializer(title).data)
+
+    @action(detail=False, methods=['get'])
+    def top(self, request):
+        """
+        Лучшие произведения из заранее рассчитанного рейтинга:
+        общего или по ?genre=<slug> либо ?category=<slug>.
+        """
+        genre = request.query_params.get('genre')
+        category = request.query_params.get('category')
+        if genre and category:
+            raise ValidationError(
+                'Укажите только один из параметров genre и category')
+        if genre:
+            board = leaderboards.genre_board(genre)
+        elif category:
+            board = leaderboards.category_board(category)
+        else:
+            board = leaderboards.OVERALL
+        try:
+            limit = int(request.query_params.get(
+                'limit', settings.LEADERBOARD_SIZE))
+        except ValueError:
+            raise ValidationError({'limit': 'Ожидается целое число'})
+        limit = max(1, min(limit, settings.LEADERBOARD_SIZE))
+
+        entries = LeaderboardEntry.objects.filter(
+            board=board
+        ).select_related('title__category').prefetch_related(
+            'title__genre').order_by('position')[:limit]
+        return Response(LeaderboardEntrySerializer(entries, many=True).data)
+
 
-class CategoryViewSet(CreateListDestroyViewSet):
+class CategoryViewSet(CachedResponseMixin, FastListMixin, BulkWriteMixin,
+                      CreateListDestroyViewSet):
+    cache_namespace = 'categories'
+    bulk_handler_class = SlugModelBulkHandler
+    fast_list_class = SlugItemsFastList
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = (IsAdministratorOrReadOnly,)
     lookup_field = 'slug'
 
 
-class GenreViewSet(CreateListDestroyViewSet):
+class GenreViewSet(CachedResponseMixin, FastListMixin, BulkWriteMixin,
+                   CreateListDestroyViewSet):
+    cache_namespace = 'genres'
+    bulk_handler_class = SlugModelBulkHandler
+    fast_list_class = SlugItemsFastList
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
     permission_classes = (IsAdministratorOrReadOnly,)
@@ -7,10 +7,109 @@ For more information on this file, see
 https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
 """
 
+import asyncio
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-from django.core.asgi import get_asgi_application
+import django
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.base import BaseHandler
+from django.db import close_old_connections
+from django.urls import Resolver404, get_resolver, set_urlconf
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
 
-application = get_asgi_application()
+django.setup(set_prefix=False)
+
+
+class ReadPoolASGIHandler(ASGIHandler):
+    """
+    Выполняет чтение произведений, отзывов и комментариев в отдельном
+    пуле потоков размера ASGI_READ_POOL_SIZE, не занимая общий пул
+    для остальных запросов. Ответы формируют те же вьюсеты DRF.
+    """
+    READ_VIEWS = ('TitleViewSet', 'ReviewViewSet', 'CommentViewSet')
+    READ_ACTIONS = ('list', 'retrieve', 'scores', 'top')
+
+    def __init__(self):
+        super().__init__()
+        self.read_executor = ThreadPoolExecutor(
+            max_workers=settings.ASGI_READ_POOL_SIZE,
+            thread_name_prefix='yamdb-read',
+        )
+
+    def is_read_request(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return False
+        try:
+            match = get_resolver().resolve(request.path_info)
+        except Resolver404:
+            return False
+        view_class = getattr(match.func, 'cls', None)
+        actions = getattr(match.func, 'actions', None) or {}
+        return (view_class is not None
+                and view_class.__name__ in self.READ_VIEWS
+                and actions.get(request.method.lower()) in self.READ_ACTIONS)
+
+    def get_response_in_thread(self, request):
+        try:
+            return BaseHandler.get_response(self, request)
+        finally:
+            set_urlconf(None)
+            # Соединения потоков пула закрываются так же, как после
+            # обычного запроса, с учётом CONN_MAX_AGE
+            close_old_connections()
+
+    async def send_response(self, response, send):
+        """
+        Потоковый ответ (выгрузка) читает базу, пока отдаётся, а в цикле
+        событий ORM запрещён. Куски берутся в отдельном потоке, всегда
+        одном: соединение с базой и серверный курсор привязаны к потоку.
+        response.close() там же закрывает соединения потока (сигнал
+        request_finished).
+        """
+        if not response.streaming:
+            return await super().send_response(response, send)
+        headers = [
+            (header.encode('ascii'), value.encode('latin1'))
+            for header, value in response.items()
+        ] + [
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+            for cookie in response.cookies.values()
+        ]
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+        loop = asyncio.get_event_loop()
+        executor = ThreadPoolExecutor(max_workers=1,
+                                      thread_name_prefix='yamdb-stream')
+        parts, end = iter(response), object()
+        try:
+            while True:
+                part = await loop.run_in_executor(executor, next, parts, end)
+                if part is end:
+                    break
+                for chunk, _ in self.chunk_bytes(part):
+                    await send({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+            await send({'type': 'http.response.body'})
+        finally:
+            await loop.run_in_executor(executor, response.close)
+            executor.shutdown(wait=False)
+
+    async def get_response(self, request):
+        if self.is_read_request(request):
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(
+                self.read_executor, self.get_response_in_thread, request)
+        return await sync_to_async(self.get_response_in_thread)(request)
+
+
+application = ReadPoolASGIHandler()
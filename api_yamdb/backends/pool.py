@@ -0,0 +1,232 @@
+"""
+Пул соединений с базой данных на процесс (воркер gunicorn).
+
+Бэкенды api_yamdb.backends.postgresql и api_yamdb.backends.sqlite3 берут
+соединение из пула при подключении и возвращают его при закрытии, то
+есть в конце каждого запроса (CONN_MAX_AGE = 0). Параметры пула задаются
+ключом POOL в настройках базы (DATABASES):
+
+    SIZE              наибольшее число соединений процесса;
+    TIMEOUT           сколько секунд ждать свободного соединения;
+    MAX_LIFETIME      через сколько секунд соединение закрывается;
+    CHECK_IDLE_AFTER  соединение, простоявшее дольше (в секундах),
+                      проверяется запросом перед выдачей; 0 - всегда.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from django.db import DatabaseError
+
+DEFAULTS = {
+    'SIZE': 10,
+    'TIMEOUT': 10,
+    'MAX_LIFETIME': 1800,
+    'CHECK_IDLE_AFTER': 0,
+}
+
+
+class PoolTimeout(DatabaseError):
+    """Свободное соединение не появилось за TIMEOUT секунд."""
+
+
+class ConnectionPool:
+    """
+    Не больше size соединений; свободные выдаются в порядке LIFO, чтобы
+    лишние дольше простаивали и закрывались по MAX_LIFETIME.
+    """
+
+    def __init__(self, size, timeout, max_lifetime, check_idle_after):
+        self.size = size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check_idle_after = check_idle_after
+        self._condition = threading.Condition()
+        # (соединение, время открытия, время возврата)
+        self._idle = deque()
+        # Время открытия соединений пула по id()
+        self._created = {}
+        self._opening = 0
+        self.stats = dict.fromkeys((
+            'checkouts', 'waits', 'timeouts', 'created', 'expired',
+            'health_check_failures', 'discarded'), 0)
+
+    def expired(self, created, now):
+        return now - created >= self.max_lifetime
+
+    def acquire(self, connect, check):
+        """
+        Свободное соединение или новое через connect(); соединения,
+        не прошедшие check(connection), закрываются.
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            connection, idle_since = self._take(deadline)
+            if connection is None:
+                return self._open(connect)
+            if (time.monotonic() - idle_since < self.check_idle_after
+                    or check(connection)):
+                return connection
+            self.discard(connection, 'health_check_failures')
+
+    def _take(self, deadline):
+        """
+        Свободное соединение и время его возврата или (None, None),
+        если вместо него можно открыть новое.
+        """
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                while self._idle:
+                    connection, created, idle_since = self._idle.pop()
+                    if self.expired(created, now):
+                        self.stats['expired'] += 1
+                        self._close(connection)
+                        continue
+                    self.stats['checkouts'] += 1
+                    return connection, idle_since
+                if len(self._created) + self._opening < self.size:
+                    # Место занимается до открытия соединения
+                    self._opening += 1
+                    self.stats['checkouts'] += 1
+                    return None, None
+                remaining = deadline - now
+                if remaining <= 0:
+                    self.stats['timeouts'] += 1
+                    raise PoolTimeout(
+                        f'Нет свободных соединений за {self.timeout} с')
+                self.stats['waits'] += 1
+                self._condition.wait(remaining)
+
+    def _open(self, connect):
+        try:
+            connection = connect()
+        except Exception:
+            with self._condition:
+                self._opening -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._opening -= 1
+            self._created[id(connection)] = time.monotonic()
+            self.stats['created'] += 1
+        return connection
+
+    def release(self, connection, reset):
+        """
+        Возвращает соединение в пул, если reset(connection) вернул True
+        и срок жизни не истёк, иначе закрывает его.
+        """
+        created = self._created.get(id(connection))
+        now = time.monotonic()
+        if created is None:
+            self.discard(connection)
+        elif self.expired(created, now):
+            self.discard(connection, 'expired')
+        elif not reset(connection):
+            self.discard(connection, 'discarded')
+        else:
+            with self._condition:
+                self._idle.append((connection, created, now))
+                self._condition.notify()
+
+    def discard(self, connection, reason=None):
+        """Закрывает соединение; reason - счётчик в stats."""
+        with self._condition:
+            if reason is not None:
+                self.stats[reason] += 1
+            self._close(connection)
+            self._condition.notify()
+
+    def _close(self, connection):
+        self._created.pop(id(connection), None)
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close_idle(self):
+        with self._condition:
+            while self._idle:
+                self._close(self._idle.pop()[0])
+
+    def get_stats(self):
+        with self._condition:
+            return dict(
+                self.stats, size=self.size, open=len(self._created),
+                idle=len(self._idle),
+                in_use=len(self._created) - len(self._idle))
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict):
+    """Пул базы alias текущего процесса."""
+    key = (os.getpid(), alias)
+    with _pools_lock:
+        if key not in _pools:
+            options = dict(DEFAULTS, **settings_dict.get('POOL', {}))
+            _pools[key] = ConnectionPool(
+                options['SIZE'], options['TIMEOUT'], options['MAX_LIFETIME'],
+                options['CHECK_IDLE_AFTER'])
+        return _pools[key]
+
+
+def pool_stats():
+    """Состояние пулов процесса по псевдонимам баз."""
+    pid = os.getpid()
+    with _pools_lock:
+        pools = [(alias, pool) for (owner, alias), pool in _pools.items()
+                 if owner == pid]
+    return {alias: pool.get_stats() for alias, pool in pools}
+
+
+def close_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_idle()
+
+
+class PooledDatabaseWrapperMixin:
+    """Подключение и закрытие бэкенда через пул соединений."""
+
+    def get_pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        return self.get_pool().acquire(
+            lambda: super(PooledDatabaseWrapperMixin, self).get_new_connection(
+                conn_params),
+            self.check_pooled_connection)
+
+    def check_pooled_connection(self, connection):
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute('SELECT 1')
+            finally:
+                cursor.close()
+        except self.Database.Error:
+            return False
+        return True
+
+    def reset_pooled_connection(self, connection):
+        """Откатывает незавершённую транзакцию перед возвратом в пул."""
+        try:
+            connection.rollback()
+        except self.Database.Error:
+            return False
+        return True
+
+    def _close(self):
+        pool = self.get_pool()
+        if self.in_atomic_block:
+            # Django ещё будет обращаться к соединению до выхода из atomic
+            pool.discard(self.connection)
+            return
+        pool.release(self.connection, self.reset_pooled_connection)
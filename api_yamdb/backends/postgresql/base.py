@@ -0,0 +1,14 @@
+from django.db.backends.postgresql import base
+
+from api_yamdb.backends.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        # Базовый бэкенд запоминает уровень изоляции только для новых
+        # соединений
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level)
+        return connection
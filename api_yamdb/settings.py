@@ -45,11 +45,13 @@ INSTALLED_APPS = [
     'django_filters',
     'django_extensions',
     'users',
-    'api',
-    'reviews',
+    'api.apps.ApiConfig',
+    'reviews.apps.ReviewsConfig',
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,6 +82,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
+# Число потоков для запросов чтения при запуске через ASGI (api_yamdb/asgi.py)
+ASGI_READ_POOL_SIZE = int(os.environ.get('ASGI_READ_POOL_SIZE', 64))
+
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
 
@@ -92,9 +97,96 @@ DATABASES = {
         'PASSWORD': os.environ.get('POSTGRES_PASSWORD', default='db_pass'),
         'HOST': os.environ.get('DB_HOST', default='127.0.0.1'),
         'PORT': os.environ.get('DB_PORT', default='5432'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', default=0)),
     }
 }
 
+# Пул соединений на процесс (api_yamdb/backends/pool.py), DB_POOL_SIZE=0 -
+# без пула. Соединение возвращается в пул в конце каждого запроса.
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', default=0))
+POOLED_ENGINES = {
+    'django.db.backends.postgresql': 'api_yamdb.backends.postgresql',
+    'django.db.backends.sqlite3': 'api_yamdb.backends.sqlite3',
+}
+if DB_POOL_SIZE:
+    DATABASES['default'].update(
+        ENGINE=POOLED_ENGINES[DATABASES['default']['ENGINE']],
+        CONN_MAX_AGE=0,
+        POOL={
+            'SIZE': DB_POOL_SIZE,
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', default=10)),
+            'MAX_LIFETIME': float(
+                os.environ.get('DB_POOL_MAX_LIFETIME', default=1800)),
+            'CHECK_IDLE_AFTER': float(
+                os.environ.get('DB_POOL_CHECK_IDLE_AFTER', default=0)),
+        },
+    )
+
+
+def replica_databases(primary, addresses):
+    """
+    Настройки реплик: адреса host[:port] с теми же базой и учётными
+    данными, что у основной базы; для SQLite - имена файлов.
+    """
+    replicas = {}
+    for number, address in enumerate(filter(None, addresses.split(',')), 1):
+        replica = dict(primary)
+        if replica['ENGINE'].endswith('sqlite3'):
+            replica['NAME'] = address
+        else:
+            host, _, port = address.partition(':')
+            replica.update(HOST=host, PORT=port or primary['PORT'])
+        replicas[f'replica_{number}'] = replica
+    return replicas
+
+
+# Реплики для чтения (api/replicas.py): DB_REPLICA_HOSTS=host1,host2:5433
+DATABASES.update(replica_databases(
+    DATABASES['default'], os.environ.get('DB_REPLICA_HOSTS', default='')))
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+# Сколько секунд клиент после записи читает с основной базы
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+# Реплика с большим отставанием (в секундах) не используется
+REPLICA_MAX_LAG = float(os.environ.get('REPLICA_MAX_LAG', 5))
+REPLICA_CHECK_INTERVAL = 5
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', default='yamdb'),
+    }
+}
+
+# Кэш ответов каталога (произведения, категории, жанры)
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300))
+
+# Списки каталога и отзывов строятся из .values() без сериализаторов
+# (api/rendering.py), формат ответа тот же
+FAST_LIST_RENDERING = os.environ.get(
+    'FAST_LIST_RENDERING', 'true').lower() in ('1', 'true', 'yes')
+
+# Наибольшее число объектов в одном запросе массовой записи
+BULK_MAX_ITEMS = 5000
+
+# Строк за одно чтение курсора при выгрузке (api/v1/export, export_to_csv)
+EXPORT_CHUNK_SIZE = 2000
+
+# Рейтинги лучших произведений: длина и минимум отзывов для попадания
+LEADERBOARD_SIZE = 100
+LEADERBOARD_MIN_REVIEWS = 5
+# Попыток записи рейтинга при одновременном изменении другим процессом
+LEADERBOARD_WRITE_ATTEMPTS = 3
+
+# Метрики запросов (/metrics). Для нескольких воркеров gunicorn
+# задайте общий каталог, куда процессы сбрасывают свои значения
+METRICS_ENABLED = True
+METRICS_MULTIPROC_DIR = os.environ.get('METRICS_MULTIPROC_DIR')
+METRICS_FLUSH_INTERVAL = 1
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
@@ -145,18 +237,45 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.JWTClaimsAuthentication',
     ],
 
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 5,
+
+    # Регистрация и выдача токена (api/throttling.py): по IP и по username
+    'DEFAULT_THROTTLE_RATES': {
+        'signup_ip': os.environ.get('THROTTLE_SIGNUP_IP', '30/hour'),
+        'signup_username': os.environ.get('THROTTLE_SIGNUP_USERNAME', '5/hour'),
+        'token_ip': os.environ.get('THROTTLE_TOKEN_IP', '60/min'),
+        'token_username': os.environ.get('THROTTLE_TOKEN_USERNAME', '10/min'),
+    },
+    # Число прокси перед приложением: IP клиента берётся из X-Forwarded-For
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
 }
+# Сколько корзин ограничения запросов хранится в памяти процесса
+AUTH_THROTTLE_BUCKETS = 100000
 
 SIMPLE_JWT = {
     # Время жизни токена
     'ACCESS_TOKEN_LIFETIME': timedelta(days=30),
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
+# Кэш ролей и активности пользователей для JWT-аутентификации:
+# время жизни записи в секундах и максимальное число записей в процессе
+JWT_USER_CACHE_TIMEOUT = 60
+JWT_USER_CACHE_SIZE = 10000
+
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'emailfolder')
 DEFAULT_FROM_EMAIL = 'no-reaply@yamdb.com'
+
+# Очередь исходящих писем (команда send_emails)
+EMAIL_OUTBOX_BATCH_SIZE = 100
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+# Задержка перед повторной попыткой в секундах, удваивается с каждой попыткой
+EMAIL_OUTBOX_RETRY_DELAY = 60
+EMAIL_OUTBOX_POLL_INTERVAL = 5
+# Через сколько секунд письмо, взятое в отправку упавшим процессом,
+# снова доступно для отправки
+EMAIL_OUTBOX_CLAIM_TIMEOUT = 600
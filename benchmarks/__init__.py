@@ -0,0 +1,15 @@
+"""
+Нагрузочные замеры API на сгенерированных данных.
+
+Скрипты запускаются из корня проекта как модули, например
+``python -m benchmarks.query_plans``, и работают с базой из настроек
+DJANGO_SETTINGS_MODULE (по умолчанию api_yamdb.settings).
+Запускайте их только на отдельной базе: генератор добавляет данные.
+"""
+import os
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+    import django
+    django.setup()
@@ -0,0 +1,246 @@
+"""
+Замер всех эндпоинтов API: список, детальная страница, фильтры,
+вложенные ресурсы и запись. Для каждого сценария считаются p50/p95/p99
+времени ответа и число SQL-запросов. Запросы на запись выполняются
+в транзакции, которая откатывается, так что данные не меняются.
+
+    python -m benchmarks.endpoints --seed --titles 100000 \
+        --reviews 5000000 --comments 10000000 --output results.json
+    python -m benchmarks.endpoints --baseline baseline.json
+
+С --baseline запуск завершается с ошибкой, если p95 сценария вырос
+больше допустимого или увеличилось число запросов.
+"""
+import argparse
+import json
+import math
+import sys
+import time
+
+from benchmarks import setup_django
+from benchmarks.seed import add_volume_arguments, seed, volumes_from_args
+
+PERCENTILES = (50, 95, 99)
+PAGE_SIZE = 5
+
+
+class Scenario:
+
+    def __init__(self, name, method, url, data=None, role='anonymous',
+                 status=200):
+        self.name = name
+        self.method = method
+        self.url = url
+        self.data = data
+        self.role = role
+        self.status = status
+
+
+def get_context():
+    """Существующие объекты, на которые ссылаются сценарии."""
+    from reviews.models import Category, Comment, Genre, Review, Title
+    from users.models import User
+
+    comment = Comment.objects.select_related('review').order_by('?').first()
+    review = comment.review if comment else Review.objects.first()
+    return {
+        'title_id': review.title_id,
+        'review_id': review.pk,
+        'comment_id': comment.pk if comment else 0,
+        'username': User.objects.values_list(
+            'username', flat=True).first(),
+        'category': Category.objects.values_list('slug', flat=True).first(),
+        'genre': Genre.objects.values_list('slug', flat=True).first(),
+        'year': review.title.year,
+        'deep_page': max(1, Title.objects.count() // PAGE_SIZE // 2),
+    }
+
+
+def get_scenarios(ctx):
+    titles = '/api/v1/titles/'
+    title = f'{titles}{ctx["title_id"]}/'
+    reviews = f'{title}reviews/'
+    review = f'{reviews}{ctx["review_id"]}/'
+    comments = f'{review}comments/'
+    new_title = {'name': 'Новое произведение', 'year': 2000,
+                 'category': ctx['category'], 'genre': [ctx['genre']]}
+    return [
+        Scenario('titles list', 'get', titles),
+        Scenario('titles list deep page', 'get',
+                 f'{titles}?page={ctx["deep_page"]}'),
+        Scenario('titles list cursor', 'get', f'{titles}?pagination=cursor'),
+        Scenario('titles filtered', 'get',
+                 f'{titles}?category={ctx["category"]}&genre={ctx["genre"]}'
+                 f'&year={ctx["year"]}'),
+        Scenario('titles search', 'get', f'{titles}?search=описание'),
+        Scenario('title detail', 'get', title),
+        Scenario('title create', 'post', titles, new_title, 'admin', 201),
+        Scenario('title update', 'patch', title, {'year': 2001}, 'admin'),
+        Scenario('title delete', 'delete', title, role='admin', status=204),
+        Scenario('categories list', 'get', '/api/v1/categories/'),
+        Scenario('category create', 'post', '/api/v1/categories/',
+                 {'name': 'Новая', 'slug': 'bench-new'}, 'admin', 201),
+        Scenario('genres list', 'get', '/api/v1/genres/'),
+        Scenario('genre create', 'post', '/api/v1/genres/',
+                 {'name': 'Новый', 'slug': 'bench-new'}, 'admin', 201),
+        Scenario('reviews list', 'get', reviews),
+        Scenario('reviews list cursor', 'get',
+                 f'{reviews}?pagination=cursor'),
+        Scenario('reviews search', 'get', f'{reviews}?search=отзыв'),
+        Scenario('review detail', 'get', review),
+        Scenario('review create', 'post', reviews,
+                 {'text': 'Новый отзыв', 'score': 7}, 'user', 201),
+        Scenario('review update', 'patch', review, {'score': 3}, 'admin'),
+        Scenario('comments list', 'get', comments),
+        Scenario('comment detail', 'get',
+                 f'{comments}{ctx["comment_id"]}/'),
+        Scenario('comment create', 'post', comments,
+                 {'text': 'Новый комментарий'}, 'user', 201),
+        Scenario('users list', 'get', '/api/v1/users/', role='admin'),
+        Scenario('user detail', 'get',
+                 f'/api/v1/users/{ctx["username"]}/', role='admin'),
+        Scenario('users me', 'get', '/api/v1/users/me/', role='user'),
+        Scenario('signup', 'post', '/api/v1/auth/signup/',
+                 {'username': 'bench_signup',
+                  'email': 'bench_signup@yamdb.fake'}),
+    ]
+
+
+def get_clients():
+    from django.test import Client
+
+    from api.authentication import RoleAccessToken
+    from users.models import User
+
+    users = {
+        'user': User.objects.get_or_create(
+            username='bench_client_user',
+            defaults={'email': 'bench_client_user@yamdb.fake'})[0],
+        'admin': User.objects.get_or_create(
+            username='bench_client_admin',
+            defaults={'email': 'bench_client_admin@yamdb.fake',
+                      'role': User.UserRole.ADMIN})[0],
+    }
+    clients = {'anonymous': Client()}
+    for role, user in users.items():
+        token = RoleAccessToken.for_user(user)
+        clients[role] = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return clients
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    index = max(0, math.ceil(percent / 100 * len(values)) - 1)
+    return values[index]
+
+
+def run_scenario(scenario, client, iterations, warmup, clear_cache):
+    from django.core.cache import cache
+    from django.db import connection, transaction
+    from django.test.utils import CaptureQueriesContext
+
+    from api.throttling import throttle_buckets
+
+    timings, queries = [], []
+    for i in range(warmup + iterations):
+        if clear_cache:
+            cache.clear()
+        # Повторный signup с тем же username упирается в лимит auth-запросов,
+        # а бенчмарк меряет эндпоинт, а не троттлинг.
+        throttle_buckets.clear()
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = getattr(client, scenario.method)(
+                    scenario.url, data=scenario.data,
+                    content_type='application/json')
+                elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+        if response.status_code != scenario.status:
+            raise RuntimeError(
+                f'{scenario.name}: expected {scenario.status}, '
+                f'got {response.status_code}: {response.content[:200]}')
+        if i >= warmup:
+            timings.append(elapsed * 1000)
+            queries.append(len(captured.captured_queries))
+    result = {
+        f'p{percent}_ms': round(percentile(timings, percent), 3)
+        for percent in PERCENTILES
+    }
+    result['queries'] = max(queries)
+    return result
+
+
+def run(iterations=20, warmup=2, clear_cache=True, stdout=sys.stdout):
+    from django.db import connection
+
+    ctx = get_context()
+    clients = get_clients()
+    results = {}
+    for scenario in get_scenarios(ctx):
+        result = run_scenario(scenario, clients[scenario.role], iterations,
+                              warmup, clear_cache)
+        results[scenario.name] = result
+        stdout.write(
+            f'{scenario.name:<26} ' + ' '.join(
+                f'p{percent}={result[f"p{percent}_ms"]:8.2f}ms'
+                for percent in PERCENTILES
+            ) + f' queries={result["queries"]}\n')
+    return {
+        'vendor': connection.vendor,
+        'iterations': iterations,
+        'scenarios': results,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Список регрессий относительно сохранённого базового замера."""
+    regressions = []
+    for name, base in baseline['scenarios'].items():
+        current = results['scenarios'].get(name)
+        if current is None:
+            continue
+        if current['queries'] > base['queries']:
+            regressions.append(
+                f'{name}: queries {base["queries"]} -> {current["queries"]}')
+        if current['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(
+                f'{name}: p95 {base["p95_ms"]}ms -> {current["p95_ms"]}ms')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', action='store_true',
+                        help='Generate data before measuring')
+    add_volume_arguments(parser)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--warm-cache', action='store_true',
+                        help='Do not clear the response cache per request')
+    parser.add_argument('--output', help='Write results to a JSON file')
+    parser.add_argument('--baseline', help='Compare with a stored result')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed relative p95 growth, 0.2 is 20%%')
+    args = parser.parse_args()
+    setup_django()
+
+    if args.seed:
+        seed(batch_size=args.batch_size, **volumes_from_args(args))
+    results = run(args.iterations, args.warmup, not args.warm_cache)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(results, output, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline:
+            regressions = compare(results, json.load(baseline),
+                                  args.tolerance)
+        if regressions:
+            sys.exit('Regressions:\n' + '\n'.join(regressions))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Пропускная способность с пулом соединений и без него: несколько потоков
+вызывают WSGI-приложение на запросах чтения, как потоки воркера. Каждый
+режим замеряется в отдельном процессе с DB_POOL_SIZE=0 и с пулом;
+соединения закрываются или возвращаются в пул в конце запроса, как под
+gunicorn.
+
+    python -m benchmarks.pooling --seed --threads 8 --duration 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks import setup_django
+from benchmarks.seed import add_volume_arguments, seed, volumes_from_args
+
+
+def get_urls():
+    from reviews.models import Review
+
+    review = Review.objects.order_by('pk').first()
+    title = f'/api/v1/titles/{review.title_id}/'
+    return [
+        '/api/v1/titles/',
+        title,
+        f'{title}reviews/',
+        f'{title}reviews/{review.pk}/comments/',
+        '/api/v1/genres/',
+    ]
+
+
+def call(application, environ):
+    """Запрос к WSGI-приложению; в конце сигнал request_finished."""
+    status = []
+    response = application(
+        environ, lambda code, headers, exc_info=None: status.append(code))
+    try:
+        b''.join(response)
+    finally:
+        response.close()
+    return status[0]
+
+
+def measure(threads, duration):
+    from django.test import RequestFactory
+
+    from api_yamdb.backends.pool import pool_stats
+    from api_yamdb.wsgi import application
+
+    factory = RequestFactory()
+    environs = [factory._base_environ(PATH_INFO=url) for url in get_urls()]
+    for environ in environs:
+        status = call(application, dict(environ))
+        if not status.startswith('200'):
+            raise RuntimeError(f'{environ["PATH_INFO"]}: {status}')
+
+    counts = [0] * threads
+    deadline = time.monotonic() + duration
+
+    def worker(index):
+        while time.monotonic() < deadline:
+            call(application, dict(environs[counts[index] % len(environs)]))
+            counts[index] += 1
+
+    workers = [threading.Thread(target=worker, args=(index,))
+               for index in range(threads)]
+    start = time.monotonic()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.monotonic() - start
+    return {
+        'requests': sum(counts),
+        'rps': round(sum(counts) / elapsed, 1),
+        'pools': pool_stats(),
+    }
+
+
+def run_mode(pool_size, args):
+    env = dict(os.environ, DB_POOL_SIZE=str(pool_size))
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.pooling', '--measure',
+         '--threads', str(args.threads), '--duration', str(args.duration)],
+        env=env, check=True, stdout=subprocess.PIPE, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def run(args, stdout=sys.stdout):
+    results = {
+        'no pool': run_mode(0, args),
+        'pool': run_mode(args.pool_size or args.threads, args),
+    }
+    for name, result in results.items():
+        stdout.write(f'{name:<8} rps={result["rps"]:9.1f} '
+                     f'requests={result["requests"]}\n')
+    pool = results['pool']['pools'].get('default')
+    if pool:
+        stdout.write(f'pool: created={pool["created"]} '
+                     f'checkouts={pool["checkouts"]} waits={pool["waits"]}\n')
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', action='store_true',
+                        help='Generate data before measuring')
+    add_volume_arguments(parser)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--pool-size', type=int, default=0,
+                        help='Pool size, by default one per thread')
+    parser.add_argument('--measure', action='store_true',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        setup_django()
+        print(json.dumps(measure(args.threads, args.duration)))
+        return
+    if args.seed:
+        setup_django()
+        seed(batch_size=args.batch_size, **volumes_from_args(args))
+    run(args)
+
+
+if __name__ == '__main__':
+    main()
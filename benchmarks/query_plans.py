@@ -0,0 +1,102 @@
+"""
+Планы запросов API с составными индексами и без них.
+
+Для каждого типового запроса (отзывы и комментарии родителя по дате,
+произведения категории или года по названию, проверка отзыва автора)
+выводит EXPLAIN (в PostgreSQL - EXPLAIN ANALYZE) и время выполнения.
+Индексы удаляются внутри транзакции, которая затем откатывается.
+
+    python -m benchmarks.query_plans --seed --titles 100000 \
+        --reviews 5000000 --comments 10000000
+"""
+import argparse
+import time
+
+from benchmarks import setup_django
+from benchmarks.seed import add_volume_arguments, seed, volumes_from_args
+
+PAGE_SIZE = 5
+
+
+def get_queries():
+    from reviews.models import Comment, Review, Title
+
+    review = Review.objects.order_by('?').first()
+    title = Title.objects.filter(category__isnull=False).order_by('?').first()
+    return {
+        'reviews of title': Review.objects.filter(
+            title_id=review.title_id).order_by('-pub_date')[:PAGE_SIZE],
+        'comments of review': Comment.objects.filter(
+            review_id=review.pk).order_by('-pub_date')[:PAGE_SIZE],
+        'titles of category': Title.objects.filter(
+            category_id=title.category_id).order_by('name')[:PAGE_SIZE],
+        'titles of year': Title.objects.filter(
+            year=title.year).order_by('name')[:PAGE_SIZE],
+        'review of author': Review.objects.filter(
+            title_id=review.title_id, author_id=review.author_id),
+    }
+
+
+def explain(queryset):
+    from django.db import connection
+
+    options = {'analyze': True} if connection.vendor == 'postgresql' else {}
+    return queryset.explain(**options)
+
+
+def measure(queryset, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        list(queryset.all())
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def report(title, queries, repeat):
+    print(f'==== {title} ====')
+    for name, queryset in queries.items():
+        print(f'--- {name}: {measure(queryset, repeat):.2f} ms')
+        print(explain(queryset))
+    print()
+
+
+def drop_access_indexes():
+    from django.db import connection
+
+    from reviews.models import Comment, Review, Title
+
+    with connection.cursor() as cursor:
+        for model in (Title, Review, Comment):
+            for index in model._meta.indexes:
+                cursor.execute(
+                    f'DROP INDEX {connection.ops.quote_name(index.name)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--seed', action='store_true',
+                        help='Generate data before comparing plans')
+    parser.add_argument('--repeat', type=int, default=5)
+    add_volume_arguments(parser)
+    args = parser.parse_args()
+    setup_django()
+
+    from django.db import connection, transaction
+
+    if args.seed:
+        seed(batch_size=args.batch_size, **volumes_from_args(args))
+    queries = get_queries()
+
+    with transaction.atomic():
+        drop_access_indexes()
+        report('without composite indexes', queries, args.repeat)
+        transaction.set_rollback(True)
+    # Новое соединение: SQLite кэширует подготовленные запросы
+    # вместе с планами, построенными без индексов
+    connection.close()
+    report('with composite indexes', queries, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Микробенчмарк отрисовки страницы списка: сериализаторы DRF и
+JSONRenderer против быстрого пути api/rendering.py (.values() и orjson).
+Замеряется процессорное время на страницу вместе с выборкой из базы;
+перед замером проверяется, что оба пути дают одинаковый ответ.
+
+    python -m benchmarks.rendering --seed --page-size 100
+"""
+import argparse
+import sys
+import time
+
+from benchmarks import setup_django
+from benchmarks.seed import add_volume_arguments, seed, volumes_from_args
+
+
+def get_cases(page_size):
+    from django.db.models import Count
+
+    from api.rendering import (ReviewsFastList, SlugItemsFastList,
+                               TitlesFastList)
+    from api.serializers import (CategorySerializer, GenreSerializer,
+                                 ReviewSerializer, TitleSerializerGet)
+    from api.views import TitleViewSet
+    from reviews.models import Category, Genre, Review, Title
+
+    title_id = Title.objects.annotate(
+        reviews_count=Count('reviews')
+    ).order_by('-reviews_count').values_list('pk', flat=True).first()
+    reviews = Review.objects.filter(
+        title_id=title_id).select_related('author')
+    return [
+        ('titles', TitleViewSet.queryset, TitleSerializerGet,
+         TitlesFastList),
+        ('genres', Genre.objects.all(), GenreSerializer, SlugItemsFastList),
+        ('categories', Category.objects.all(), CategorySerializer,
+         SlugItemsFastList),
+        ('reviews', reviews, ReviewSerializer, ReviewsFastList),
+    ]
+
+
+def render_serializer(queryset, serializer_class, page_size):
+    from rest_framework.renderers import JSONRenderer
+
+    objects = list(queryset[:page_size])
+    return JSONRenderer().render(serializer_class(objects, many=True).data)
+
+
+def render_fast(queryset, fast_list_class, page_size):
+    from api.rendering import FastJSONRenderer
+
+    fast_list = fast_list_class()
+    fields = list(fast_list.columns)
+    rows = list(queryset.prefetch_related(None).values(
+        *fast_list.get_columns(fields))[:page_size])
+    return FastJSONRenderer().render(fast_list.represent(rows, fields))
+
+
+def cpu_time(func, iterations):
+    start = time.process_time()
+    for _ in range(iterations):
+        func()
+    return (time.process_time() - start) / iterations * 1000
+
+
+def run(page_size=100, iterations=50, stdout=sys.stdout):
+    results = {}
+    for name, queryset, serializer_class, fast_list_class in get_cases(
+            page_size):
+        def serializer_path():
+            return render_serializer(queryset, serializer_class, page_size)
+
+        def fast_path():
+            return render_fast(queryset, fast_list_class, page_size)
+
+        if serializer_path() != fast_path():
+            raise RuntimeError(f'{name}: fast path output differs')
+        serializer_ms = cpu_time(serializer_path, iterations)
+        fast_ms = cpu_time(fast_path, iterations)
+        results[name] = {
+            'serializer_ms': round(serializer_ms, 3),
+            'fast_ms': round(fast_ms, 3),
+            'speedup': round(serializer_ms / fast_ms, 2) if fast_ms else None,
+        }
+        stdout.write(
+            f'{name:<12} serializer={serializer_ms:8.3f}ms '
+            f'fast={fast_ms:8.3f}ms '
+            f'x{results[name]["speedup"]}\n')
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', action='store_true',
+                        help='Generate data before measuring')
+    add_volume_arguments(parser)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+    setup_django()
+
+    if args.seed:
+        seed(batch_size=args.batch_size, **volumes_from_args(args))
+    run(args.page_size, args.iterations)
+
+
+if __name__ == '__main__':
+    main()
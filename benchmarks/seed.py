@@ -0,0 +1,151 @@
+"""
+Быстрый генератор данных для замеров: вставляет пользователей,
+категории, жанры, произведения, отзывы и комментарии пакетами
+через bulk_create с явными id.
+
+    python -m benchmarks.seed --titles 100000 --reviews 5000000 \
+        --comments 10000000
+"""
+import argparse
+import random
+from itertools import islice
+
+from benchmarks import setup_django
+
+DEFAULT_VOLUMES = {
+    'users': 1000,
+    'categories': 10,
+    'genres': 30,
+    'titles': 1000,
+    'reviews': 10000,
+    'comments': 20000,
+}
+
+
+def next_id(model):
+    last = model.objects.order_by('-pk').values_list('pk', flat=True).first()
+    return (last or 0) + 1
+
+
+def insert(model, objects, batch_size):
+    objects = iter(objects)
+    count = 0
+    while True:
+        batch = list(islice(objects, batch_size))
+        if not batch:
+            return count
+        model.objects.bulk_create(batch)
+        count += len(batch)
+
+
+def reset_sequences(models):
+    """
+    Сдвигает последовательности id после вставки явных id, как
+    import_from_csv: иначе следующий create получит занятый id.
+    """
+    from django.core.management.color import no_style
+    from django.db import connection
+
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def seed(users, categories, genres, titles, reviews, comments,
+         batch_size=5000, random_seed=0, stdout=None):
+    """Добавляет данные и пересчитывает рейтинги и поисковый индекс."""
+    from django.core.management import call_command
+    from django.db import transaction
+
+    from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                                Title)
+    from users.models import User
+
+    rnd = random.Random(random_seed)
+    with transaction.atomic():
+        first_user = next_id(User)
+        insert(User, (
+            User(id=first_user + i, username=f'bench_user_{first_user + i}',
+                 email=f'bench_user_{first_user + i}@yamdb.fake')
+            for i in range(users)
+        ), batch_size)
+        user_ids = range(first_user, first_user + users)
+
+        first_category = next_id(Category)
+        insert(Category, (
+            Category(id=first_category + i, name=f'Категория {i}',
+                     slug=f'bench-category-{first_category + i}')
+            for i in range(categories)
+        ), batch_size)
+        category_ids = range(first_category, first_category + categories)
+
+        first_genre = next_id(Genre)
+        insert(Genre, (
+            Genre(id=first_genre + i, name=f'Жанр {i}',
+                  slug=f'bench-genre-{first_genre + i}')
+            for i in range(genres)
+        ), batch_size)
+        genre_ids = range(first_genre, first_genre + genres)
+
+        first_title = next_id(Title)
+        insert(Title, (
+            Title(id=first_title + i, name=f'Произведение {rnd.random():.8f}',
+                  year=rnd.randint(1900, 2020),
+                  description=f'Описание произведения {i}',
+                  category_id=rnd.choice(category_ids))
+            for i in range(titles)
+        ), batch_size)
+        title_ids = range(first_title, first_title + titles)
+        insert(GenreTitle, (
+            GenreTitle(title_id=title_id, genre_id=genre_id)
+            for title_id in title_ids
+            for genre_id in rnd.sample(genre_ids, min(2, genres))
+        ), batch_size)
+
+        # Одна рецензия на пару (произведение, автор): авторы идут по кругу
+        reviews = min(reviews, titles * users)
+        first_review = next_id(Review)
+        insert(Review, (
+            Review(id=first_review + i, title_id=title_ids[i % titles],
+                   author_id=user_ids[i // titles],
+                   text=f'Отзыв {i}', score=rnd.randint(1, 10))
+            for i in range(reviews)
+        ), batch_size)
+        review_ids = range(first_review, first_review + reviews)
+        if not review_ids:
+            comments = 0
+
+        insert(Comment, (
+            Comment(review_id=rnd.choice(review_ids),
+                    author_id=rnd.choice(user_ids), text=f'Комментарий {i}')
+            for i in range(comments)
+        ), batch_size)
+
+        reset_sequences([User, Category, Genre, Title, GenreTitle, Review,
+                         Comment])
+        call_command('rebuild_ratings', stdout=stdout)
+        call_command('rebuild_comment_counts', stdout=stdout)
+        call_command('rebuild_search_index', stdout=stdout)
+
+
+def add_volume_arguments(parser):
+    for name, default in DEFAULT_VOLUMES.items():
+        parser.add_argument(f'--{name}', type=int, default=default)
+    parser.add_argument('--batch-size', type=int, default=5000)
+
+
+def volumes_from_args(args):
+    return {name: getattr(args, name) for name in DEFAULT_VOLUMES}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_volume_arguments(parser)
+    args = parser.parse_args()
+    setup_django()
+    seed(batch_size=args.batch_size, **volumes_from_args(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,13 @@
+"""
+Настройки gunicorn: файл читается из рабочего каталога при запуске
+(см. CMD в Dockerfile).
+"""
+import os
+
+
+def child_exit(server, worker):
+    """Метрики завершившегося воркера переносятся в архив каталога."""
+    directory = os.environ.get('METRICS_MULTIPROC_DIR')
+    if directory:
+        from api.metrics import archive_process
+        archive_process(directory, worker.pid)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Category, Comment, Genre, Review, Title
+from .models import Category, Comment, Genre, LeaderboardEntry, Review, Title
 
 
 class CategoryAdmin(admin.ModelAdmin):
@@ -33,8 +33,15 @@ class CommentAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
 
 
+class LeaderboardEntryAdmin(admin.ModelAdmin):
+    list_display = ('board', 'position', 'title', 'rating', 'rating_count')
+    list_filter = ('board',)
+    raw_id_fields = ('title',)
+
+
 admin.site.register(Category, CategoryAdmin)
 admin.site.register(Genre, GenreAdmin)
 admin.site.register(Title, TitleAdmin)
 admin.site.register(Review, ReviewAdmin)
 admin.site.register(Comment, CommentAdmin)
+admin.site.register(LeaderboardEntry, LeaderboardEntryAdmin)
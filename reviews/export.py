@@ -0,0 +1,88 @@
+"""
+Выгрузка данных в CSV и JSONL потоком: строки читаются
+.iterator(chunk_size) (в PostgreSQL - серверным курсором) и отдаются
+кусками, так что память не зависит от объёма данных. Наборы и колонки
+совпадают с файлами, которые читает import_from_csv.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+from django.apps import apps
+
+# Наборы в порядке зависимостей по внешним ключам: имя файла без
+# расширения, модель и колонки (атрибуты модели)
+DATASETS = {
+    'users': ('users.User', (
+        'id', 'username', 'email', 'role', 'bio', 'first_name',
+        'last_name')),
+    'category': ('reviews.Category', ('id', 'name', 'slug')),
+    'genre': ('reviews.Genre', ('id', 'name', 'slug')),
+    'titles': ('reviews.Title', (
+        'id', 'name', 'year', 'description', 'category_id')),
+    'genre_title': ('reviews.GenreTitle', ('id', 'title_id', 'genre_id')),
+    'review': ('reviews.Review', (
+        'id', 'title_id', 'text', 'author_id', 'score', 'pub_date')),
+    'comments': ('reviews.Comment', (
+        'id', 'review_id', 'text', 'author_id', 'pub_date')),
+}
+
+FORMATS = ('csv', 'jsonl')
+
+
+def get_model(name):
+    return apps.get_model(DATASETS[name][0])
+
+
+def export_rows(name, chunk_size):
+    """Строки набора по возрастанию id."""
+    columns = DATASETS[name][1]
+    return get_model(name).objects.order_by('pk').values_list(
+        *columns).iterator(chunk_size=chunk_size)
+
+
+def to_text(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def csv_chunks(name, chunk_size):
+    """
+    Заголовок и строки CSV, по chunk_size строк в куске. Пустое значение
+    import_from_csv читает как None.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(DATASETS[name][1])
+    count = 0
+    for row in export_rows(name, chunk_size):
+        writer.writerow(['' if value is None else to_text(value)
+                         for value in row])
+        count += 1
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def jsonl_chunks(name, chunk_size):
+    """Объекты JSON по одному в строке, по chunk_size строк в куске."""
+    columns = DATASETS[name][1]
+    lines = []
+    for row in export_rows(name, chunk_size):
+        lines.append(json.dumps(
+            dict(zip(columns, map(to_text, row))), ensure_ascii=False))
+        if len(lines) == chunk_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def export_chunks(name, output, chunk_size):
+    if output == 'jsonl':
+        return jsonl_chunks(name, chunk_size)
+    return csv_chunks(name, chunk_size)
@@ -0,0 +1,194 @@
+"""
+Рейтинги лучших произведений: общий, по жанрам и по категориям.
+
+Места хранятся в таблице LeaderboardEntry, поэтому чтение рейтинга -
+выборка первых строк по индексу (board, position). Рейтинги строятся
+по накопленным Title.rating_sum и rating_count и учитывают только
+произведения не менее чем с LEADERBOARD_MIN_REVIEWS отзывами.
+
+После изменения отзывов обновляются только рейтинги, в которых
+произведение есть или в которые оно теперь попадает, и в них меняется
+только место этого произведения; команда rebuild_leaderboards строит
+все рейтинги заново за один проход.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, FloatField, Min
+from django.db.models.functions import Cast
+
+from .models import GenreTitle, LeaderboardEntry, Title
+
+OVERALL = 'all'
+
+
+def genre_board(slug):
+    return f'genre:{slug}'
+
+
+def category_board(slug):
+    return f'category:{slug}'
+
+
+def ranked_titles():
+    """Произведения, участвующие в рейтингах, от лучшего к худшему."""
+    return Title.objects.filter(
+        rating_count__gte=settings.LEADERBOARD_MIN_REVIEWS
+    ).annotate(
+        average=Cast('rating_sum', FloatField()) / F('rating_count')
+    ).order_by('-average', '-rating_count', 'pk')
+
+
+def make_entries(board, rows):
+    return [
+        LeaderboardEntry(board=board, position=position, title_id=title_id,
+                         rating=rating_sum / rating_count,
+                         rating_count=rating_count)
+        for position, (title_id, rating_sum, rating_count)
+        in enumerate(rows, start=1)
+    ]
+
+
+def board_titles(board):
+    """Произведения, участвующие в рейтинге board, от лучшего к худшему."""
+    kind, _, slug = board.partition(':')
+    if kind == 'genre':
+        return ranked_titles().filter(genre__slug=slug)
+    if kind == 'category':
+        return ranked_titles().filter(category__slug=slug)
+    return ranked_titles()
+
+
+def merge_title(board, title_id):
+    """
+    Места рейтинга board после изменения произведения title_id: заново
+    читаются и сортируются только участники рейтинга и само
+    произведение (не больше LEADERBOARD_SIZE + 1 строк по первичному
+    ключу). Полный запрос с сортировкой нужен, только если участник
+    заполненного рейтинга выбыл из него или опустился на последнее
+    место: его может обойти произведение вне рейтинга. title_id=None -
+    участник удалён вместе с местами.
+    """
+    size = settings.LEADERBOARD_SIZE
+    members = list(LeaderboardEntry.objects.filter(board=board).values_list(
+        'title_id', 'rating', 'rating_count'))
+    member_ids = {member[0] for member in members}
+    rows = list(board_titles(board).filter(
+        pk__in=member_ids | {title_id}
+    ).values_list('pk', 'rating_sum', 'rating_count')[:size])
+    full = len(members) >= size
+    if (len(rows) < size and (full or title_id is None)
+            or full and rows[-1][0] == title_id and title_id in member_ids):
+        rows = list(board_titles(board).values_list(
+            'pk', 'rating_sum', 'rating_count')[:size])
+    return members, rows
+
+
+def refresh_board(board, title_id=None):
+    """
+    Обновляет место произведения в рейтинге. Места перезаписываются,
+    только если изменились; при одновременной записи того же рейтинга
+    другим процессом (нарушение уникальности места) пересчёт
+    повторяется по свежим данным.
+    """
+    for attempt in range(settings.LEADERBOARD_WRITE_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                members, rows = merge_title(board, title_id)
+                if members == [(pk, rating_sum / rating_count, rating_count)
+                               for pk, rating_sum, rating_count in rows]:
+                    return
+                LeaderboardEntry.objects.filter(board=board).delete()
+                LeaderboardEntry.objects.bulk_create(
+                    make_entries(board, rows))
+            return
+        except IntegrityError:
+            if attempt + 1 == settings.LEADERBOARD_WRITE_ATTEMPTS:
+                raise
+
+
+def drop_board(board):
+    """Удаляет рейтинг удалённого жанра или категории."""
+    LeaderboardEntry.objects.filter(board=board).delete()
+
+
+def rename_board(old_board, new_board):
+    """Переносит места рейтинга на новый slug жанра или категории."""
+    with transaction.atomic():
+        drop_board(new_board)
+        LeaderboardEntry.objects.filter(board=old_board).update(
+            board=new_board)
+
+
+def current_boards(title_id):
+    """Рейтинги, в которых сейчас есть произведение."""
+    return set(LeaderboardEntry.objects.filter(
+        title_id=title_id).values_list('board', flat=True))
+
+
+def title_boards(title_id, category_slug):
+    boards = [OVERALL]
+    if category_slug:
+        boards.append(category_board(category_slug))
+    boards.extend(genre_board(slug) for slug in GenreTitle.objects.filter(
+        title_id=title_id).values_list('genre__slug', flat=True))
+    return boards
+
+
+def refresh_title(title_id):
+    """
+    Пересчитывает рейтинги, на которые могло повлиять изменение
+    оценок, жанров или категории произведения.
+    """
+    boards = current_boards(title_id)
+    title = Title.objects.filter(pk=title_id).values(
+        'rating_sum', 'rating_count', 'category__slug').first()
+    if title and title['rating_count'] >= settings.LEADERBOARD_MIN_REVIEWS:
+        rating = title['rating_sum'] / title['rating_count']
+        candidates = title_boards(title_id, title['category__slug'])
+        stats = {
+            row['board']: row for row in LeaderboardEntry.objects.filter(
+                board__in=candidates
+            ).values('board').annotate(
+                size=Count('pk'), lowest=Min('rating')).order_by()
+        }
+        for board in candidates:
+            board_stats = stats.get(board)
+            if (board_stats is None
+                    or board_stats['size'] < settings.LEADERBOARD_SIZE
+                    or rating >= board_stats['lowest']):
+                boards.add(board)
+    for board in sorted(boards):
+        refresh_board(board, title_id)
+
+
+def rebuild_all():
+    """Строит все рейтинги заново за один проход по произведениям."""
+    titles = ranked_titles()
+    genres = defaultdict(list)
+    for title_id, slug in GenreTitle.objects.filter(
+            title__in=titles.values('pk')
+    ).values_list('title_id', 'genre__slug'):
+        genres[title_id].append(slug)
+
+    boards = defaultdict(list)
+    size = settings.LEADERBOARD_SIZE
+    for title_id, category, rating_sum, rating_count in titles.values_list(
+            'pk', 'category__slug', 'rating_sum', 'rating_count'
+    ).iterator():
+        names = [OVERALL] + [genre_board(slug) for slug in genres[title_id]]
+        if category:
+            names.append(category_board(category))
+        for board in names:
+            if len(boards[board]) < size:
+                boards[board].append((title_id, rating_sum, rating_count))
+
+    with transaction.atomic():
+        LeaderboardEntry.objects.all().delete()
+        LeaderboardEntry.objects.bulk_create([
+            entry
+            for board, rows in boards.items()
+            for entry in make_entries(board, rows)
+        ])
+    return len(boards)
@@ -0,0 +1,95 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from reviews.export import DATASETS, export_chunks
+
+
+class Command(BaseCommand):
+    help = ('Export every dataset to CSV files readable by '
+            'import_from_csv --all. Pass an output directory, '
+            'CSV_DIR by default. All files come from one snapshot of the '
+            'database; on PostgreSQL they are written in parallel')
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', nargs='?')
+        parser.add_argument(
+            '--jsonl',
+            action='store_true',
+            help='Write JSON Lines instead of CSV',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.EXPORT_CHUNK_SIZE,
+            help='Number of rows fetched from the database at a time',
+        )
+        parser.add_argument(
+            '--jobs',
+            type=int,
+            default=4,
+            help='Number of files written at the same time (PostgreSQL)',
+        )
+
+    def write_file(self, name, output, directory, chunk_size):
+        file_path = os.path.join(directory, f'{name}.{output}')
+        with open(file_path, 'w', encoding='utf-8',
+                  newline='') as export_file:
+            for chunk in export_chunks(name, output, chunk_size):
+                export_file.write(chunk)
+        return file_path
+
+    def export_file(self, snapshot, *args):
+        """
+        Файл в отдельном потоке: транзакция потока читает тот же
+        снимок, что и транзакция команды.
+        """
+        try:
+            with transaction.atomic(), connections[
+                    DEFAULT_DB_ALIAS].cursor() as cursor:
+                cursor.execute(
+                    'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+                cursor.execute('SET TRANSACTION SNAPSHOT %s', [snapshot])
+                return self.write_file(*args)
+        finally:
+            # У каждого потока свои соединения с базой
+            connections.close_all()
+
+    def export_parallel(self, jobs, *args):
+        """
+        PostgreSQL: снимок транзакции команды экспортируется
+        (pg_export_snapshot) и открыт, пока потоки пишут файлы.
+        """
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+            cursor.execute('SELECT pg_export_snapshot()')
+            snapshot = cursor.fetchone()[0]
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(self.export_file, snapshot, name,
+                                       *args)
+                       for name in DATASETS]
+            return [future.result() for future in futures]
+
+    def handle(self, *args, **options):
+        directory = options['directory'] or settings.CSV_DIR
+        if not os.path.isdir(directory):
+            raise CommandError(f'{directory} directory does not exist')
+        output = 'jsonl' if options['jsonl'] else 'csv'
+        # Все наборы читаются в одной транзакции, иначе запись между
+        # выгрузкой файлов оставила бы, например, отзыв без произведения
+        with transaction.atomic():
+            if connections[DEFAULT_DB_ALIAS].vendor == 'postgresql':
+                paths = self.export_parallel(
+                    options['jobs'], output, directory, options['chunk_size'])
+            else:
+                # Снимок транзакции SQLite не передаётся другим
+                # соединениям: файлы пишутся по очереди
+                paths = [self.write_file(name, output, directory,
+                                         options['chunk_size'])
+                         for name in DATASETS]
+        for file_path in paths:
+            self.stdout.write(self.style.SUCCESS(
+                f'Successfully exported {file_path}'))
@@ -1,24 +1,84 @@
 import csv
 import os
+from contextlib import contextmanager
+from itertools import islice
 
 from django.apps import apps
 from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.core.management import call_command
 from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+
+@contextmanager
+def csv_dates(model, columns):
+    """
+    Даты auto_now_add, заданные в CSV (pub_date), записываются как есть,
+    а не заменяются временем импорта.
+    """
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False) and field.attname in columns
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
 
 
 class Command(BaseCommand):
     help = ('Import data from a CSV file to the database.'
             'Pass a file name as a 1-st argument,'
-            'a model name as a 2-nd argument')
+            'a model name as a 2-nd argument. '
+            'Use --all to import every file from CSV_DIR, '
+            '--bulk to insert rows in batches')
 
     APP_NAMES = [
         'reviews',
         'users',
     ]
 
+    # Файлы из CSV_DIR в порядке зависимостей по внешним ключам
+    CSV_MODELS = [
+        ('users.csv', 'User'),
+        ('category.csv', 'Category'),
+        ('genre.csv', 'Genre'),
+        ('titles.csv', 'Title'),
+        ('genre_title.csv', 'GenreTitle'),
+        ('review.csv', 'Review'),
+        ('comments.csv', 'Comment'),
+    ]
+
     def add_arguments(self, parser):
-        parser.add_argument('csv_name')
-        parser.add_argument('model_name')
+        parser.add_argument('csv_name', nargs='?')
+        parser.add_argument('model_name', nargs='?')
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Import all CSV files from CSV_DIR in dependency order',
+        )
+        parser.add_argument(
+            '--bulk',
+            action='store_true',
+            help='Insert rows with bulk_create in batches',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help=('Number of CSV rows read and passed to bulk_create at a '
+                  'time in bulk mode; bulk_create splits them into queries '
+                  'by the database limit'),
+        )
+        parser.add_argument(
+            '--csv-dir',
+            help='Directory with CSV files, CSV_DIR by default',
+        )
 
     def get_model_from_apps(self, model_name, app_names):
         model = None
@@ -32,23 +92,108 @@ class Command(BaseCommand):
             raise CommandError(f'{model_name} model  does not exist')
         return model
 
-    def handle(self, *args, **options):
-        csv_name = options['csv_name']
-        model_name = options['model_name']
-        file_path = os.path.join(settings.CSV_DIR, csv_name)
+    def get_column_names(self, model, header):
+        """
+        Приводит заголовки CSV к атрибутам модели:
+        колонка author становится author_id и т.п.
+        """
+        columns = []
+        for name in header:
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                columns.append(name)
+                continue
+            columns.append(field.attname)
+        return columns
 
-        model = self.get_model_from_apps(model_name, self.APP_NAMES)
+    def get_rows(self, model, columns, reader):
+        nullable = {
+            field.attname for field in model._meta.concrete_fields
+            if field.null
+        }
+        for values in reader:
+            yield {
+                column: None if value == '' and column in nullable else value
+                for column, value in zip(columns, values)
+            }
 
-        try:
-            with open(file_path, encoding='utf-8') as csv_file:
-                reader = csv.DictReader(csv_file)
-                for row in reader:
-                    model.objects.create(**row)
+    def import_rows(self, model, rows, bulk, batch_size):
+        count = 0
+        if not bulk:
+            for row in rows:
+                model.objects.create(**row)
+                count += 1
+            return count
+        while True:
+            batch = [model(**row) for row in islice(rows, batch_size)]
+            if not batch:
+                return count
+            model.objects.bulk_create(batch)
+            count += len(batch)
 
+    def import_file(self, csv_name, model, bulk, batch_size, csv_dir):
+        file_path = os.path.join(csv_dir, csv_name)
+        try:
+            with open(file_path, encoding='utf-8', newline='') as csv_file:
+                reader = csv.reader(csv_file)
+                columns = self.get_column_names(model, next(reader, []))
+                with csv_dates(model, columns):
+                    count = self.import_rows(
+                        model, self.get_rows(model, columns, reader), bulk,
+                        batch_size)
         except FileNotFoundError:
             raise CommandError(f'{file_path} file does not exist')
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully imported {count} rows'
+            f' from {csv_name} to {model.__name__}'))
+
+    def reset_sequences(self, models):
+        """Сдвигает последовательности id после вставки явных id."""
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def rebuild_derived(self, models):
+        """
+        bulk_create не вызывает сигналы пересчёта рейтинга, рейтингов
+        лучших, счётчиков комментариев и обновления поискового индекса.
+        """
+        names = {model._meta.model_name for model in models}
+        if 'review' in names:
+            call_command('rebuild_ratings', stdout=self.stdout)
+            call_command('rebuild_leaderboards', stdout=self.stdout)
+        if 'comment' in names:
+            call_command('rebuild_comment_counts', stdout=self.stdout)
+        if names & {'title', 'review'}:
+            call_command('rebuild_search_index', stdout=self.stdout)
+
+    def handle(self, *args, **options):
+        if options['all']:
+            files = self.CSV_MODELS
+        elif options['csv_name'] and options['model_name']:
+            files = [(options['csv_name'], options['model_name'])]
+        else:
+            raise CommandError(
+                'Pass a file name and a model name or use --all')
+
+        files = [
+            (csv_name, self.get_model_from_apps(model_name, self.APP_NAMES))
+            for csv_name, model_name in files
+        ]
+        models = [model for _, model in files]
+        csv_dir = options['csv_dir'] or settings.CSV_DIR
+
+        try:
+            with transaction.atomic():
+                for csv_name, model in files:
+                    self.import_file(csv_name, model, options['bulk'],
+                                     options['batch_size'], csv_dir)
+                if options['bulk']:
+                    self.reset_sequences(models)
+                    self.rebuild_derived(models)
+        except CommandError:
+            raise
         except Exception as e:
             raise CommandError(f'Data import failed: {e}')
-
-        self.stdout.write(self.style.SUCCESS('Successfully imported data'
-                          f' from {csv_name} to {model.__name__}'))
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+
+from reviews.models import Review
+
+
+class Command(BaseCommand):
+    help = ('Recalculate stored review comment counters from the comments '
+            'table in a single pass. Review counters of titles are rating '
+            'counts and are rebuilt by rebuild_ratings. '
+            'Use --check to only report mismatches')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Report reviews with outdated counters without fixing them',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of reviews updated per query',
+        )
+
+    def handle(self, *args, **options):
+        reviews = Review.objects.annotate(
+            actual_count=Count('comments'),
+        ).only('pk', 'comments_count').order_by('pk')
+
+        outdated = []
+        with transaction.atomic():
+            for review in reviews.iterator(chunk_size=options['batch_size']):
+                if review.comments_count == review.actual_count:
+                    continue
+                review.comments_count = review.actual_count
+                outdated.append(review)
+
+            if options['check']:
+                if outdated:
+                    raise CommandError(
+                        f'{len(outdated)} reviews have outdated comment '
+                        'counters: '
+                        + ', '.join(str(review.pk) for review in outdated))
+                self.stdout.write(self.style.SUCCESS(
+                    'All review comment counters are up to date'))
+                return
+
+            Review.objects.bulk_update(
+                outdated, ['comments_count'],
+                batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully rebuilt comment counters for {len(outdated)} '
+            'reviews'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from reviews import leaderboards
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the top-rated leaderboards (overall, per genre and '
+            'per category) from the stored title ratings. '
+            'Run periodically to correct drift of incremental updates')
+
+    def handle(self, *args, **options):
+        count = leaderboards.rebuild_all()
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully rebuilt {count} leaderboards'))
@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    help = ('Recalculate stored title ratings (sum and count of review '
+            'scores) and score distributions from the reviews table '
+            'in a single pass. '
+            'Use --check to only report mismatches')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Report titles with outdated ratings without fixing them',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of titles updated per query',
+        )
+
+    def handle(self, *args, **options):
+        fields = ('rating_sum', 'rating_count') + Title.score_fields()
+        titles = Title.objects.annotate(
+            actual_sum=Sum('reviews__score'),
+            actual_count=Count('reviews'),
+            **{
+                f'actual_{score}': Count(
+                    'reviews', filter=Q(reviews__score=score))
+                for score in Title.SCORES
+            },
+        ).only('pk', *fields).order_by('pk')
+
+        outdated = []
+        with transaction.atomic():
+            for title in titles.iterator(chunk_size=options['batch_size']):
+                actual = {
+                    'rating_sum': title.actual_sum or 0,
+                    'rating_count': title.actual_count,
+                }
+                for score in Title.SCORES:
+                    actual[Title.score_field(score)] = getattr(
+                        title, f'actual_{score}')
+                if all(getattr(title, field) == value
+                       for field, value in actual.items()):
+                    continue
+                for field, value in actual.items():
+                    setattr(title, field, value)
+                outdated.append(title)
+
+            if options['check']:
+                if outdated:
+                    raise CommandError(
+                        f'{len(outdated)} titles have outdated ratings: '
+                        + ', '.join(str(title.pk) for title in outdated))
+                self.stdout.write(self.style.SUCCESS(
+                    'All title ratings are up to date'))
+                return
+
+            Title.objects.bulk_update(
+                outdated, fields, batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully rebuilt ratings for {len(outdated)} titles'))
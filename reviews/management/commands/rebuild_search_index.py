@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from reviews import search
+from reviews.models import Review, Title
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the full-text search index of titles and reviews. '
+            'Needed on SQLite after rows were inserted without signals')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        with transaction.atomic(using=options['database']):
+            for model in (Title, Review):
+                search.rebuild_index(model, options['database'])
+        self.stdout.write(self.style.SUCCESS(
+            'Successfully rebuilt the search index'))
@@ -0,0 +1,48 @@
+from django.db import migrations
+
+SEARCH_TABLES = {
+    'reviews_title': (('name', 'A'), ('description', 'B')),
+    'reviews_review': (('text', 'A'),),
+}
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table, fields in SEARCH_TABLES.items():
+        columns = [name for name, _ in fields]
+        if vendor == 'postgresql':
+            vector = ' || '.join(
+                f"setweight(to_tsvector('russian', "
+                f"coalesce(\"{name}\", '')), '{weight}')"
+                for name, weight in fields
+            )
+            schema_editor.execute(
+                f'CREATE INDEX {table}_search_idx ON {table} '
+                f'USING gin (({vector}))')
+        elif vendor == 'sqlite':
+            schema_editor.execute(
+                f'CREATE VIRTUAL TABLE {table}_fts '
+                f'USING fts5({", ".join(columns)})')
+            schema_editor.execute(
+                f'INSERT INTO {table}_fts (rowid, {", ".join(columns)}) '
+                f'SELECT id, {", ".join(columns)} FROM {table}')
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table in SEARCH_TABLES:
+        if vendor == 'postgresql':
+            schema_editor.execute(f'DROP INDEX IF EXISTS {table}_search_idx')
+        elif vendor == 'sqlite':
+            schema_editor.execute(f'DROP TABLE IF EXISTS {table}_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_title_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
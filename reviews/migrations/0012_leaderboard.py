@@ -0,0 +1,33 @@
+# Generated by Django 3.0.5 on 2026-10-18 19:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0011_title_score_distribution'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('board', models.CharField(max_length=64, verbose_name='Рейтинг')),
+                ('position', models.PositiveIntegerField(verbose_name='Место')),
+                ('rating', models.FloatField(verbose_name='Средняя оценка')),
+                ('rating_count', models.PositiveIntegerField(verbose_name='Количество оценок')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='reviews.Title', verbose_name='Произведение')),
+            ],
+            options={
+                'verbose_name': 'Место в рейтинге',
+                'ordering': ['board', 'position'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='leaderboardentry',
+            constraint=models.UniqueConstraint(fields=('board', 'position'), name='unique_board_position'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, router, transaction
+from django.utils import timezone
 
 from users.models import User
 
@@ -10,6 +11,7 @@ class Category(models.Model):
     """
     name = models.CharField(max_length=256)
     slug = models.SlugField(unique=True)
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
 
     class Meta:
         ordering = ['slug']
@@ -25,6 +27,7 @@ class Genre(models.Model):
     """
     name = models.CharField(max_length=256)
     slug = models.SlugField(unique=True)
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
 
     class Meta:
         ordering = ['slug']
@@ -38,6 +41,7 @@ class Title(models.Model):
     """
     Произведения
     """
+    SCORES = range(1, 11)
     name = models.CharField(max_length=256)
     year = models.PositiveSmallIntegerField('Год создания')
     description = models.TextField(
@@ -58,14 +62,74 @@ class Title(models.Model):
         through='GenreTitle',
         verbose_name='Жанр',
     )
+    rating_sum = models.PositiveIntegerField(
+        'Сумма оценок',
+        default=0,
+        editable=False,
+    )
+    rating_count = models.PositiveIntegerField(
+        'Количество оценок',
+        default=0,
+        editable=False,
+    )
+    # Распределение оценок: число отзывов с каждой оценкой от 1 до 10
+    score_1_count = models.PositiveIntegerField(
+        'Оценок 1', default=0, editable=False)
+    score_2_count = models.PositiveIntegerField(
+        'Оценок 2', default=0, editable=False)
+    score_3_count = models.PositiveIntegerField(
+        'Оценок 3', default=0, editable=False)
+    score_4_count = models.PositiveIntegerField(
+        'Оценок 4', default=0, editable=False)
+    score_5_count = models.PositiveIntegerField(
+        'Оценок 5', default=0, editable=False)
+    score_6_count = models.PositiveIntegerField(
+        'Оценок 6', default=0, editable=False)
+    score_7_count = models.PositiveIntegerField(
+        'Оценок 7', default=0, editable=False)
+    score_8_count = models.PositiveIntegerField(
+        'Оценок 8', default=0, editable=False)
+    score_9_count = models.PositiveIntegerField(
+        'Оценок 9', default=0, editable=False)
+    score_10_count = models.PositiveIntegerField(
+        'Оценок 10', default=0, editable=False)
+    # Обновляется и при изменении отзывов и жанров произведения
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['category', 'name'],
+                         name='title_category_name_idx'),
+            models.Index(fields=['year', 'name'],
+                         name='title_year_name_idx'),
+        ]
         verbose_name = 'Произведения'
 
     def __str__(self):
         return self.name
 
+    @property
+    def rating(self):
+        """Средняя оценка по накопленным сумме и количеству оценок."""
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
+    @staticmethod
+    def score_field(score):
+        return f'score_{score}_count'
+
+    @classmethod
+    def score_fields(cls):
+        return tuple(cls.score_field(score) for score in cls.SCORES)
+
+    @property
+    def score_distribution(self):
+        """Число отзывов с каждой оценкой: {оценка: количество}."""
+        return {score: getattr(self, self.score_field(score))
+                for score in self.SCORES}
+
 
 class GenreTitle(models.Model):
     """
@@ -93,6 +157,43 @@ class GenreTitle(models.Model):
     def __str__(self):
         return f'{self.title.name} - {self.genre.name}'
 
+    @classmethod
+    def set_genres(cls, genre_ids, touch_titles=True):
+        """
+        Приводит жанры произведений к genre_ids ({title_id: {genre_id}}),
+        записывая только изменившиеся связи: одно удаление и одна
+        пакетная вставка на все произведения. У произведений с
+        изменившимися жанрами обновляется updated_at (touch_titles=False -
+        для только что созданных).
+        """
+        current = {}
+        for link_id, title_id, genre_id in cls.objects.filter(
+                title_id__in=genre_ids).values_list('id', 'title_id',
+                                                    'genre_id'):
+            current.setdefault(title_id, {})[genre_id] = link_id
+        stale = [
+            link_id
+            for title_id, wanted in genre_ids.items()
+            for genre_id, link_id in current.get(title_id, {}).items()
+            if genre_id not in wanted
+        ]
+        if stale:
+            cls.objects.filter(pk__in=stale).delete()
+        added = [
+            cls(title_id=title_id, genre_id=genre_id)
+            for title_id, wanted in genre_ids.items()
+            for genre_id in wanted
+            if genre_id not in current.get(title_id, {})
+        ]
+        cls.objects.bulk_create(added)
+        changed = {link.title_id for link in added} | {
+            title_id for title_id, wanted in genre_ids.items()
+            if set(current.get(title_id, {})) - wanted
+        }
+        if touch_titles and changed:
+            Title.objects.filter(pk__in=changed).update(
+                updated_at=timezone.now())
+
 
 class Review(models.Model):
     """
@@ -119,6 +220,12 @@ class Review(models.Model):
         'Дата публикации',
         auto_now_add=True
     )
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         constraints = [
@@ -127,11 +234,41 @@ class Review(models.Model):
             ),
         ]
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['title', '-pub_date'],
+                         name='review_title_pub_date_idx'),
+        ]
         verbose_name = 'Отзывы'
 
     def __str__(self):
         return self.text[:50]
 
+    def lock_stored_values(self, using=None):
+        """
+        Блокирует строку отзыва до конца транзакции и запоминает её
+        произведение и оценку: рейтинг сдвигается на разницу с тем, что
+        записано в базе, а не с тем, что было загружено в объект (другой
+        запрос мог успеть изменить оценку).
+        """
+        if self.pk is None or self._state.adding:
+            return
+        stored = type(self)._base_manager.using(
+            using or router.db_for_write(type(self), instance=self)
+        ).select_for_update().filter(pk=self.pk).values(
+            'title_id', 'score').first()
+        if stored is not None:
+            self._loaded_values = stored
+
+    @transaction.atomic
+    def save(self, *args, **kwargs):
+        self.lock_stored_values(kwargs.get('using'))
+        super().save(*args, **kwargs)
+
+    @transaction.atomic
+    def delete(self, *args, **kwargs):
+        self.lock_stored_values(kwargs.get('using'))
+        return super().delete(*args, **kwargs)
+
 
 class Comment(models.Model):
     """
@@ -154,7 +291,51 @@ class Comment(models.Model):
         'Дата публикации',
         auto_now_add=True
     )
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['review', '-pub_date'],
+                         name='comment_review_pub_date_idx'),
+        ]
         verbose_name = 'Комментарии'
+
+    @transaction.atomic
+    def save(self, *args, **kwargs):
+        # Комментарий и счётчик отзыва (сигналы) фиксируются вместе
+        super().save(*args, **kwargs)
+
+    @transaction.atomic
+    def delete(self, *args, **kwargs):
+        return super().delete(*args, **kwargs)
+
+
+class LeaderboardEntry(models.Model):
+    """
+    Место произведения в заранее рассчитанном рейтинге лучших:
+    общем (board='all'), по жанру ('genre:<slug>') или по категории
+    ('category:<slug>'). Заполняется модулем reviews.leaderboards.
+    """
+    board = models.CharField('Рейтинг', max_length=64)
+    position = models.PositiveIntegerField('Место')
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='leaderboard_entries',
+        verbose_name='Произведение',
+    )
+    rating = models.FloatField('Средняя оценка')
+    rating_count = models.PositiveIntegerField('Количество оценок')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['board', 'position'], name='unique_board_position'
+            ),
+        ]
+        ordering = ['board', 'position']
+        verbose_name = 'Место в рейтинге'
+
+    def __str__(self):
+        return f'{self.board} #{self.position}: {self.title_id}'
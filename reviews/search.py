@@ -0,0 +1,132 @@
+"""
+Полнотекстовый поиск по произведениям и отзывам.
+
+PostgreSQL: выражение to_tsvector с GIN-индексом (миграция 0009),
+индекс поддерживается самой базой.
+SQLite: теневая таблица FTS5 <таблица>_fts, обновляется сигналами
+при сохранении и удалении объектов.
+Другие базы: поиск подстроки (icontains) без индекса и ранжирования.
+"""
+import re
+from functools import reduce
+from operator import or_
+
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+
+POSTGRES_SEARCH_CONFIG = 'russian'
+
+# Индексируемые поля и их вес для ранжирования в PostgreSQL
+SEARCH_FIELDS = {
+    'title': (('name', 'A'), ('description', 'B')),
+    'review': (('text', 'A'),),
+}
+
+
+def is_searchable(model):
+    return model._meta.model_name in SEARCH_FIELDS
+
+
+def get_fields(model):
+    return [name for name, _ in SEARCH_FIELDS[model._meta.model_name]]
+
+
+def fts_table(model):
+    return f'{model._meta.db_table}_fts'
+
+
+def postgres_vector(model):
+    table = model._meta.db_table
+    return ' || '.join(
+        f"setweight(to_tsvector('{POSTGRES_SEARCH_CONFIG}', "
+        f"coalesce(\"{table}\".\"{name}\", '')), '{weight}')"
+        for name, weight in SEARCH_FIELDS[model._meta.model_name]
+    )
+
+
+def index_object(instance, using):
+    """Обновляет строку объекта в теневой таблице FTS5."""
+    index_objects([instance], using)
+
+
+def index_objects(objects, using):
+    """Пакетно обновляет строки объектов в теневой таблице FTS5."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or not objects:
+        return
+    model = type(objects[0])
+    fields = get_fields(model)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {fts_table(model)} WHERE rowid = %s',
+            [[obj.pk] for obj in objects])
+        cursor.executemany(
+            f'INSERT INTO {fts_table(model)} (rowid, {", ".join(fields)}) '
+            f'VALUES (%s, {", ".join(["%s"] * len(fields))})',
+            [[obj.pk] + [getattr(obj, name) for name in fields]
+             for obj in objects])
+
+
+def unindex_object(instance, using):
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {fts_table(type(instance))} WHERE rowid = %s',
+            [instance.pk])
+
+
+def rebuild_index(model, using):
+    """Заполняет теневую таблицу FTS5 заново по основной таблице."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    columns = ', '.join(get_fields(model))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {fts_table(model)}')
+        cursor.execute(
+            f'INSERT INTO {fts_table(model)} (rowid, {columns}) '
+            f'SELECT id, {columns} FROM {model._meta.db_table}')
+
+
+def search(queryset, query, extra_fields=()):
+    """
+    Фильтрует queryset по поисковой строке и сортирует по релевантности
+    (аннотация search_rank, больше - релевантнее). Поля extra_fields
+    (например, имя автора) дополнительно сравниваются через icontains.
+    В базах без полнотекстового поиска индексируемые поля тоже
+    сравниваются через icontains, без ранжирования.
+    """
+    model = queryset.model
+    table = model._meta.db_table
+    vendor = connections[queryset.db].vendor
+
+    if vendor == 'postgresql':
+        tsquery = f"plainto_tsquery('{POSTGRES_SEARCH_CONFIG}', %s)"
+        vector = postgres_vector(model)
+        matches = Q(pk__in=RawSQL(
+            f'SELECT "id" FROM "{table}" WHERE ({vector}) @@ {tsquery}',
+            [query]))
+        rank = RawSQL(f'ts_rank({vector}, {tsquery})', [query])
+    elif vendor == 'sqlite':
+        words = re.findall(r'\w+', query)
+        match = ' '.join('"{}"'.format(word) for word in words)
+        fts = fts_table(model)
+        matches = Q(pk__in=RawSQL(
+            f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s', [match])
+        ) if words else Q(pk__in=[])
+        rank = RawSQL(
+            f'SELECT -rank FROM {fts} '
+            f'WHERE {fts} MATCH %s AND rowid = "{table}"."id"', [match])
+    else:
+        matches = reduce(or_, (Q(**{f'{name}__icontains': query})
+                               for name in get_fields(model)))
+        rank = Value(0)
+    for name in extra_fields:
+        matches |= Q(**{f'{name}__icontains': query})
+    return queryset.filter(matches).annotate(
+        search_rank=Coalesce(rank, Value(0), output_field=FloatField())
+    ).order_by('-search_rank', 'pk')
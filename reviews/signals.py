@@ -0,0 +1,158 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import leaderboards, search
+from .models import Category, Comment, Genre, Review, Title
+
+
+def change_rating(title_id, score_delta, count_delta=0, scores_delta=None):
+    """
+    Атомарно сдвигает сумму и количество оценок произведения
+    и счётчики распределения оценок (scores_delta: {оценка: сдвиг}),
+    отмечая изменение произведения.
+    """
+    scores = {
+        Title.score_field(score): F(Title.score_field(score)) + delta
+        for score, delta in (scores_delta or {}).items() if delta
+    }
+    Title.objects.filter(pk=title_id).update(
+        rating_sum=F('rating_sum') + score_delta,
+        rating_count=F('rating_count') + count_delta,
+        updated_at=timezone.now(),
+        **scores,
+    )
+
+
+def change_comments_count(review_id, delta):
+    """Атомарно сдвигает число комментариев отзыва."""
+    Review.objects.filter(pk=review_id).update(
+        comments_count=F('comments_count') + delta,
+        updated_at=timezone.now(),
+    )
+
+
+def touch(queryset):
+    """Обновляет updated_at объектов без вызова сигналов."""
+    queryset.update(updated_at=timezone.now())
+
+
+def refresh_leaderboards(title_id):
+    """Пересчитывает рейтинги лучших после фиксации транзакции."""
+    transaction.on_commit(partial(leaderboards.refresh_title, title_id))
+
+
+@receiver(post_save, sender=Title)
+def title_saved(sender, instance, **kwargs):
+    refresh_leaderboards(instance.pk)
+
+
+@receiver(pre_delete, sender=Title)
+def title_deleted(sender, instance, **kwargs):
+    # Места произведения удалятся каскадом, освободившиеся места
+    # в рейтингах нужно заполнить
+    for board in leaderboards.current_boards(instance.pk):
+        transaction.on_commit(partial(leaderboards.refresh_board, board))
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    refresh_leaderboards(instance.title_id)
+    if created:
+        change_rating(instance.title_id, instance.score, 1,
+                      {instance.score: 1})
+    else:
+        loaded = getattr(instance, '_loaded_values', {})
+        old_title_id = loaded.get('title_id', instance.title_id)
+        old_score = loaded.get('score', instance.score)
+        if old_title_id != instance.title_id:
+            refresh_leaderboards(old_title_id)
+            change_rating(old_title_id, -old_score, -1, {old_score: -1})
+            change_rating(instance.title_id, instance.score, 1,
+                          {instance.score: 1})
+        elif old_score != instance.score:
+            change_rating(instance.title_id, instance.score - old_score, 0,
+                          {old_score: -1, instance.score: 1})
+        else:
+            touch(Title.objects.filter(pk=instance.title_id))
+    instance._loaded_values = {
+        'title_id': instance.title_id,
+        'score': instance.score,
+    }
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    loaded = getattr(instance, '_loaded_values', {})
+    title_id = loaded.get('title_id', instance.title_id)
+    score = loaded.get('score', instance.score)
+    refresh_leaderboards(title_id)
+    change_rating(title_id, -score, -1, {score: -1})
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        change_comments_count(instance.review_id, 1)
+    else:
+        touch(Review.objects.filter(pk=instance.review_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    change_comments_count(instance.review_id, -1)
+
+
+def slug_board(sender, slug):
+    if sender is Genre:
+        return leaderboards.genre_board(slug)
+    return leaderboards.category_board(slug)
+
+
+@receiver(pre_save, sender=Genre)
+@receiver(pre_save, sender=Category)
+def remember_slug(sender, instance, **kwargs):
+    instance._stored_slug = sender.objects.filter(
+        pk=instance.pk).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Category)
+def slug_item_saved(sender, instance, created, **kwargs):
+    if created:
+        # Новый жанр или категория произведения не меняют
+        return
+    touch(Title.objects.filter(**{sender._meta.model_name: instance}))
+    old_slug = getattr(instance, '_stored_slug', None)
+    if old_slug is not None and old_slug != instance.slug:
+        transaction.on_commit(partial(
+            leaderboards.rename_board, slug_board(sender, old_slug),
+            slug_board(sender, instance.slug)))
+
+
+@receiver(pre_delete, sender=Genre)
+@receiver(pre_delete, sender=Category)
+def slug_item_deleted(sender, instance, **kwargs):
+    touch(Title.objects.filter(**{sender._meta.model_name: instance}))
+    transaction.on_commit(partial(
+        leaderboards.drop_board, slug_board(sender, instance.slug)))
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_save, sender=Review)
+def update_search_index(sender, instance, using, update_fields, **kwargs):
+    if (update_fields is not None
+            and not set(update_fields) & set(search.get_fields(sender))):
+        return
+    search.index_object(instance, using)
+
+
+@receiver(post_delete, sender=Title)
+@receiver(post_delete, sender=Review)
+def remove_from_search_index(sender, instance, using, **kwargs):
+    search.unindex_object(instance, using)
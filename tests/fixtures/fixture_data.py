@@ -0,0 +1,118 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    from django.core.cache import cache
+
+    from api.authentication import user_state_cache
+    from api.throttling import throttle_buckets
+    cache.clear()
+    user_state_cache.clear()
+    throttle_buckets.clear()
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(
+        username='TestUser', email='testuser@yamdb.fake', password='1234567')
+
+
+@pytest.fixture
+def another_user(django_user_model):
+    return django_user_model.objects.create_user(
+        username='TestUserAnother', email='testuseranother@yamdb.fake',
+        password='1234567')
+
+
+@pytest.fixture
+def category():
+    from reviews.models import Category
+    return Category.objects.create(name='Фильм', slug='movie')
+
+
+@pytest.fixture
+def genres():
+    from reviews.models import Genre
+    return [
+        Genre.objects.create(name='Драма', slug='drama'),
+        Genre.objects.create(name='Комедия', slug='comedy'),
+    ]
+
+
+@pytest.fixture
+def title(category, genres):
+    from reviews.models import Title
+    title = Title.objects.create(name='Побег из Шоушенка', year=1994,
+                                 category=category)
+    title.genre.set(genres)
+    return title
+
+
+@pytest.fixture
+def another_title(category, genres):
+    from reviews.models import Title
+    title = Title.objects.create(name='Крестный отец', year=1972,
+                                 category=category)
+    title.genre.set(genres[:1])
+    return title
+
+
+@pytest.fixture
+def many_titles(category, genres):
+    from reviews.models import Title
+    titles = []
+    for i in range(10):
+        title = Title.objects.create(
+            name=f'Произведение {i}', year=2000 + i, category=category)
+        title.genre.set(genres)
+        titles.append(title)
+    return titles
+
+
+@pytest.fixture
+def many_reviews(title, django_user_model):
+    from reviews.models import Review
+    reviews = []
+    for i in range(7):
+        author = django_user_model.objects.create_user(
+            username=f'reviewer{i}', email=f'reviewer{i}@yamdb.fake')
+        reviews.append(Review.objects.create(
+            title=title, author=author, text=f'Отзыв {i}', score=i + 1))
+    return reviews
+
+
+@pytest.fixture
+def many_comments(many_reviews, django_user_model):
+    from reviews.models import Comment
+    review = many_reviews[0]
+    authors = django_user_model.objects.filter(
+        username__startswith='reviewer')
+    return [
+        Comment.objects.create(review=review, author=author, text='Коммент')
+        for author in authors
+    ]
+
+
+@pytest.fixture
+def user_client(user):
+    from rest_framework.test import APIClient
+
+    from api.authentication import RoleAccessToken
+    client = APIClient()
+    token = RoleAccessToken.for_user(user)
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+@pytest.fixture
+def admin_client(django_user_model):
+    from rest_framework.test import APIClient
+
+    from api.authentication import RoleAccessToken
+    admin = django_user_model.objects.create_user(
+        username='TestAdmin', email='testadmin@yamdb.fake', role='admin')
+    client = APIClient()
+    token = RoleAccessToken.for_user(admin)
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
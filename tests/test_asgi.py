@@ -0,0 +1,70 @@
+import asyncio
+import json
+
+import pytest
+from asgiref.testing import ApplicationCommunicator
+
+
+def asgi_get(application, path, query_string=b'', headers=()):
+    async def request():
+        communicator = ApplicationCommunicator(application, {
+            'type': 'http',
+            'method': 'GET',
+            'path': path,
+            'query_string': query_string,
+            'headers': [(b'host', b'testserver'), *headers],
+        })
+        await communicator.send_input({'type': 'http.request'})
+        start = await communicator.receive_output(timeout=5)
+        body, message = b'', {'more_body': True}
+        while message.get('more_body'):
+            message = await communicator.receive_output(timeout=5)
+            body += message.get('body', b'')
+        return start['status'], body
+    return asyncio.run(request())
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAsgiReadPath:
+
+    @pytest.fixture
+    def application(self):
+        from api_yamdb.asgi import ReadPoolASGIHandler
+        return ReadPoolASGIHandler()
+
+    def test_read_requests_use_read_pool(self, application, client, title):
+        from django.test import RequestFactory
+
+        factory = RequestFactory()
+        assert application.is_read_request(factory.get('/api/v1/titles/'))
+        assert application.is_read_request(
+            factory.get(f'/api/v1/titles/{title.pk}/reviews/'))
+        assert not application.is_read_request(
+            factory.post('/api/v1/titles/'))
+        assert not application.is_read_request(factory.get('/api/v1/users/'))
+
+    def test_same_output_as_wsgi(self, application, client, title,
+                                 many_reviews):
+        for path in ('/api/v1/titles/', f'/api/v1/titles/{title.pk}/',
+                     f'/api/v1/titles/{title.pk}/reviews/'):
+            status, body = asgi_get(application, path)
+            assert status == 200
+            assert json.loads(body) == client.get(path).json(), (
+                'Проверьте, что через ASGI отдаются те же данные')
+
+    def test_streaming_export(self, application, settings, django_user_model,
+                              many_titles):
+        from api.authentication import RoleAccessToken
+
+        settings.EXPORT_CHUNK_SIZE = 3
+        admin = django_user_model.objects.create_user(
+            username='TestAdmin', email='testadmin@yamdb.fake', role='admin')
+        token = RoleAccessToken.for_user(admin)
+        status, body = asgi_get(
+            application, '/api/v1/export/titles.csv',
+            headers=[(b'authorization', f'Bearer {token}'.encode())])
+        assert status == 200
+        lines = body.decode().splitlines()
+        assert len(lines) == len(many_titles) + 1, (
+            'Проверьте, что выгрузка через ASGI отдаётся целиком: ORM '
+            'нельзя вызывать в цикле событий')
@@ -0,0 +1,87 @@
+import pytest
+
+from reviews.models import Review
+from users.models import User
+
+
+@pytest.fixture
+def shared_cache(settings, tmp_path):
+    """Кэш, общий для процессов, как Memcached или Redis в продакшене."""
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': str(tmp_path),
+    }}
+
+
+@pytest.mark.django_db
+class TestClaimsAuthentication:
+
+    def test_token_contains_role(self, client, user):
+        from django.contrib.auth.tokens import default_token_generator
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        response = client.post('/api/v1/auth/token/', data={
+            'username': user.username,
+            'confirmation_code': default_token_generator.make_token(user),
+        })
+        assert response.status_code == 200
+        token = AccessToken(response.json()['token'])
+        assert token['role'] == 'user'
+        assert token['username'] == user.username
+
+    def test_user_loaded_once(self, shared_cache, user_client, user,
+                              django_assert_num_queries):
+        user_client.get('/api/v1/users/me/')
+        with django_assert_num_queries(1):
+            # только запрос профиля, без загрузки пользователя для токена
+            response = user_client.get('/api/v1/users/me/')
+        assert response.json()['username'] == user.username
+
+    @pytest.mark.django_db(transaction=True)
+    def test_role_change_invalidates_cache(self, shared_cache, user_client,
+                                           user):
+        assert user_client.get('/api/v1/users/').status_code == 403
+        user.role = 'admin'
+        user.save()
+        assert user_client.get('/api/v1/users/').status_code == 200, (
+            'Проверьте, что смена роли сразу учитывается в правах')
+        user.is_active = False
+        user.save()
+        assert user_client.get('/api/v1/users/').status_code == 401
+
+    def test_change_seen_by_other_processes(self, shared_cache, user_client,
+                                            user):
+        from django.core.cache import cache
+
+        from api.authentication import user_version_key
+        assert user_client.get('/api/v1/users/').status_code == 403
+        # Другой процесс изменил пользователя: общая версия сдвинулась,
+        # кэш этого процесса не сбрасывался
+        User.objects.filter(pk=user.pk).update(role='admin')
+        cache.incr(user_version_key(user.pk))
+        assert user_client.get('/api/v1/users/').status_code == 200, (
+            'Проверьте, что изменение пользователя в другом процессе '
+            'сразу учитывается')
+
+    def test_process_local_cache_reads_database(self, user_client, user):
+        assert user_client.get('/api/v1/users/').status_code == 403
+        # Без сигналов: так изменение выглядит из другого воркера,
+        # версия в LocMemCache которого не видна
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        assert user_client.get('/api/v1/users/').status_code == 401, (
+            'Проверьте, что без общего кэша состояние читается из базы')
+
+    def test_author_permissions(self, user_client, title, user,
+                                another_user):
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        response = user_client.post(url, data={'text': 'Т', 'score': 5})
+        assert response.status_code == 201
+        assert response.json()['author'] == user.username
+        own = Review.objects.get(author=user)
+        response = user_client.patch(f'{url}{own.pk}/', data={'score': 6})
+        assert response.status_code == 200
+
+        other = Review.objects.create(
+            title=title, author=another_user, text='Т', score=1)
+        response = user_client.patch(f'{url}{other.pk}/', data={'score': 6})
+        assert response.status_code == 403
@@ -0,0 +1,62 @@
+import io
+import json
+from collections import defaultdict
+
+import pytest
+
+from benchmarks import endpoints, pooling, rendering
+from benchmarks.seed import seed
+
+
+@pytest.mark.django_db
+class TestEndpointBenchmarks:
+
+    def test_all_scenarios_run(self, tmp_path):
+        seed(users=20, categories=2, genres=3, titles=30, reviews=100,
+             comments=100, stdout=io.StringIO())
+        results = endpoints.run(iterations=2, warmup=0, stdout=io.StringIO())
+        scenarios = results['scenarios']
+        assert 'titles list' in scenarios
+        assert set(scenarios['reviews list']) == {
+            'p50_ms', 'p95_ms', 'p99_ms', 'queries'}
+
+        baseline = json.loads(json.dumps(results))
+        assert endpoints.compare(results, baseline, 0.2) == []
+        baseline['scenarios']['titles list']['queries'] -= 1
+        assert endpoints.compare(results, baseline, 0.2), (
+            'Проверьте, что рост числа запросов считается регрессией')
+
+    def test_signup_not_throttled(self, settings):
+        limit = settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'][
+            'signup_username']
+        iterations = int(limit.split('/')[0]) + 2
+        signup, = [scenario for scenario
+                   in endpoints.get_scenarios(defaultdict(int))
+                   if scenario.name == 'signup']
+        result = endpoints.run_scenario(
+            signup, endpoints.get_clients()['anonymous'], iterations,
+            warmup=1, clear_cache=True)
+        assert result['queries'] > 0
+
+
+@pytest.mark.django_db
+class TestRenderingBenchmark:
+
+    def test_fast_path_matches_and_reports(self):
+        seed(users=20, categories=2, genres=3, titles=30, reviews=100,
+             comments=0, stdout=io.StringIO())
+        results = rendering.run(page_size=20, iterations=2,
+                                stdout=io.StringIO())
+        assert set(results) == {'titles', 'genres', 'categories', 'reviews'}
+        assert set(results['titles']) == {
+            'serializer_ms', 'fast_ms', 'speedup'}
+
+
+@pytest.mark.django_db(transaction=True)
+class TestPoolingBenchmark:
+
+    def test_measure(self):
+        seed(users=20, categories=2, genres=3, titles=30, reviews=100,
+             comments=100, stdout=io.StringIO())
+        result = pooling.measure(threads=2, duration=0.2)
+        assert result['requests'] > 0 and result['rps'] > 0
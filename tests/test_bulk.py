@@ -0,0 +1,164 @@
+import pytest
+
+from reviews.models import Genre, GenreTitle, Review, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBulkWrite:
+
+    def test_bulk_create_titles(self, admin_client, client, category, genres,
+                                django_assert_max_num_queries):
+        payload = [
+            {'name': f'Произведение {i}', 'year': 2000 + i,
+             'category': category.slug, 'genre': ['drama', 'comedy']}
+            for i in range(20)
+        ]
+        client.get('/api/v1/titles/')
+        with django_assert_max_num_queries(12):
+            response = admin_client.post(
+                '/api/v1/titles/bulk/', payload, format='json')
+        assert response.status_code == 201, response.json()
+        data = response.json()
+        assert len(data) == 20
+        assert {genre['slug'] for genre in data[0]['genre']} == {
+            'drama', 'comedy'}
+        assert data[0]['category']['slug'] == category.slug
+        assert Title.objects.count() == 20
+        assert GenreTitle.objects.count() == 40
+        assert client.get('/api/v1/titles/').json()['count'] == 20, (
+            'Проверьте, что массовая запись сбрасывает кэш ответов')
+        assert client.get(
+            '/api/v1/titles/?search=Произведение').json()['count'] == 20
+
+    def test_bulk_errors_per_item(self, admin_client, category, genres):
+        payload = [
+            {'name': 'Хорошее', 'year': 2000, 'genre': ['drama']},
+            {'name': 'Без жанра', 'year': 2000, 'genre': ['unknown']},
+            {'name': 'Из будущего', 'year': 3000},
+            {'name': 'Без категории', 'year': 2000, 'category': 'none'},
+        ]
+        response = admin_client.post(
+            '/api/v1/titles/bulk/', payload, format='json')
+        assert response.status_code == 400
+        errors = response.json()
+        assert errors[0] == {}
+        assert 'genre' in errors[1]
+        assert 'year' in errors[2]
+        assert 'category' in errors[3]
+        assert not Title.objects.exists(), (
+            'Проверьте, что при ошибках ничего не записывается')
+
+    def test_bulk_update_titles(self, admin_client, title, another_title):
+        payload = [
+            {'id': title.pk, 'year': 1995, 'genre': ['comedy']},
+            {'id': another_title.pk, 'name': 'Крёстный отец'},
+        ]
+        response = admin_client.patch(
+            '/api/v1/titles/bulk/', payload, format='json')
+        assert response.status_code == 200, response.json()
+        title.refresh_from_db()
+        another_title.refresh_from_db()
+        assert title.year == 1995
+        assert list(title.genre.values_list('slug', flat=True)) == ['comedy']
+        assert another_title.name == 'Крёстный отец'
+        assert another_title.genre.count() == 1
+
+    def test_bulk_genres(self, admin_client, genres):
+        response = admin_client.post('/api/v1/genres/bulk/', [
+            {'name': 'Ужасы', 'slug': 'horror'},
+            {'name': 'Драма', 'slug': 'drama'},
+        ], format='json')
+        assert response.status_code == 400
+        assert response.json()[0] == {}
+        assert 'slug' in response.json()[1]
+
+        response = admin_client.post('/api/v1/genres/bulk/', [
+            {'name': 'Ужасы', 'slug': 'horror'},
+            {'name': 'Вестерн', 'slug': 'western'},
+        ], format='json')
+        assert response.status_code == 201
+        assert Genre.objects.count() == 4
+
+    def test_bulk_update_genres(self, admin_client, title, genres):
+        slug = genres[0].slug
+        response = admin_client.patch('/api/v1/genres/bulk/', [
+            {'slug': slug, 'name': 'Новое'},
+            {'slug': slug, 'name': 'Другое'},
+            {'slug': 'missing', 'name': 'Нет'},
+        ], format='json')
+        assert response.status_code == 400
+        errors = response.json()
+        assert 'slug' in errors[0] and 'slug' in errors[1]
+        assert 'slug' in errors[2]
+
+        updated_at = Title.objects.get(pk=title.pk).updated_at
+        response = admin_client.patch('/api/v1/genres/bulk/', [
+            {'slug': slug, 'name': 'Новое'},
+        ], format='json')
+        assert response.status_code == 200
+        assert response.json() == [{'name': 'Новое', 'slug': slug}]
+        assert Genre.objects.get(slug=slug).name == 'Новое'
+        assert Title.objects.get(pk=title.pk).updated_at > updated_at, (
+            'Проверьте, что изменение жанра обновляет его произведения')
+
+    def test_bulk_reviews_update_rating(self, admin_client, title, user,
+                                        another_user):
+        url = f'/api/v1/titles/{title.pk}/reviews/bulk/'
+        response = admin_client.post(url, [
+            {'author': user.username, 'text': 'Отлично', 'score': 10},
+            {'author': another_user.username, 'text': 'Плохо', 'score': 2},
+        ], format='json')
+        assert response.status_code == 201, response.json()
+        title.refresh_from_db()
+        assert title.rating == 6
+
+        review = Review.objects.get(author=another_user)
+        response = admin_client.patch(
+            url, [{'id': review.pk, 'score': 4}], format='json')
+        assert response.status_code == 200
+        title.refresh_from_db()
+        assert title.rating == 7
+        assert title.score_distribution[2] == 0
+        assert title.score_distribution[4] == 1
+
+        response = admin_client.post(url, [
+            {'author': user.username, 'text': 'Ещё раз', 'score': 1},
+        ], format='json')
+        assert response.status_code == 400, (
+            'Проверьте, что второй отзыв автора на произведение запрещён')
+
+    def test_bulk_admin_only(self, user_client, client, category):
+        payload = [{'name': 'Н', 'year': 2000}]
+        assert client.post('/api/v1/titles/bulk/', payload,
+                           content_type='application/json'
+                           ).status_code == 401
+        assert user_client.post('/api/v1/titles/bulk/', payload,
+                                format='json').status_code == 403
+
+    def test_bulk_ids_after_delete(self, admin_client, category):
+        payload = [{'name': f'Произведение {i}', 'year': 2000}
+                   for i in range(3)]
+        first = admin_client.post(
+            '/api/v1/titles/bulk/', payload, format='json').json()
+        Title.objects.filter(pk=first[-1]['id']).delete()
+        second = admin_client.post(
+            '/api/v1/titles/bulk/', payload, format='json').json()
+        ids = [item['id'] for item in second]
+        assert min(ids) > first[-1]['id'], (
+            'Проверьте, что id удалённых объектов не выдаются повторно')
+        assert sorted(Title.objects.filter(
+            name='Произведение 0').values_list('pk', flat=True)) == [
+            first[0]['id'], second[0]['id']]
+
+    def test_bulk_race_is_bad_request(self, admin_client, genres,
+                                      monkeypatch):
+        from api.bulk import SlugModelBulkHandler
+
+        # Параллельный запрос создал slug между проверкой и записью
+        monkeypatch.setattr(SlugModelBulkHandler, 'resolve',
+                            lambda self, validated, errors, is_update: None)
+        response = admin_client.post(
+            '/api/v1/genres/bulk/',
+            [{'name': 'Драма', 'slug': genres[0].slug}], format='json')
+        assert response.status_code == 400, (
+            'Проверьте, что конфликт при записи возвращает 400, а не 500')
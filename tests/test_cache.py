@@ -0,0 +1,61 @@
+import pytest
+
+from api.cache import get_cache, version_key
+from reviews.models import Genre, Review
+
+
+@pytest.mark.django_db(transaction=True)
+class TestResponseCache:
+
+    def test_cached_title_list(self, client, many_titles,
+                               django_assert_num_queries):
+        response = client.get('/api/v1/titles/?year=2001')
+        assert response.status_code == 200
+        assert response.has_header('ETag'), (
+            'Проверьте, что ответ содержит заголовок ETag')
+        with django_assert_num_queries(0):
+            cached = client.get('/api/v1/titles/?year=2001')
+        assert cached.content == response.content
+        assert cached['ETag'] == response['ETag']
+
+    def test_not_modified(self, client, genres):
+        response = client.get('/api/v1/genres/')
+        etag = response['ETag']
+        for _ in range(2):
+            response = client.get('/api/v1/genres/', HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 304, (
+                'Проверьте, что на совпадающий If-None-Match '
+                'возвращается статус 304')
+            assert not response.content
+
+    def test_invalidated_on_write(self, client, title, user):
+        url = f'/api/v1/titles/{title.pk}/'
+        etag = client.get(url)['ETag']
+        Review.objects.create(title=title, author=user, text='Т', score=7)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что кэш сбрасывается при изменении отзывов')
+        assert response.json()['rating'] == 7
+
+        etag = response['ETag']
+        Genre.objects.filter(slug='drama').first().delete()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert len(response.json()['genre']) == 1
+
+    def test_genres_invalidated_on_write(self, client, genres):
+        assert len(client.get('/api/v1/genres/').json()['results']) == 2
+        Genre.objects.create(name='Ужасы', slug='horror')
+        assert len(client.get('/api/v1/genres/').json()['results']) == 3
+
+    def test_evicted_version_key(self, client, genres):
+        get_cache().delete(version_key('genres'))
+        client.get('/api/v1/genres/')
+        Genre.objects.create(name='Ужасы', slug='horror')
+        assert len(client.get('/api/v1/genres/').json()['results']) == 3
+        # Ключ версии вытеснен, закэшированные ответы остались
+        get_cache().delete(version_key('genres'))
+        Genre.objects.create(name='Вестерн', slug='western')
+        assert len(client.get('/api/v1/genres/').json()['results']) == 4, (
+            'Проверьте, что после вытеснения ключа версии не '
+            'возвращаются ответы старых версий')
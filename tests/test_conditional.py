@@ -0,0 +1,146 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from django.utils.http import http_date
+
+from api.cache import get_cache, last_modified_seconds, modified_key
+from reviews.models import Comment, Genre, GenreTitle, Review, Title
+
+
+def an_hour_ago():
+    return timezone.now() - timedelta(hours=1)
+
+
+@pytest.mark.django_db
+class TestUpdatedAt:
+
+    def test_review_edit_touches_title(self, title, user):
+        review = Review.objects.create(
+            title=title, author=user, text='Т', score=7)
+        Title.objects.filter(pk=title.pk).update(updated_at=an_hour_ago())
+        before = Title.objects.get(pk=title.pk).updated_at
+        review.text = 'Другой текст'
+        review.save()
+        assert Title.objects.get(pk=title.pk).updated_at > before, (
+            'Проверьте, что изменение отзыва обновляет updated_at '
+            'произведения')
+
+    def test_genres_touch_titles(self, title, genres):
+        Title.objects.filter(pk=title.pk).update(updated_at=an_hour_ago())
+        before = Title.objects.get(pk=title.pk).updated_at
+        GenreTitle.set_genres({title.pk: {genres[0].pk}})
+        after = Title.objects.get(pk=title.pk).updated_at
+        assert after > before
+
+        genre = Genre.objects.get(pk=genres[0].pk)
+        genre.name = 'Новое имя'
+        genre.save()
+        assert Title.objects.get(pk=title.pk).updated_at > after
+
+    def test_comment_touches_review(self, title, user):
+        review = Review.objects.create(
+            title=title, author=user, text='Т', score=7)
+        Review.objects.filter(pk=review.pk).update(updated_at=an_hour_ago())
+        before = Review.objects.get(pk=review.pk).updated_at
+        Comment.objects.create(review=review, author=user, text='К')
+        assert Review.objects.get(pk=review.pk).updated_at > before
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+
+    @pytest.fixture
+    def review(self, title, user):
+        review = Review.objects.create(
+            title=title, author=user, text='Т', score=7)
+        Title.objects.filter(pk=title.pk).update(updated_at=an_hour_ago())
+        Review.objects.filter(pk=review.pk).update(updated_at=an_hour_ago())
+        return review
+
+    def test_review_list(self, client, title, review,
+                         django_assert_num_queries):
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.has_header('ETag') and response.has_header(
+            'Last-Modified'), (
+            'Проверьте, что ответ содержит ETag и Last-Modified')
+
+        with django_assert_num_queries(1):
+            cached = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        assert cached.status_code == 304
+        assert not cached.content
+        assert client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        ).status_code == 304
+        assert client.get(
+            f'{url}?fields=id', HTTP_IF_NONE_MATCH=response['ETag']
+        ).status_code == 200, (
+            'Проверьте, что ETag зависит от параметров запроса')
+
+        review.text = 'Изменённый текст'
+        review.save()
+        response = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        assert response.status_code == 200, (
+            'Проверьте, что изменение отзыва меняет ETag списка')
+        assert response.json()['results'][0]['text'] == 'Изменённый текст'
+
+    def test_comment_list_and_detail(self, client, title, review, user):
+        url = f'/api/v1/titles/{title.pk}/reviews/{review.pk}/comments/'
+        etag = client.get(url)['ETag']
+        comment = Comment.objects.create(review=review, author=user, text='К')
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert len(response.json()['results']) == 1
+
+        Comment.objects.filter(pk=comment.pk).update(
+            updated_at=an_hour_ago())
+        response = client.get(f'{url}{comment.pk}/')
+        assert client.get(
+            f'{url}{comment.pk}/',
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        ).status_code == 304
+
+    def test_review_list_after_comment(self, client, title, review, user):
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        etag = client.get(url)['ETag']
+        Comment.objects.create(review=review, author=user, text='К')
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что новый комментарий меняет ETag списка отзывов')
+        assert response.json()['results'][0]['comments_count'] == 1
+
+    def test_missing_object(self, client, title):
+        assert client.get(
+            f'/api/v1/titles/{title.pk}/reviews/1/',
+            HTTP_IF_NONE_MATCH='*').status_code == 404
+
+    def test_last_modified_seconds(self):
+        assert last_modified_seconds(100.2, 101.0) == 100
+        assert last_modified_seconds(100.2, 100.9) is None, (
+            'Проверьте, что Last-Modified не отдаётся, пока не '
+            'закончилась секунда изменения')
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCachedConditionalGet:
+
+    def test_title_list_modified_since(self, client, many_titles, user,
+                                       django_assert_num_queries):
+        modified = an_hour_ago().timestamp()
+        get_cache().set(modified_key('titles'), modified, timeout=None)
+        response = client.get('/api/v1/titles/')
+        last_modified = response['Last-Modified']
+        assert last_modified == http_date(modified)
+        with django_assert_num_queries(0):
+            cached = client.get('/api/v1/titles/',
+                                HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert cached.status_code == 304
+
+        Review.objects.create(title=many_titles[0], author=user, text='Т',
+                              score=5)
+        assert client.get(
+            '/api/v1/titles/', HTTP_IF_MODIFIED_SINCE=last_modified
+        ).status_code == 200, (
+            'Проверьте, что после изменения данных Last-Modified меняется')
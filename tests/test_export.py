@@ -0,0 +1,87 @@
+import csv
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title)
+from users.models import User
+
+
+def read_streaming(response):
+    return b''.join(response.streaming_content).decode('utf-8')
+
+
+@pytest.mark.django_db
+class TestExportEndpoint:
+
+    def test_export_admin_only(self, client, user_client, title):
+        for dataset in ('titles.csv', 'users.jsonl'):
+            url = f'/api/v1/export/{dataset}'
+            assert client.get(url).status_code == 401
+            assert user_client.get(url).status_code == 403
+
+    def test_export_csv(self, admin_client, settings, many_titles):
+        settings.EXPORT_CHUNK_SIZE = 3
+        response = admin_client.get('/api/v1/export/titles.csv',
+                                    HTTP_ACCEPT='text/csv')
+        assert response.status_code == 200
+        assert response.streaming, (
+            'Проверьте, что выгрузка отдаётся потоком')
+        assert response['Content-Type'].startswith('text/csv')
+        assert 'titles.csv' in response['Content-Disposition']
+        rows = list(csv.DictReader(io.StringIO(read_streaming(response))))
+        assert [int(row['id']) for row in rows] == list(
+            Title.objects.order_by('pk').values_list('pk', flat=True))
+        assert rows[0]['category_id'] == str(many_titles[0].category_id)
+
+    def test_export_jsonl(self, admin_client, many_comments):
+        response = admin_client.get('/api/v1/export/comments.jsonl')
+        assert response.status_code == 200
+        lines = [json.loads(line)
+                 for line in read_streaming(response).splitlines()]
+        assert [line['id'] for line in lines] == [
+            comment.pk for comment in many_comments]
+        assert lines[0]['text'] == 'Коммент'
+        assert lines[0]['review_id'] == many_comments[0].review_id
+        assert lines[0]['pub_date']
+
+    def test_export_unknown(self, admin_client):
+        for dataset in ('secrets.csv', 'titles.xml'):
+            response = admin_client.get(f'/api/v1/export/{dataset}')
+            assert response.status_code == 404
+
+
+@pytest.mark.django_db(transaction=True)
+class TestExportToCsv:
+
+    def test_round_trip(self, tmp_path):
+        call_command('import_from_csv', '--all', '--bulk')
+        models = (User, Category, Genre, Title, GenreTitle, Review,
+                  Comment)
+        before = {
+            model: list(model.objects.order_by('pk').values_list(
+                'pk', *(('text', 'pub_date') if model in (Review, Comment) else ())))
+            for model in models
+        }
+        rating = dict(Title.objects.values_list('pk', 'rating_sum'))
+        assert Review.objects.filter(pub_date__year=2019).exists(), (
+            'Проверьте, что импорт сохраняет pub_date из CSV')
+
+        call_command('export_to_csv', str(tmp_path), '--chunk-size=10',
+                     stdout=io.StringIO())
+        for model in reversed(models):
+            model.objects.all().delete()
+        call_command('import_from_csv', '--all', '--bulk',
+                     f'--csv-dir={tmp_path}', stdout=io.StringIO())
+
+        for model, rows in before.items():
+            assert list(model.objects.order_by('pk').values_list(
+                'pk', *(('text', 'pub_date')
+                        if model in (Review, Comment) else ()))
+            ) == rows, (
+                f'Проверьте, что {model.__name__} переживает выгрузку '
+                'и повторный импорт')
+        assert dict(Title.objects.values_list('pk', 'rating_sum')) == rating
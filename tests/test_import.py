@@ -0,0 +1,32 @@
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from reviews.models import Comment, Genre, GenreTitle, Title
+
+
+@pytest.mark.django_db
+class TestImportFromCsv:
+
+    def test_bulk_import_all(self):
+        call_command('import_from_csv', '--all', '--bulk', '--batch-size=7')
+        assert Title.objects.exists()
+        assert GenreTitle.objects.exists()
+        assert Comment.objects.exists()
+        title = Title.objects.filter(reviews__isnull=False).first()
+        scores = list(title.reviews.values_list('score', flat=True))
+        assert title.rating_sum == sum(scores), (
+            'Проверьте, что после массового импорта пересчитан рейтинг')
+        assert title.rating_count == len(scores)
+
+    def test_import_is_atomic(self, settings, tmp_path):
+        (tmp_path / 'genre.csv').write_text(
+            'id,name,slug\n1,Драма,drama\n2,Комедия,drama\n',
+            encoding='utf-8')
+        settings.CSV_DIR = str(tmp_path)
+        for options in ([], ['--bulk', '--batch-size=1']):
+            with pytest.raises(CommandError):
+                call_command('import_from_csv', 'genre.csv', 'Genre',
+                             *options)
+            assert not Genre.objects.exists(), (
+                'Проверьте, что при ошибке импорт полностью откатывается')
@@ -0,0 +1,167 @@
+import pytest
+from django.core.management import call_command
+
+from reviews.models import (Category, Genre, LeaderboardEntry, Review,
+                            Title)
+
+
+@pytest.fixture
+def small_leaderboards(settings):
+    settings.LEADERBOARD_SIZE = 3
+    settings.LEADERBOARD_MIN_REVIEWS = 2
+
+
+@pytest.fixture
+def rated_titles(small_leaderboards, many_titles, django_user_model):
+    """Произведение i получает две оценки i + 1."""
+    authors = [
+        django_user_model.objects.create_user(
+            username=f'critic{i}', email=f'critic{i}@yamdb.fake')
+        for i in range(2)
+    ]
+    for i, title in enumerate(many_titles):
+        for author in authors:
+            Review.objects.create(
+                title=title, author=author, text='Т', score=i + 1)
+    return many_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class TestLeaderboards:
+
+    def test_top_titles(self, client, rated_titles):
+        response = client.get('/api/v1/titles/top/')
+        assert response.status_code == 200
+        data = response.json()
+        assert [entry['title']['name'] for entry in data] == [
+            'Произведение 9', 'Произведение 8', 'Произведение 7'], (
+            'Проверьте, что рейтинг упорядочен по средней оценке '
+            'и ограничен LEADERBOARD_SIZE')
+        assert data[0]['position'] == 1
+        assert data[0]['rating'] == 10
+        assert data[0]['rating_count'] == 2
+
+        assert len(client.get('/api/v1/titles/top/?limit=1').json()) == 1
+        names = [entry['title']['name'] for entry in client.get(
+            '/api/v1/titles/top/?genre=drama').json()]
+        assert names[0] == 'Произведение 9'
+
+    def test_min_reviews(self, client, small_leaderboards, title, user):
+        Review.objects.create(title=title, author=user, text='Т', score=10)
+        assert client.get('/api/v1/titles/top/').json() == [], (
+            'Проверьте, что в рейтинг попадают только произведения '
+            'с минимальным числом отзывов')
+
+    def test_incremental_refresh(self, client, rated_titles):
+        review = Review.objects.filter(title=rated_titles[0]).first()
+        review.score = 10
+        review.save()
+        Review.objects.filter(title=rated_titles[0]).exclude(
+            pk=review.pk).get().delete()
+        assert client.get('/api/v1/titles/top/').json() != [], (
+            'Проверьте, что пустые рейтинги не остаются после изменений')
+
+        for review in Review.objects.filter(title=rated_titles[1]):
+            review.score = 10
+            review.save()
+        names = [entry['title']['name'] for entry in client.get(
+            '/api/v1/titles/top/').json()]
+        assert names == [
+            'Произведение 1', 'Произведение 9', 'Произведение 8'], (
+            'Проверьте, что рейтинг обновляется при изменении оценок')
+
+        rated_titles[1].delete()
+        names = [entry['title']['name'] for entry in client.get(
+            '/api/v1/titles/top/').json()]
+        assert names == [
+            'Произведение 9', 'Произведение 8', 'Произведение 7']
+
+    def test_member_overtaken_from_outside(self, client, rated_titles):
+        for review in Review.objects.filter(title=rated_titles[9]):
+            review.score = 1
+            review.save()
+        names = [entry['title']['name'] for entry in client.get(
+            '/api/v1/titles/top/').json()]
+        assert names == [
+            'Произведение 8', 'Произведение 7', 'Произведение 6'], (
+            'Проверьте, что опустившееся произведение уступает место '
+            'лучшему произведению вне рейтинга')
+
+    def test_write_conflict_is_retried(self, rated_titles, monkeypatch):
+        from django.db import IntegrityError
+
+        from reviews import leaderboards
+
+        bulk_create = LeaderboardEntry.objects.bulk_create
+        calls = []
+
+        def conflict_once(objs, *args, **kwargs):
+            calls.append(len(objs))
+            if len(calls) == 1:
+                raise IntegrityError('unique_board_position')
+            return bulk_create(objs, *args, **kwargs)
+
+        LeaderboardEntry.objects.all().delete()
+        monkeypatch.setattr(LeaderboardEntry.objects, 'bulk_create',
+                            conflict_once)
+        leaderboards.refresh_board('all')
+        assert len(calls) == 2
+        assert LeaderboardEntry.objects.filter(board='all').count() == 3
+
+        def always_conflict(objs, *args, **kwargs):
+            raise IntegrityError('unique_board_position')
+
+        LeaderboardEntry.objects.all().delete()
+        monkeypatch.setattr(LeaderboardEntry.objects, 'bulk_create',
+                            always_conflict)
+        with pytest.raises(IntegrityError):
+            leaderboards.refresh_board('all')
+
+    def test_category_change(self, client, rated_titles):
+        other = Category.objects.create(name='Книга', slug='book')
+        title = Title.objects.get(name='Произведение 9')
+        title.category = other
+        title.save()
+        assert [entry['title']['name'] for entry in client.get(
+            '/api/v1/titles/top/?category=book').json()] == [title.name]
+        assert title.name not in [
+            entry['title']['name'] for entry in client.get(
+                '/api/v1/titles/top/?category=movie').json()]
+
+    def test_genre_deleted(self, client, admin_client, rated_titles):
+        assert client.get('/api/v1/titles/top/?genre=comedy').json()
+        response = admin_client.delete('/api/v1/genres/comedy/')
+        assert response.status_code == 204
+        assert client.get('/api/v1/titles/top/?genre=comedy').json() == [], (
+            'Проверьте, что рейтинг удалённого жанра удаляется')
+        assert not LeaderboardEntry.objects.filter(board='genre:comedy')
+
+    def test_slug_changed(self, client, rated_titles):
+        top = client.get('/api/v1/titles/top/?genre=comedy').json()
+        genre = Genre.objects.get(slug='comedy')
+        genre.slug = 'sitcom'
+        genre.save()
+        category = Category.objects.get(slug='movie')
+        category.slug = 'film'
+        category.save()
+        assert client.get('/api/v1/titles/top/?genre=comedy').json() == []
+        assert [entry['title']['id'] for entry in client.get(
+            '/api/v1/titles/top/?genre=sitcom').json()] == [
+            entry['title']['id'] for entry in top], (
+            'Проверьте, что рейтинг жанра переносится на новый slug')
+        assert client.get('/api/v1/titles/top/?category=movie').json() == []
+        assert len(client.get(
+            '/api/v1/titles/top/?category=film').json()) == 3
+
+    def test_rebuild_command(self, client, rated_titles):
+        LeaderboardEntry.objects.all().delete()
+        call_command('rebuild_leaderboards')
+        boards = set(LeaderboardEntry.objects.values_list('board', flat=True))
+        assert boards == {'all', 'genre:drama', 'genre:comedy',
+                          'category:movie'}
+        assert LeaderboardEntry.objects.filter(board='all').count() == 3
+
+    def test_bad_params(self, client):
+        assert client.get(
+            '/api/v1/titles/top/?genre=a&category=b').status_code == 400
+        assert client.get('/api/v1/titles/top/?limit=x').status_code == 400
@@ -0,0 +1,67 @@
+import pytest
+
+from api.metrics import archive_process, registry
+
+
+@pytest.mark.django_db
+class TestMetrics:
+
+    def test_metrics_by_view_and_action(self, client, admin_client, title):
+        registry.clear()
+        client.get('/api/v1/titles/')
+        client.get(f'/api/v1/titles/{title.pk}/')
+        client.post('/api/v1/auth/signup/', data={})
+        response = admin_client.get('/metrics')
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain')
+        text = response.content.decode()
+        assert ('yamdb_request_duration_seconds_count{view="TitleViewSet",'
+                'action="list",status="200"} 1') in text, (
+            'Проверьте, что запросы учитываются по вьюсету и действию')
+        assert 'action="retrieve",status="200"' in text
+        assert 'view="SignUp",action="post",status="400"' in text
+        assert ('yamdb_db_queries_total{view="TitleViewSet",action="list",'
+                'status="200"} 3') in text
+
+    def test_metrics_admin_only(self, client, user_client):
+        assert client.get('/metrics').status_code == 401
+        assert user_client.get('/metrics').status_code == 403
+
+    def test_multiprocess_aggregation(self, settings, tmp_path, client,
+                                      admin_client):
+        settings.METRICS_MULTIPROC_DIR = str(tmp_path)
+        registry.clear()
+        client.get('/api/v1/genres/')
+        (tmp_path / 'metrics_1.json').write_text(
+            '[{"labels": ["GenreViewSet", "list", "200"],'
+            ' "buckets": [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],'
+            ' "count": 1, "sum": 0.001, "queries": 2, "db_time": 0.0005}]')
+        text = admin_client.get('/metrics').content.decode()
+        assert ('yamdb_request_duration_seconds_count{view="GenreViewSet",'
+                'action="list",status="200"} 2') in text, (
+            'Проверьте, что метрики воркеров суммируются')
+
+    def test_dead_worker_archived(self, settings, tmp_path, client,
+                                  admin_client):
+        settings.METRICS_MULTIPROC_DIR = str(tmp_path)
+        registry.clear()
+        client.get('/api/v1/genres/')
+        for pid in (1, 2):
+            (tmp_path / f'metrics_{pid}.json').write_text(
+                '[{"labels": ["GenreViewSet", "list", "200"],'
+                ' "buckets": [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],'
+                ' "count": 1, "sum": 0.001, "queries": 2, "db_time": 0.0}]')
+            (tmp_path / f'pools_{pid}.json').write_text(
+                '{"default": {"size": 4, "open": 2, "idle": 2, "in_use": 0,'
+                ' "checkouts": 5}}')
+            archive_process(str(tmp_path), pid)
+        assert not (tmp_path / 'metrics_1.json').exists()
+        assert not (tmp_path / 'pools_2.json').exists(), (
+            'Проверьте, что файлы завершившегося воркера удаляются')
+        text = admin_client.get('/metrics').content.decode()
+        assert ('yamdb_request_duration_seconds_count{view="GenreViewSet",'
+                'action="list",status="200"} 3') in text, (
+            'Проверьте, что значения завершившихся воркеров сохраняются')
+        assert 'yamdb_db_pool_checkouts_total{alias="default"} 10' in text
+        assert ('yamdb_db_pool_connections{alias="default",state="open"} 0'
+                in text)
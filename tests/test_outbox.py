@@ -0,0 +1,150 @@
+import pytest
+from django.core import mail
+from django.core.management import call_command
+
+from users.models import OutgoingEmail, User
+
+
+@pytest.mark.django_db
+class TestEmailOutbox:
+
+    def test_signup_queues_email(self, client):
+        response = client.post('/api/v1/auth/signup/', data={
+            'username': 'newuser', 'email': 'newuser@yamdb.fake'})
+        assert response.status_code == 200
+        assert len(mail.outbox) == 0, (
+            'Проверьте, что письмо не отправляется во время запроса')
+        email = OutgoingEmail.objects.get()
+        assert email.to == 'newuser@yamdb.fake'
+        assert email.status == OutgoingEmail.Status.PENDING
+
+        call_command('send_emails')
+        assert len(mail.outbox) == 1
+        assert 'confirmation_code' in mail.outbox[0].body
+        email.refresh_from_db()
+        assert email.status == OutgoingEmail.Status.SENT
+        assert email.body == '', (
+            'Проверьте, что код подтверждения не хранится после отправки')
+
+    def test_failed_email_is_retried(self, settings):
+        settings.EMAIL_BACKEND = 'tests.test_outbox.FailingBackend'
+        email = OutgoingEmail.objects.create(
+            subject='Тема', body='Текст', from_email='a@yamdb.fake',
+            to='b@yamdb.fake')
+        call_command('send_emails', '--max-attempts=2')
+        email.refresh_from_db()
+        assert email.status == OutgoingEmail.Status.PENDING
+        assert email.attempts == 1
+        assert email.next_attempt_at > email.created, (
+            'Проверьте, что повторная отправка откладывается')
+
+        OutgoingEmail.objects.update(next_attempt_at=email.created)
+        call_command('send_emails', '--max-attempts=2')
+        email.refresh_from_db()
+        assert email.status == OutgoingEmail.Status.FAILED
+        assert email.last_error == 'SMTP недоступен'
+        assert email.body == ''
+
+    def test_crash_does_not_resend_delivered(self, settings):
+        settings.EMAIL_BACKEND = 'tests.test_outbox.CrashingBackend'
+        emails = [
+            OutgoingEmail.objects.create(
+                subject='Тема', body='Текст', from_email='a@yamdb.fake',
+                to=f'user{i}@yamdb.fake')
+            for i in range(3)
+        ]
+        CrashingBackend.sent = []
+        with pytest.raises(KeyboardInterrupt):
+            call_command('send_emails')
+        statuses = [OutgoingEmail.objects.get(pk=email.pk).status
+                    for email in emails]
+        assert statuses == [OutgoingEmail.Status.SENT] + [
+            OutgoingEmail.Status.SENDING] * 2, (
+            'Проверьте, что статус письма сохраняется сразу после отправки')
+
+        settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+        call_command('send_emails')
+        assert len(mail.outbox) == 0, (
+            'Проверьте, что взятые в отправку письма не отправляются '
+            'повторно до EMAIL_OUTBOX_CLAIM_TIMEOUT')
+        settings.EMAIL_OUTBOX_CLAIM_TIMEOUT = 0
+        call_command('send_emails')
+        assert sorted(message.to[0] for message in mail.outbox) == [
+            'user1@yamdb.fake', 'user2@yamdb.fake']
+
+    def test_abandoned_claims_count_as_attempts(self, settings):
+        settings.EMAIL_BACKEND = 'tests.test_outbox.CrashingBackend'
+        settings.EMAIL_OUTBOX_CLAIM_TIMEOUT = 0
+        email = OutgoingEmail.objects.create(
+            subject='Тема', body='Текст', from_email='a@yamdb.fake',
+            to='b@yamdb.fake')
+        CrashingBackend.sent = [object()]
+        for _ in range(3):
+            with pytest.raises(KeyboardInterrupt):
+                call_command('send_emails', '--max-attempts=3')
+        email.refresh_from_db()
+        assert email.status == OutgoingEmail.Status.SENDING
+        assert email.attempts == 2
+
+        call_command('send_emails', '--max-attempts=3')
+        email.refresh_from_db()
+        assert email.status == OutgoingEmail.Status.FAILED, (
+            'Проверьте, что письмо, на котором падает отправитель, '
+            'не отправляется бесконечно')
+        assert email.attempts == 3
+        assert email.body == ''
+
+    def test_admin_hides_body(self, client):
+        client.force_login(User.objects.create_superuser(
+            'root', 'root@yamdb.fake', 'password'))
+        email = OutgoingEmail.objects.create(
+            subject='Тема', body='confirmation_code: secret',
+            from_email='a@yamdb.fake', to='b@yamdb.fake')
+        response = client.get(
+            f'/admin/users/outgoingemail/{email.pk}/change/')
+        assert response.status_code == 200
+        assert 'secret' not in response.content.decode()
+
+    def test_signup_is_atomic(self, client, monkeypatch):
+        def fail(*args, **kwargs):
+            raise RuntimeError('outbox is unavailable')
+
+        monkeypatch.setattr(OutgoingEmail.objects, 'create', fail)
+        with pytest.raises(RuntimeError):
+            client.post('/api/v1/auth/signup/', data={
+                'username': 'newuser', 'email': 'newuser@yamdb.fake'})
+        assert not User.objects.filter(username='newuser').exists(), (
+            'Проверьте, что пользователь и письмо создаются в одной '
+            'транзакции')
+
+
+class FailingBackend:
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send_messages(self, messages):
+        raise ConnectionError('SMTP недоступен')
+
+
+class CrashingBackend(FailingBackend):
+    """Отправляет первое письмо, на втором процесс падает."""
+    sent = []
+
+    def send_messages(self, messages):
+        if self.sent:
+            raise KeyboardInterrupt
+        self.sent.extend(messages)
+        return len(messages)
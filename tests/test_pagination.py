@@ -0,0 +1,68 @@
+from base64 import b64decode
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from reviews.models import Title
+
+
+@pytest.mark.django_db
+class TestCursorPagination:
+
+    def walk(self, client, url):
+        names, pages = [], 0
+        while url:
+            response = client.get(url)
+            assert response.status_code == 200
+            data = response.json()
+            assert 'count' not in data, (
+                'Проверьте, что в курсорном режиме не считается COUNT(*)')
+            names.extend(data['results'])
+            url = data['next']
+            pages += 1
+        return names, pages
+
+    def test_titles_cursor(self, client, many_titles,
+                           django_assert_num_queries):
+        with django_assert_num_queries(2):
+            response = client.get('/api/v1/titles/?pagination=cursor')
+        assert response.status_code == 200
+        results, pages = self.walk(client, '/api/v1/titles/?pagination=cursor')
+        assert pages == 2
+        assert [title['name'] for title in results] == sorted(
+            title.name for title in many_titles), (
+            'Проверьте, что курсорная пагинация обходит все произведения '
+            'в порядке name')
+
+    def test_reviews_cursor(self, client, title, many_reviews):
+        results, _ = self.walk(
+            client, f'/api/v1/titles/{title.pk}/reviews/?pagination=cursor')
+        assert [review['id'] for review in results] == [
+            review.pk for review in reversed(many_reviews)]
+
+    def test_page_number_by_default(self, client, many_titles):
+        response = client.get('/api/v1/titles/')
+        assert response.json()['count'] == len(many_titles)
+
+    def test_titles_cursor_same_names(self, client, category):
+        Title.objects.bulk_create(
+            Title(name=f'Т{index % 2}', year=2000, category=category)
+            for index in range(12))
+        titles = list(Title.objects.order_by('name', 'id'))
+        results, pages = self.walk(client, '/api/v1/titles/?pagination=cursor')
+        assert pages == 3
+        assert [title['id'] for title in results] == [
+            title.pk for title in titles], (
+            'Проверьте, что курсор учитывает id при одинаковых name')
+
+    def test_cursor_without_offset(self, client, category):
+        Title.objects.bulk_create(
+            Title(name='Т', year=2000, category=category) for _ in range(7))
+        url = client.get('/api/v1/titles/?pagination=cursor').json()['next']
+        cursor = parse_qs(urlparse(url).query)['cursor'][0]
+        assert 'o=' not in b64decode(cursor).decode(), (
+            'Проверьте, что курсор не пропускает строки смещением')
+        previous = client.get(url).json()['previous']
+        assert [title['id'] for title in client.get(
+            previous).json()['results']] == list(
+            Title.objects.order_by('id').values_list('pk', flat=True)[:5])
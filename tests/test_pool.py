@@ -0,0 +1,110 @@
+import pytest
+from django.db.utils import load_backend
+
+from api.metrics import render_pool_metrics
+from api_yamdb.backends.pool import (ConnectionPool, PoolTimeout, close_pools,
+                                     pool_stats)
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = False
+        self.broken = False
+
+    def close(self):
+        self.closed = True
+
+
+def check(connection):
+    return not connection.broken
+
+
+def reset(connection):
+    return not connection.broken
+
+
+class TestConnectionPool:
+
+    def test_reuse_and_size(self):
+        pool = ConnectionPool(size=2, timeout=0, max_lifetime=60,
+                              check_idle_after=0)
+        first = pool.acquire(FakeConnection, check)
+        second = pool.acquire(FakeConnection, check)
+        with pytest.raises(PoolTimeout):
+            pool.acquire(FakeConnection, check)
+        pool.release(first, reset)
+        assert pool.acquire(FakeConnection, check) is first, (
+            'Проверьте, что возвращённое соединение выдаётся повторно')
+        stats = pool.get_stats()
+        assert stats['created'] == 2 and stats['timeouts'] == 1
+        assert stats['in_use'] == 2 and stats['idle'] == 0
+        pool.release(second, reset)
+        assert pool.get_stats()['idle'] == 1
+
+    def test_health_check_on_checkout(self):
+        pool = ConnectionPool(size=1, timeout=0, max_lifetime=60,
+                              check_idle_after=0)
+        connection = pool.acquire(FakeConnection, check)
+        pool.release(connection, reset)
+        connection.broken = True
+        fresh = pool.acquire(FakeConnection, check)
+        assert fresh is not connection and connection.closed, (
+            'Проверьте, что неисправное соединение закрывается при выдаче')
+        assert pool.get_stats()['health_check_failures'] == 1
+
+    def test_max_lifetime(self):
+        pool = ConnectionPool(size=1, timeout=0, max_lifetime=0,
+                              check_idle_after=0)
+        connection = pool.acquire(FakeConnection, check)
+        pool.release(connection, reset)
+        assert connection.closed
+        assert pool.get_stats()['expired'] == 1
+        assert pool.acquire(FakeConnection, check) is not connection
+
+    def test_failed_connect_frees_slot(self):
+        pool = ConnectionPool(size=1, timeout=0, max_lifetime=60,
+                              check_idle_after=0)
+
+        def refuse():
+            raise OSError('refused')
+
+        with pytest.raises(OSError):
+            pool.acquire(refuse, check)
+        assert pool.acquire(FakeConnection, check)
+
+
+class TestPooledBackend:
+
+    @pytest.fixture
+    def wrapper(self, tmp_path, django_db_blocker):
+        backend = load_backend('api_yamdb.backends.sqlite3')
+        wrapper = backend.DatabaseWrapper({
+            'ENGINE': 'api_yamdb.backends.sqlite3',
+            'NAME': str(tmp_path / 'pool.sqlite3'),
+            'POOL': {'SIZE': 1},
+            'ATOMIC_REQUESTS': False, 'AUTOCOMMIT': True, 'CONN_MAX_AGE': 0,
+            'OPTIONS': {}, 'TIME_ZONE': None, 'USER': '', 'PASSWORD': '',
+            'HOST': '', 'PORT': '', 'TEST': {},
+        }, alias='pool_test')
+        with django_db_blocker.unblock():
+            yield wrapper
+        close_pools()
+
+    def test_sqlite_backend(self, wrapper):
+        with wrapper.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id integer)')
+        raw = wrapper.connection
+        wrapper.close()
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM item')
+        assert wrapper.connection is raw, (
+            'Проверьте, что бэкенд берёт соединение из пула')
+        wrapper.close()
+
+        stats = pool_stats()['pool_test']
+        assert stats['created'] == 1 and stats['idle'] == 1
+        text = render_pool_metrics(pool_stats())
+        assert ('yamdb_db_pool_connections{alias="pool_test",state="idle"} 1'
+                in text)
+        assert 'yamdb_db_pool_checkouts_total{alias="pool_test"} 2' in text
@@ -0,0 +1,128 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestTitleQueries:
+
+    def test_title_list_queries(self, client, many_titles,
+                                django_assert_num_queries):
+        # COUNT для пагинации, произведения с категориями, жанры
+        with django_assert_num_queries(3):
+            response = client.get('/api/v1/titles/')
+        assert response.status_code == 200
+        assert len(response.json()['results']) == 5
+        assert response.json()['results'][0]['genre'], (
+            'Проверьте, что в списке произведений выводятся жанры')
+
+    def test_title_list_filtered_queries(self, client, many_titles,
+                                         django_assert_num_queries):
+        with django_assert_num_queries(3):
+            response = client.get(
+                '/api/v1/titles/?genre=comedy&category=movie')
+        assert response.status_code == 200
+        assert response.json()['count'] == len(many_titles), (
+            'Проверьте, что фильтрация по slug жанра и категории работает')
+
+    def test_title_detail_queries(self, client, title,
+                                  django_assert_num_queries):
+        with django_assert_num_queries(2):
+            response = client.get(f'/api/v1/titles/{title.pk}/')
+        assert response.status_code == 200
+        assert response.json()['category']['slug'] == 'movie'
+        assert len(response.json()['genre']) == 2
+
+
+@pytest.mark.django_db
+class TestReviewCommentQueries:
+
+    def test_review_list_queries(self, client, title, many_reviews,
+                                 django_assert_num_queries):
+        # updated_at произведения, COUNT для пагинации и отзывы с авторами
+        with django_assert_num_queries(3):
+            response = client.get(f'/api/v1/titles/{title.pk}/reviews/')
+        assert response.status_code == 200
+        results = response.json()['results']
+        assert len(results) == 5
+        assert results[0]['author'].startswith('reviewer'), (
+            'Проверьте, что в отзыве выводится username автора')
+
+    def test_review_list_missing_title(self, client, title):
+        response = client.get(f'/api/v1/titles/{title.pk + 1}/reviews/')
+        assert response.status_code == 404, (
+            'Проверьте, что для несуществующего произведения '
+            'возвращается статус 404')
+
+    def test_review_list_empty(self, client, title):
+        response = client.get(f'/api/v1/titles/{title.pk}/reviews/')
+        assert response.status_code == 200
+        assert response.json()['results'] == []
+
+    def test_comment_list_queries(self, client, title, many_reviews,
+                                  many_comments, django_assert_num_queries):
+        review = many_reviews[0]
+        url = f'/api/v1/titles/{title.pk}/reviews/{review.pk}/comments/'
+        # updated_at отзыва, COUNT и комментарии
+        with django_assert_num_queries(3):
+            response = client.get(url)
+        assert response.status_code == 200
+        assert len(response.json()['results']) == 5
+
+    def test_comment_list_wrong_title(self, client, title, another_title,
+                                      many_reviews):
+        review = many_reviews[0]
+        url = (f'/api/v1/titles/{another_title.pk}/reviews/'
+               f'{review.pk}/comments/')
+        assert client.get(url).status_code == 404, (
+            'Проверьте, что отзыв ищется только среди отзывов '
+            'указанного произведения')
+
+
+@pytest.mark.django_db
+class TestTitleWriteQueries:
+
+    @pytest.fixture
+    def many_genres(self):
+        from reviews.models import Genre
+        return [Genre.objects.create(name=f'Жанр {i}', slug=f'genre-{i}')
+                for i in range(8)]
+
+    def test_genres_resolved_together(self, admin_client, category,
+                                      many_genres):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        slugs = [genre.slug for genre in many_genres]
+        with CaptureQueriesContext(connection) as captured:
+            response = admin_client.post('/api/v1/titles/', {
+                'name': 'Новое', 'year': 2000, 'category': category.slug,
+                'genre': slugs,
+            }, format='json')
+        assert response.status_code == 201
+        assert sorted(response.json()['genre']) == sorted(slugs)
+        genre_selects = [
+            query for query in captured.captured_queries
+            if '"reviews_genre"."slug" IN' in query['sql']
+        ]
+        assert len(genre_selects) == 1, (
+            'Проверьте, что slug-и жанров разрешаются одним запросом')
+
+    def test_unknown_genres_reported_together(self, admin_client, category,
+                                              genres):
+        response = admin_client.post('/api/v1/titles/', {
+            'name': 'Новое', 'year': 2000, 'category': category.slug,
+            'genre': ['drama', 'unknown-1', 'unknown-2'],
+        }, format='json')
+        assert response.status_code == 400
+        message = response.json()['genre'][0]
+        assert 'unknown-1' in message and 'unknown-2' in message
+
+    def test_patch_writes_only_diff(self, admin_client, title, genres):
+        from reviews.models import GenreTitle
+
+        kept = GenreTitle.objects.get(title=title, genre=genres[0])
+        response = admin_client.patch(f'/api/v1/titles/{title.pk}/', {
+            'genre': [genres[0].slug],
+        }, format='json')
+        assert response.status_code == 200
+        assert list(GenreTitle.objects.filter(title=title)) == [kept], (
+            'Проверьте, что при PATCH сохраняются неизменившиеся связи')
@@ -0,0 +1,188 @@
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from reviews.models import Comment, Review, Title
+
+
+@pytest.mark.django_db
+class TestTitleRating:
+
+    def test_rating_follows_reviews(self, title, user, another_user):
+        review = Review.objects.create(
+            title=title, author=user, text='Текст', score=10)
+        Review.objects.create(
+            title=title, author=another_user, text='Текст', score=5)
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (15, 2), (
+            'Проверьте, что при создании отзыва обновляется рейтинг')
+        assert title.rating == 7.5
+
+        review.score = 1
+        review.save()
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (6, 2), (
+            'Проверьте, что при изменении оценки обновляется рейтинг')
+
+        review = Review.objects.get(pk=review.pk)
+        review.score = 3
+        review.save()
+        review.delete()
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (5, 1), (
+            'Проверьте, что при удалении отзыва обновляется рейтинг')
+
+    def test_rating_with_stale_instances(self, title, user):
+        review = Review.objects.create(
+            title=title, author=user, text='Т', score=5)
+        first = Review.objects.get(pk=review.pk)
+        second = Review.objects.get(pk=review.pk)
+        first.score = 9
+        first.save()
+        second.score = 2
+        second.save()
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (2, 1), (
+            'Проверьте, что разница оценок считается от оценки в базе, '
+            'а не в загруженном объекте')
+        assert title.score_2_count == 1 and title.score_9_count == 0
+        first.delete()
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (0, 0)
+        assert title.score_2_count == 0
+
+    def test_rating_follows_cascade_delete(self, title, user, another_user):
+        Review.objects.create(title=title, author=user, text='Т', score=4)
+        Review.objects.create(
+            title=title, author=another_user, text='Т', score=8)
+        another_user.delete()
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (4, 1)
+
+    def test_empty_rating(self, title):
+        assert title.rating is None
+
+    def test_rebuild_ratings(self, title, another_title, user):
+        Review.objects.create(title=title, author=user, text='Т', score=9)
+        Title.objects.update(rating_sum=0, rating_count=0)
+        with pytest.raises(CommandError):
+            call_command('rebuild_ratings', '--check')
+
+        call_command('rebuild_ratings')
+        title.refresh_from_db()
+        another_title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (9, 1)
+        assert (another_title.rating_sum, another_title.rating_count) == (0, 0)
+        call_command('rebuild_ratings', '--check')
+
+
+@pytest.mark.django_db
+class TestScoreDistribution:
+
+    def test_distribution_follows_reviews(self, title, user, another_user):
+        review = Review.objects.create(
+            title=title, author=user, text='Т', score=10)
+        Review.objects.create(
+            title=title, author=another_user, text='Т', score=5)
+        review.score = 3
+        review.save()
+        title.refresh_from_db()
+        distribution = title.score_distribution
+        assert (distribution[3], distribution[5], distribution[10]) == (
+            1, 1, 0), (
+            'Проверьте, что распределение оценок обновляется '
+            'при создании и изменении отзыва')
+
+        review.delete()
+        title.refresh_from_db()
+        assert sum(title.score_distribution.values()) == 1
+
+    def test_distribution_endpoints(self, client, title, many_reviews):
+        response = client.get(f'/api/v1/titles/{title.pk}/')
+        assert response.json()['score_distribution'] == {
+            str(score): int(score <= 7) for score in Title.SCORES}
+
+        response = client.get(f'/api/v1/titles/{title.pk}/scores/')
+        assert response.status_code == 200
+        assert response.json()['rating_count'] == 7
+        assert response.json()['score_distribution']['7'] == 1
+        assert client.get(
+            f'/api/v1/titles/{title.pk + 1}/scores/').status_code == 404
+
+    def test_rebuild_distribution(self, title, many_reviews):
+        Title.objects.update(score_1_count=5, score_2_count=0)
+        with pytest.raises(CommandError):
+            call_command('rebuild_ratings', '--check')
+        call_command('rebuild_ratings')
+        title.refresh_from_db()
+        assert title.score_distribution[1] == 1
+        assert title.score_distribution[2] == 1
+
+
+@pytest.mark.django_db
+class TestCounters:
+
+    def test_comments_count_follows_comments(self, many_comments):
+        review = many_comments[0].review
+        review.refresh_from_db()
+        assert review.comments_count == len(many_comments), (
+            'Проверьте, что при создании комментария растёт счётчик отзыва')
+
+        many_comments[0].text = 'Изменённый'
+        many_comments[0].save()
+        many_comments[1].delete()
+        many_comments[2].author.delete()
+        review.refresh_from_db()
+        assert review.comments_count == len(many_comments) - 2, (
+            'Проверьте, что при удалении комментария счётчик уменьшается')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_comment_and_counter_commit_together(self, title, user,
+                                                  monkeypatch):
+        from reviews import signals
+
+        review = Review.objects.create(
+            title=title, author=user, text='Т', score=5)
+
+        def fail(review_id, delta):
+            raise RuntimeError('counter update failed')
+
+        monkeypatch.setattr(signals, 'change_comments_count', fail)
+        with pytest.raises(RuntimeError):
+            Comment.objects.create(review=review, author=user, text='К')
+        assert not Comment.objects.exists(), (
+            'Проверьте, что комментарий сохраняется в одной транзакции '
+            'со счётчиком отзыва')
+
+    def test_counters_in_api(self, client, title, many_comments):
+        review = many_comments[0].review
+        for query in ('', '?fields=id,reviews_count'):
+            response = client.get(f'/api/v1/titles/{query}')
+            assert response.json()['results'][0]['reviews_count'] == 7
+        assert client.get(f'/api/v1/titles/{title.pk}/').json()[
+            'reviews_count'] == 7
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        for item in client.get(url).json()['results']:
+            assert item['comments_count'] == (
+                len(many_comments) if item['id'] == review.pk else 0)
+        assert client.get(f'{url}{review.pk}/').json()[
+            'comments_count'] == len(many_comments)
+
+    def test_comments_count_read_only(self, user_client, title, user):
+        review = Review.objects.create(
+            title=title, author=user, text='Т', score=5)
+        response = user_client.patch(
+            f'/api/v1/titles/{title.pk}/reviews/{review.pk}/',
+            {'comments_count': 100}, format='json')
+        assert response.status_code == 200
+        assert response.json()['comments_count'] == 0
+
+    def test_rebuild_comment_counts(self, many_comments):
+        Review.objects.update(comments_count=0)
+        with pytest.raises(CommandError):
+            call_command('rebuild_comment_counts', '--check')
+
+        call_command('rebuild_comment_counts')
+        review = Review.objects.get(pk=many_comments[0].review_id)
+        assert review.comments_count == len(many_comments)
+        call_command('rebuild_comment_counts', '--check')
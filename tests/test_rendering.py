@@ -0,0 +1,95 @@
+import pytest
+from django.core.cache import cache
+
+from reviews.models import Title
+
+
+@pytest.fixture
+def catalog(many_titles, many_comments, title):
+    Title.objects.create(name='Без категории\u2028', year=1990,
+                         description='Описание "в кавычках"')
+    title.description = 'Тюремная драма'
+    title.save()
+
+
+@pytest.mark.django_db
+class TestFastListRendering:
+
+    @pytest.mark.parametrize('url', [
+        '/api/v1/titles/',
+        '/api/v1/titles/?page=2',
+        '/api/v1/titles/?pagination=cursor',
+        '/api/v1/titles/?genre=drama&year=2001',
+        '/api/v1/titles/?search=драма',
+        '/api/v1/genres/',
+        '/api/v1/categories/?search=Фил',
+        '{reviews}',
+        '{reviews}?pagination=cursor',
+        '{reviews}{review}/comments/',
+    ])
+    def test_same_output_as_serializers(self, client, settings, catalog,
+                                        title, url):
+        url = url.format(reviews=f'/api/v1/titles/{title.pk}/reviews/',
+                         review=title.reviews.order_by('pk').first().pk)
+        settings.FAST_LIST_RENDERING = False
+        expected = client.get(url)
+        cache.clear()
+        settings.FAST_LIST_RENDERING = True
+        response = client.get(url)
+        assert response.status_code == expected.status_code == 200
+        assert response.content == expected.content, (
+            'Проверьте, что быстрый путь отдаёт тот же ответ, '
+            'что и сериализаторы')
+
+    def test_fast_path_queries(self, client, many_titles,
+                               django_assert_num_queries):
+        with django_assert_num_queries(3):
+            response = client.get('/api/v1/titles/')
+        assert len(response.json()['results']) == 5
+
+    def test_missing_parent(self, client, title):
+        assert client.get(
+            f'/api/v1/titles/{title.pk + 1}/reviews/').status_code == 404
+        assert client.get(
+            f'/api/v1/titles/{title.pk}/reviews/').json()['results'] == []
+
+
+@pytest.mark.django_db
+class TestSparseFields:
+
+    @pytest.mark.parametrize('fast', [True, False])
+    def test_title_fields(self, client, settings, many_titles, fast,
+                          django_assert_num_queries):
+        settings.FAST_LIST_RENDERING = fast
+        # COUNT и произведения, без запроса жанров
+        with django_assert_num_queries(2) as captured:
+            response = client.get(
+                '/api/v1/titles/?fields=year,id,rating,name')
+        assert response.status_code == 200
+        item = response.json()['results'][0]
+        assert list(item) == ['id', 'rating', 'name', 'year'], (
+            'Проверьте, что ответ содержит только запрошенные поля')
+        sql = captured.captured_queries[-1]['sql']
+        assert 'description' not in sql and 'reviews_category' not in sql, (
+            'Проверьте, что в запросе выбираются только нужные колонки')
+
+    def test_title_detail_fields(self, client, title,
+                                 django_assert_num_queries):
+        with django_assert_num_queries(1):
+            response = client.get(
+                f'/api/v1/titles/{title.pk}/?fields=id,name,category')
+        assert response.json() == {
+            'id': title.pk, 'name': title.name,
+            'category': {'name': 'Фильм', 'slug': 'movie'}}
+
+    def test_review_fields_with_cursor(self, client, title, many_reviews):
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        response = client.get(f'{url}?fields=score&pagination=cursor')
+        assert response.json()['results'][0] == {'score': 7}
+        response = client.get(response.json()['next'])
+        assert len(response.json()['results']) == 2
+
+    def test_unknown_fields(self, client, title):
+        response = client.get('/api/v1/titles/?fields=id,secret')
+        assert response.status_code == 400
+        assert 'secret' in response.json()['fields'][0]
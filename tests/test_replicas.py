@@ -0,0 +1,119 @@
+import pytest
+from django.db import OperationalError, connections
+from django.test.utils import CaptureQueriesContext
+
+from api.replicas import health
+
+pytestmark = pytest.mark.django_db(
+    transaction=True, databases=['default', 'replica'])
+
+
+@pytest.fixture
+def replicas(settings):
+    settings.REPLICA_DATABASES = ['replica']
+    health.clear()
+    yield
+    health.clear()
+
+
+def count_queries(client, url, **extra):
+    """Число запросов к основной базе и к реплике и ответ."""
+    with CaptureQueriesContext(connections['default']) as primary, \
+            CaptureQueriesContext(connections['replica']) as replica:
+        response = client.get(url, **extra)
+    return len(primary), len(replica), response
+
+
+class TestReplicaRouting:
+
+    def test_reads_from_replica(self, client, replicas, title, many_reviews):
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        primary, replica, response = count_queries(client, url)
+        assert response.status_code == 200
+        assert len(response.json()['results']) == 5
+        assert primary == 0 and replica > 0, (
+            'Проверьте, что чтение вьюсетов выполняется на реплике')
+
+    def test_without_replicas(self, client, title):
+        primary, replica, response = count_queries(
+            client, f'/api/v1/titles/{title.pk}/reviews/')
+        assert response.status_code == 200
+        assert replica == 0
+
+    def test_sticky_after_write(self, user_client, client, replicas, title):
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        response = user_client.post(url, {'text': 'Т', 'score': 7})
+        assert response.status_code == 201
+        primary, replica, response = count_queries(user_client, url)
+        assert replica == 0 and primary > 0, (
+            'Проверьте, что после записи клиент читает с основной базы')
+        assert len(response.json()['results']) == 1
+
+        primary, replica, _ = count_queries(client, url)
+        assert replica > 0, (
+            'Проверьте, что остальные клиенты читают с реплики')
+
+    def test_sticky_window(self, user_client, settings, replicas, title):
+        settings.REPLICA_STICKY_SECONDS = 0
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        user_client.post(url, {'text': 'Т', 'score': 7})
+        primary, replica, _ = count_queries(user_client, url)
+        assert replica > 0
+
+    def test_lagging_replica(self, client, settings, replicas, title):
+        settings.REPLICA_MAX_LAG = -1
+        primary, replica, response = count_queries(
+            client, f'/api/v1/titles/{title.pk}/reviews/')
+        assert response.status_code == 200
+        assert primary > 0 and replica == 1, (
+            'Проверьте, что отстающая реплика не используется')
+
+    def test_replica_failure(self, client, replicas, title, many_reviews):
+        def fail(execute, sql, params, many, context):
+            if 'reviews_review' in sql:
+                raise OperationalError('replica is gone')
+            return execute(sql, params, many, context)
+
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        with connections['replica'].execute_wrapper(fail):
+            response = client.get(url)
+        assert response.status_code == 200, (
+            'Проверьте, что при отказе реплики запрос выполняется '
+            'на основной базе')
+        assert len(response.json()['results']) == 5
+        assert not health.is_healthy('replica')
+
+
+class TestReplicasAndResponseCache:
+
+    def title_reads(self, client):
+        """Запросы к таблице произведений на основной базе и на реплике."""
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = client.get('/api/v1/titles/')
+        assert response.status_code == 200
+        return [
+            sum('reviews_title' in query['sql'] for query in queries)
+            for queries in (primary, replica)
+        ] + [response]
+
+    def test_cache_filled_from_primary(self, client, replicas, many_titles):
+        primary, replica, _ = self.title_reads(client)
+        assert replica == 0 and primary > 0, (
+            'Проверьте, что кэш ответов не заполняется данными реплики')
+        primary, replica, _ = self.title_reads(client)
+        assert primary == replica == 0
+
+    def test_pinned_client_skips_cache(self, admin_client, client, replicas,
+                                       category, genres):
+        client.get('/api/v1/titles/')
+        response = admin_client.post(
+            '/api/v1/titles/',
+            {'name': 'Новое', 'year': 2000, 'category': category.slug,
+             'genre': [genres[0].slug]})
+        assert response.status_code == 201
+        client.get('/api/v1/titles/')
+        primary, replica, response = self.title_reads(admin_client)
+        assert primary > 0 and replica == 0, (
+            'Проверьте, что закреплённый клиент читает мимо кэша ответов')
+        assert response.json()['count'] == 1
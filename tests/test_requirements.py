@@ -15,3 +15,10 @@ class TestRequirements:
         assert 'gunicorn' in requirements, 'Проверьте, что добавили gunicorn в файл requirements.txt'
         assert 'django' in requirements, 'Проверьте, что добавили django в файл requirements.txt'
         assert 'pytest-django' in requirements, 'Проверьте, что добавили pytest-django в файл requirements.txt'
+
+    def test_fast_json_encoder_required(self):
+        with open(os.path.join(settings.BASE_DIR, 'requirements.txt')) as f:
+            requirements = f.read()
+        assert 'orjson==' in requirements, (
+            'Проверьте, что orjson для быстрой отрисовки списков '
+            'закреплён в requirements.txt')
@@ -0,0 +1,85 @@
+import pytest
+from django.core.management import call_command
+from django.db import connections
+
+from reviews.models import Review, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class TestFullTextSearch:
+
+    def test_title_search(self, client, title, another_title):
+        title.description = 'Тюремная драма, в которой есть надежда'
+        title.save()
+        Title.objects.create(name='Надежда', year=2000)
+        response = client.get('/api/v1/titles/?search=надежда')
+        assert response.status_code == 200
+        names = [item['name'] for item in response.json()['results']]
+        assert names == ['Надежда', title.name], (
+            'Проверьте, что поиск находит произведения по названию '
+            'и описанию и сортирует их по релевантности')
+
+    def test_title_search_follows_changes(self, client, title):
+        title.name = 'Зелёная миля'
+        title.save()
+        assert client.get(
+            '/api/v1/titles/?search=Шоушенка').json()['count'] == 0
+        assert client.get('/api/v1/titles/?search=миля').json()['count'] == 1
+        title.delete()
+        assert client.get('/api/v1/titles/?search=миля').json()['count'] == 0
+
+    def test_review_search(self, client, title, user, another_user):
+        Review.objects.create(
+            title=title, author=user, text='Отличный фильм', score=10)
+        Review.objects.create(
+            title=title, author=another_user, text='Скучно', score=2)
+        response = client.get(
+            f'/api/v1/titles/{title.pk}/reviews/?search=отличный')
+        assert [item['author'] for item in response.json()['results']] == [
+            user.username]
+
+    def test_search_special_characters(self, client, title):
+        response = client.get('/api/v1/titles/?search="*(OR')
+        assert response.status_code == 200
+
+    def test_rebuild_search_index(self, client, title):
+        call_command('rebuild_search_index')
+        assert client.get(
+            '/api/v1/titles/?search=шоушенка').json()['count'] == 1
+
+    def test_review_search_by_author(self, client, title, user,
+                                     another_user):
+        Review.objects.create(
+            title=title, author=user, text='Отличный фильм', score=10)
+        Review.objects.create(
+            title=title, author=another_user, text='Скучно', score=2)
+        response = client.get(
+            f'/api/v1/titles/{title.pk}/reviews/'
+            f'?search={another_user.username}')
+        assert [item['author'] for item in response.json()['results']] == [
+            another_user.username], (
+            'Проверьте, что отзывы ищутся и по имени автора')
+
+    def test_comment_search(self, client, title, many_comments):
+        comment = many_comments[0]
+        response = client.get(
+            f'/api/v1/titles/{title.pk}/reviews/{comment.review_id}/'
+            f'comments/?search={comment.author.username}')
+        assert response.status_code == 200
+        assert comment.pk in [item['id']
+                              for item in response.json()['results']]
+
+    def test_search_without_full_text(self, client, title, another_title,
+                                      monkeypatch):
+        monkeypatch.setattr(connections['default'], 'vendor', 'mysql')
+        response = client.get('/api/v1/titles/?search=Шоушенка')
+        assert response.status_code == 200, (
+            'Проверьте, что в других базах поиск работает через icontains')
+        assert [item['id'] for item in response.json()['results']] == [
+            title.pk]
+
+    def test_search_ignores_cursor_mode(self, client, title):
+        response = client.get(
+            '/api/v1/titles/?search=шоушенка&pagination=cursor')
+        assert response.json()['count'] == 1, (
+            'Проверьте, что результаты поиска не пагинируются курсором')
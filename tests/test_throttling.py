@@ -0,0 +1,99 @@
+import pytest
+
+from api.throttling import TokenBucketStore
+
+
+@pytest.fixture
+def rates(settings):
+    settings.REST_FRAMEWORK = dict(
+        settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES={
+            'signup_ip': '2/hour',
+            'token_ip': '3/min',
+            'token_username': '2/min',
+        })
+
+
+@pytest.mark.django_db
+class TestAuthThrottling:
+
+    def test_token_ip_limit(self, client, rates, user,
+                            django_assert_num_queries):
+        url = '/api/v1/auth/token/'
+        for i in range(3):
+            response = client.post(url, {'username': f'user{i}',
+                                         'confirmation_code': 'x'})
+            assert response.status_code != 429
+        with django_assert_num_queries(0):
+            response = client.post(url, {'username': 'another',
+                                         'confirmation_code': 'x'})
+        assert response.status_code == 429, (
+            'Проверьте, что запросы сверх лимита по IP отклоняются '
+            'без обращения к базе')
+        assert int(response['Retry-After']) > 0
+        assert client.post(url, {}, REMOTE_ADDR='10.0.0.2').status_code == 400
+
+    def test_token_username_limit(self, client, rates, user):
+        url = '/api/v1/auth/token/'
+        data = {'username': user.username, 'confirmation_code': 'x'}
+        statuses = [
+            client.post(url, data, REMOTE_ADDR=f'10.0.0.{i}').status_code
+            for i in range(3)
+        ]
+        assert statuses[:2] == [400, 400] and statuses[2] == 429, (
+            'Проверьте, что подбор кода к одному username ограничен '
+            'независимо от IP')
+
+    def test_signup_ip_limit(self, client, rates):
+        url = '/api/v1/auth/signup/'
+        for i in range(2):
+            assert client.post(url, {
+                'username': f'new{i}', 'email': f'new{i}@yamdb.fake'
+            }).status_code == 200
+        assert client.post(url, {
+            'username': 'new3', 'email': 'new3@yamdb.fake'
+        }).status_code == 429
+
+    def test_forwarded_for_ignored_without_proxies(self, client, rates):
+        url = '/api/v1/auth/signup/'
+        statuses = [
+            client.post(url, {
+                'username': f'new{i}', 'email': f'new{i}@yamdb.fake'
+            }, HTTP_X_FORWARDED_FOR=f'1.1.1.{i}, 10.0.0.5').status_code
+            for i in range(3)
+        ]
+        assert statuses == [200, 200, 429], (
+            'Проверьте, что без NUM_PROXIES подменой X-Forwarded-For '
+            'нельзя обойти лимит по IP')
+
+    def test_forwarded_for_behind_proxy(self, client, rates, settings):
+        settings.REST_FRAMEWORK = dict(settings.REST_FRAMEWORK, NUM_PROXIES=1)
+        url = '/api/v1/auth/signup/'
+        statuses = [
+            client.post(url, {
+                'username': f'new{i}', 'email': f'new{i}@yamdb.fake'
+            }, HTTP_X_FORWARDED_FOR=f'1.1.1.{i}, 10.0.0.5').status_code
+            for i in range(3)
+        ]
+        assert statuses == [200, 200, 429], (
+            'Проверьте, что за прокси IP берётся из адреса, '
+            'добавленного прокси')
+
+
+class TestTokenBucketStore:
+
+    def test_refill_and_wait(self):
+        store = TokenBucketStore(max_size=10)
+        assert store.consume('a', 2, 1000) == 0
+        assert store.consume('a', 2, 1000) == 0
+        assert store.consume('b', 1, 1 / 60) == 0
+        wait = store.consume('b', 1, 1 / 60)
+        assert 0 < wait <= 60
+
+    def test_bounded_size(self):
+        store = TokenBucketStore(max_size=2)
+        store.consume('a', 1, 1 / 60)
+        store.consume('b', 1, 1 / 60)
+        store.consume('c', 1, 1 / 60)
+        assert len(store._data) == 2
+        assert store.consume('a', 1, 1 / 60) == 0, (
+            'Проверьте, что вытесняются давно не использованные корзины')
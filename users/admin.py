@@ -1,6 +1,17 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
-from .models import User
+from .models import OutgoingEmail, User
+
+
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'to', 'subject', 'status', 'attempts',
+                    'next_attempt_at', 'sent_at')
+    search_fields = ('to',)
+    list_filter = ('status',)
+    # В тексте письма до отправки лежит код подтверждения.
+    exclude = ('body',)
+
 
 admin.site.register(User, UserAdmin)
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
@@ -0,0 +1,150 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from users.models import OutgoingEmail
+
+
+class Command(BaseCommand):
+    help = ('Send pending emails from the outbox in batches '
+            'over one mail backend connection, retrying failures '
+            'with exponential backoff')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.EMAIL_OUTBOX_BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep polling the outbox instead of exiting when empty',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.EMAIL_OUTBOX_POLL_INTERVAL,
+            help='Seconds to sleep between polls in --loop mode',
+        )
+
+    def claim_batch(self, batch_size, max_attempts):
+        """
+        Забирает письма в отправку (status=sending) и фиксирует это до
+        отправки, чтобы строки не были заблокированы на время SMTP.
+        Письма, взятые упавшим процессом, снова доступны через
+        EMAIL_OUTBOX_CLAIM_TIMEOUT; такой повтор считается попыткой,
+        чтобы письмо, на котором падает отправитель, не уходило бесконечно.
+        """
+        now = timezone.now()
+        abandoned = now - timedelta(
+            seconds=settings.EMAIL_OUTBOX_CLAIM_TIMEOUT)
+        emails = OutgoingEmail.objects.filter(
+            Q(status=OutgoingEmail.Status.PENDING, next_attempt_at__lte=now)
+            | Q(status=OutgoingEmail.Status.SENDING,
+                claimed_at__lte=abandoned)
+        ).order_by('next_attempt_at')
+        with transaction.atomic():
+            if connection.features.has_select_for_update_skip_locked:
+                emails = emails.select_for_update(skip_locked=True)
+            emails = list(emails[:batch_size])
+            claimed = []
+            for email in emails:
+                if email.status == OutgoingEmail.Status.SENDING:
+                    email.attempts += 1
+                    if email.attempts >= max_attempts:
+                        email.last_error = 'Отправитель упал на этом письме'
+                        self.give_up(email)
+                        email.save(update_fields=[
+                            'status', 'attempts', 'last_error', 'body'])
+                        continue
+                    email.save(update_fields=['attempts'])
+                claimed.append(email)
+            OutgoingEmail.objects.filter(
+                pk__in=[email.pk for email in claimed]
+            ).update(status=OutgoingEmail.Status.SENDING, claimed_at=now)
+        return claimed
+
+    def give_up(self, email):
+        """Текст с кодом подтверждения не хранится после отправки."""
+        email.status = OutgoingEmail.Status.FAILED
+        email.body = ''
+
+    def retry_later(self, email, error, max_attempts):
+        email.attempts += 1
+        email.last_error = str(error)
+        if email.attempts >= max_attempts:
+            self.give_up(email)
+        else:
+            email.status = OutgoingEmail.Status.PENDING
+            delay = settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (
+                email.attempts - 1)
+            email.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+
+    def reconnect(self, mail_connection):
+        """После ошибки соединение с почтовым сервером могло оборваться."""
+        try:
+            mail_connection.close()
+            mail_connection.open()
+        except Exception:
+            pass
+
+    def send_batch(self, mail_connection, batch_size, max_attempts):
+        """
+        Отправляет взятые письма, сохраняя статус каждого сразу после
+        отправки: при падении повторно уйдёт не больше одного письма.
+        """
+        emails = self.claim_batch(batch_size, max_attempts)
+        for email in emails:
+            message = EmailMessage(
+                subject=email.subject,
+                body=email.body,
+                from_email=email.from_email,
+                to=[email.to],
+                connection=mail_connection,
+            )
+            try:
+                message.send()
+            except Exception as error:
+                self.retry_later(email, error, max_attempts)
+                self.reconnect(mail_connection)
+            else:
+                email.status = OutgoingEmail.Status.SENT
+                email.attempts += 1
+                email.sent_at = timezone.now()
+                email.body = ''
+            email.save(update_fields=[
+                'status', 'attempts', 'next_attempt_at', 'last_error',
+                'sent_at', 'body'])
+        return emails
+
+    def handle(self, *args, **options):
+        sent = failed = 0
+        with get_connection() as mail_connection:
+            while True:
+                emails = self.send_batch(mail_connection,
+                                         options['batch_size'],
+                                         options['max_attempts'])
+                for email in emails:
+                    if email.status == OutgoingEmail.Status.SENT:
+                        sent += 1
+                    else:
+                        failed += 1
+                if emails:
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Sent {sent} emails, {failed} failed attempts'))
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -40,3 +41,51 @@ class User(AbstractUser):
         if self.username:
             return self.username
         return self.email
+
+
+class OutgoingEmail(models.Model):
+    """
+    Очередь исходящих писем. Письма отправляет команда send_emails.
+    """
+    class Status:
+        PENDING = 'pending'
+        SENDING = 'sending'
+        SENT = 'sent'
+        FAILED = 'failed'
+    STATUS_CHOICES = (
+        (Status.PENDING, 'pending'),
+        (Status.SENDING, 'sending'),
+        (Status.SENT, 'sent'),
+        (Status.FAILED, 'failed'),
+    )
+
+    subject = models.CharField('Тема', max_length=256)
+    body = models.TextField('Текст')
+    from_email = models.EmailField('Отправитель')
+    to = models.EmailField('Получатель')
+    status = models.CharField(
+        'Статус',
+        max_length=16,
+        choices=STATUS_CHOICES,
+        default=Status.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток отправки', default=0)
+    next_attempt_at = models.DateTimeField(
+        'Следующая попытка',
+        default=timezone.now,
+    )
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    claimed_at = models.DateTimeField(
+        'Взято в отправку', blank=True, null=True)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    sent_at = models.DateTimeField('Отправлено', blank=True, null=True)
+
+    class Meta:
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+        verbose_name = 'Исходящие письма'
+
+    def __str__(self):
+        return f'{self.to}: {self.subject}'